@@ -5,6 +5,9 @@ class AdventuresConfig(AppConfig):
     name = "adventures"
 
     def ready(self):
-        from wagtail.signals import page_published
-        from adventures.signals import process_activity_files_on_publish
+        from django.db.models.signals import post_delete
+        from wagtail.signals import page_published, page_unpublished
+        from adventures.signals import process_activity_files_on_publish, refresh_rollups
         page_published.connect(process_activity_files_on_publish)
+        page_unpublished.connect(refresh_rollups)
+        post_delete.connect(refresh_rollups, sender='adventures.AdventurePage')
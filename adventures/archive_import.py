@@ -0,0 +1,242 @@
+"""
+Bulk import of activity archives (Garmin Connect / Strava export zips).
+
+Entries are streamed straight out of the zip (including Garmin's nested zips and
+Strava's ``.fit.gz``/``.gpx.gz``), parsed in a process pool, and written in
+batches: each batch stores its files, bulk-creates the ``ActivityFile`` rows
+already marked as processed, and groups them into one ``AdventurePage`` per day
+under the chosen index page.
+
+Every entry is stored under a name derived from the archive and entry names, so
+re-running the same import skips whatever is already in the database and picks
+up where an interrupted run stopped.
+"""
+
+import csv
+import gzip
+import hashlib
+import io
+import logging
+import os
+import posixpath
+import zipfile
+from dataclasses import dataclass, field
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from adventures import channels, services
+from adventures.sniffing import SNIFF_BYTES, sniff
+
+logger = logging.getLogger(__name__)
+
+IMPORT_PREFIX = 'activity_files/imports/'
+
+# Strava "Activity Type" -> AdventurePage.ActivityType
+STRAVA_ACTIVITY_TYPES = {
+    'hike': 'hiking',
+    'walk': 'hiking',
+    'ride': 'cycling',
+    'mountain bike ride': 'cycling',
+    'gravel ride': 'cycling',
+    'e-bike ride': 'cycling',
+    'run': 'running',
+    'trail run': 'running',
+    'alpine ski': 'skiing',
+    'backcountry ski': 'skiing',
+    'nordic ski': 'skiing',
+    'rock climb': 'climbing',
+    'kayaking': 'kayaking',
+    'canoeing': 'kayaking',
+    'sail': 'sailing',
+}
+
+
+@dataclass
+class ArchiveEntry:
+    archive_id: str
+    key: str
+    file_type: str
+    gzipped: bool
+    activity_type: str | None
+    opener: object = field(repr=False)
+
+    def read(self):
+        with self.opener() as f:
+            raw = f.read()
+        return gzip.decompress(raw) if self.gzipped else raw
+
+    @property
+    def storage_name(self):
+        # FileField names are capped at 100 characters, so hash the entry key
+        return f'{IMPORT_PREFIX}{self.archive_id}/{hashlib.sha1(self.key.encode()).hexdigest()[:20]}.{self.file_type}'
+
+
+@dataclass
+class ParsedEntry:
+    entry: ArchiveEntry
+    raw: bytes
+    # ActivityFile field values from services.parse_activity_bytes
+    fields: dict
+    channels: dict | None = None
+
+    @property
+    def started_at(self):
+        return self.fields['started_at']
+
+
+def _classify(name):
+    lower = name.lower()
+    gzipped = lower.endswith('.gz')
+    if gzipped:
+        lower = lower[:-3]
+    for file_type in ('fit', 'gpx'):
+        if lower.endswith(f'.{file_type}'):
+            return file_type, gzipped
+    return None, False
+
+
+def _strava_types(archive):
+    """Map entry names to activity types from Strava's activities.csv, if present."""
+    try:
+        info = archive.getinfo('activities.csv')
+    except KeyError:
+        return {}
+    types = {}
+    with archive.open(info) as f:
+        for row in csv.DictReader(io.TextIOWrapper(f, encoding='utf-8')):
+            filename = (row.get('Filename') or '').strip()
+            strava_type = (row.get('Activity Type') or '').strip().lower()
+            if filename and strava_type in STRAVA_ACTIVITY_TYPES:
+                types[filename] = STRAVA_ACTIVITY_TYPES[strava_type]
+    return types
+
+
+def iter_entries(archive, archive_id, prefix=''):
+    """Yield an ArchiveEntry for every FIT/GPX file, descending into nested zips."""
+    activity_types = _strava_types(archive) if not prefix else {}
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        if info.filename.lower().endswith('.zip'):
+            # Left open: the yielded entries read from it later; closed with the outer file
+            nested = zipfile.ZipFile(archive.open(info))
+            yield from iter_entries(nested, archive_id, prefix=f'{prefix}{info.filename}/')
+            continue
+        file_type, gzipped = _classify(info.filename)
+        if file_type is None:
+            continue
+        yield ArchiveEntry(
+            archive_id=archive_id,
+            key=posixpath.normpath(prefix + info.filename),
+            file_type=file_type,
+            gzipped=gzipped,
+            activity_type=activity_types.get(info.filename),
+            opener=lambda archive=archive, info=info: archive.open(info),
+        )
+
+
+def archive_id_for(path):
+    """Stable short id for an archive, from its file name and size."""
+    return hashlib.sha1(f'{os.path.basename(path)}:{os.path.getsize(path)}'.encode()).hexdigest()[:12]
+
+
+def imported_names(archive_id):
+    from adventures.models import ActivityFile
+
+    return set(
+        ActivityFile.objects.filter(file__startswith=f'{IMPORT_PREFIX}{archive_id}/')
+        .values_list('file', flat=True)
+    )
+
+
+def _page_for_day(index_page, day, activity_type):
+    """
+    Adventure an earlier import created under ``index_page`` for ``day``, or a new draft.
+
+    Pages are recognised by their imported files, since a page is created in the same
+    transaction as its first files; hand-made pages on the same day are left alone.
+    Returns (page, owned) where ``owned`` means the page is an untouched import draft.
+    """
+    from adventures.models import AdventurePage
+
+    page = (
+        AdventurePage.objects.child_of(index_page)
+        .filter(date_start=day, activity_files__file__startswith=IMPORT_PREFIX)
+        .distinct().order_by('pk').first()
+    )
+    if page is not None:
+        # A draft nobody has edited yet was created by an earlier (interrupted) import
+        return page, not page.live and not page.revisions.exclude(user=None).exists()
+
+    label = AdventurePage.ActivityType(activity_type).label
+    slug = base_slug = day.isoformat()
+    suffix = 1
+    while index_page.get_children().filter(slug=slug).exists():
+        suffix += 1
+        slug = f'{base_slug}-{suffix}'
+    page = index_page.add_child(instance=AdventurePage(
+        title=f'{label} — {day:%b %-d, %Y}',
+        slug=slug,
+        date_start=day,
+        activity_type=activity_type,
+        live=False,
+    ))
+    return page, True
+
+
+def store_batch(parsed, index_page, default_activity_type='other', publish_pages=False):
+    """
+    Write one batch of parsed entries; returns the number of files created.
+
+    Files are grouped by start date into AdventurePages, stored, and inserted with a
+    single bulk_create per page; page totals and rollups are then recomputed once
+    per page.
+    """
+    from adventures.models import ActivityFile
+
+    by_day = {}
+    for item in parsed:
+        by_day.setdefault(item.started_at.date(), []).append(item)
+
+    created = 0
+    now = timezone.now()
+    for day, items in sorted(by_day.items()):
+        items.sort(key=lambda item: item.started_at)
+        activity_type = next((item.entry.activity_type for item in items if item.entry.activity_type), None)
+        with transaction.atomic():
+            page, owned = _page_for_day(index_page, day, activity_type or default_activity_type)
+            next_order = (page.activity_files.order_by('-sort_order').values_list('sort_order', flat=True).first() or 0) + 1
+            rows = []
+            for offset, item in enumerate(items):
+                name = item.entry.storage_name
+                if default_storage.exists(name):
+                    # Left behind by an interrupted run before its row was created
+                    default_storage.delete(name)
+                stored_name = default_storage.save(name, io.BytesIO(item.raw))
+                row = ActivityFile(
+                    page=page,
+                    sort_order=next_order + offset,
+                    file=stored_name,
+                    file_type=item.entry.file_type,
+                    processed_at=now,
+                    parser_version=services.PARSER_VERSION,
+                )
+                # bulk_create skips save(), so record the header metadata here
+                row.apply_sniff(sniff(item.raw[:SNIFF_BYTES], len(item.raw)))
+                for name, value in item.fields.items():
+                    setattr(row, name, value)
+                rows.append(row)
+            ActivityFile.objects.bulk_create(rows)
+            channels.store_channels((row, item.channels) for row, item in zip(rows, items))
+            created += len(rows)
+
+        services.process_adventure_files(page)
+        if owned:
+            # Snapshot the recomputed totals so publishing the draft keeps them
+            page.refresh_from_db()
+            revision = page.save_revision()
+            if publish_pages:
+                revision.publish()
+    return created
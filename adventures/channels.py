@@ -0,0 +1,249 @@
+"""
+Columnar storage of sensor channels (heart rate, cadence, power, temperature).
+
+Each channel of an activity file is one ``SensorChannel`` row holding two packed
+little-endian arrays of equal length: sample times (seconds after the channel's
+``started_at``, uint32) and values (the channel's native FIT width). A multi-hour
+1 Hz recording is a few tens of KB per channel instead of megabytes of JSON.
+
+Every row also keeps a downsampled ``summary`` of ``SUMMARY_BUCKETS`` buckets
+(``[t, min, avg, max, count]``), so the default page chart is built from the
+summaries alone; the raw arrays are only decoded for zoomed-in time ranges.
+"""
+
+import array
+import bisect
+import sys
+
+SUMMARY_BUCKETS = 240
+DEFAULT_BUCKETS = 300
+MAX_BUCKETS = 2000
+
+# name -> (array typecode, label, unit); typecodes match the FIT field widths
+CHANNELS = {
+    'heart_rate': ('B', 'Heart rate', 'bpm'),
+    'cadence': ('B', 'Cadence', 'rpm'),
+    'power': ('H', 'Power', 'W'),
+    'temperature': ('b', 'Temperature', '°C'),
+}
+
+# GPX extension element (local name) -> channel, e.g. Garmin TrackPointExtension
+GPX_EXTENSION_CHANNELS = {
+    'hr': 'heart_rate',
+    'heartrate': 'heart_rate',
+    'cad': 'cadence',
+    'cadence': 'cadence',
+    'power': 'power',
+    'watts': 'power',
+    'atemp': 'temperature',
+    'temp': 'temperature',
+}
+
+
+class ChannelRecorder:
+    """Collects samples per channel while a file is parsed."""
+
+    def __init__(self):
+        self.started_at = None
+        self.samples = {}
+
+    def add(self, timestamp, channel, value):
+        if timestamp is None or value is None:
+            return
+        if self.started_at is None:
+            self.started_at = timestamp
+        typecode = CHANNELS[channel][0]
+        times, values = self.samples.setdefault(channel, (array.array('I'), array.array(typecode)))
+        offset = int((timestamp - self.started_at).total_seconds())
+        if offset < 0 or (times and offset < times[-1]):
+            # Out-of-order sample (clock jump); keep the arrays sorted
+            return
+        times.append(offset)
+        values.append(_clamp(typecode, value))
+
+    def result(self):
+        """{'started_at': datetime|None, 'channels': {name: (times, values)}}, picklable."""
+        return {'started_at': self.started_at, 'channels': self.samples}
+
+
+_RANGES = {'B': (0, 0xFF), 'b': (-0x80, 0x7F), 'H': (0, 0xFFFF)}
+
+
+def _clamp(typecode, value):
+    low, high = _RANGES[typecode]
+    return min(high, max(low, int(round(float(value)))))
+
+
+def pack(values):
+    if sys.byteorder == 'big':
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack(typecode, blob):
+    values = array.array(typecode)
+    values.frombytes(bytes(blob))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def bucketize(times, values, start, end, buckets):
+    """
+    Downsample (times, values) within [start, end] into at most ``buckets`` buckets.
+
+    Returns [[t, min, avg, max, count], ...] for the non-empty buckets, where ``t``
+    is the bucket's mean sample time. One pass, no sorting.
+    """
+    span = max(end - start, 1)
+    stats = {}
+    for t, value in zip(times, values):
+        if t < start or t > end:
+            continue
+        index = min(int((t - start) * buckets / span), buckets - 1)
+        bucket = stats.get(index)
+        if bucket is None:
+            stats[index] = [t, value, value, value, 1]
+        else:
+            bucket[0] += t
+            bucket[1] = min(bucket[1], value)
+            bucket[2] += value
+            bucket[3] = max(bucket[3], value)
+            bucket[4] += 1
+    return [
+        [round(t / n, 1), low, round(total / n, 1), high, n]
+        for _, (t, low, total, high, n) in sorted(stats.items())
+    ]
+
+
+def merge_buckets(rows, start, end, buckets):
+    """Re-bucket already bucketed rows ([t, min, avg, max, count]) into coarser buckets."""
+    span = max(end - start, 1)
+    merged = {}
+    for t, low, avg, high, n in rows:
+        if t < start or t > end:
+            continue
+        index = min(int((t - start) * buckets / span), buckets - 1)
+        bucket = merged.get(index)
+        if bucket is None:
+            merged[index] = [t * n, low, avg * n, high, n]
+        else:
+            bucket[0] += t * n
+            bucket[1] = min(bucket[1], low)
+            bucket[2] += avg * n
+            bucket[3] = max(bucket[3], high)
+            bucket[4] += n
+    return [
+        [round(t / n, 1), low, round(total / n, 1), high, n]
+        for _, (t, low, total, high, n) in sorted(merged.items())
+    ]
+
+
+def build_channel_rows(activity_file, recorded):
+    """Unsaved SensorChannel rows for one file's recorded channels."""
+    from adventures.models import SensorChannel
+
+    rows = []
+    for name, (times, values) in sorted((recorded or {}).get('channels', {}).items()):
+        if not times:
+            continue
+        rows.append(SensorChannel(
+            activity_file=activity_file,
+            channel=name,
+            started_at=recorded['started_at'],
+            sample_count=len(times),
+            duration_s=times[-1],
+            times=pack(times),
+            values=pack(values),
+            min_value=min(values),
+            max_value=max(values),
+            avg_value=round(sum(values) / len(values), 1),
+            summary=bucketize(times, values, 0, times[-1], SUMMARY_BUCKETS),
+        ))
+    return rows
+
+
+def store_channels(activity_files_with_channels):
+    """Replace the channels of each (activity_file, recorded) pair in one batch."""
+    from adventures.models import SensorChannel
+
+    pairs = list(activity_files_with_channels)
+    SensorChannel.objects.filter(activity_file__in=[activity_file for activity_file, _ in pairs]).delete()
+    rows = [row for activity_file, recorded in pairs for row in build_channel_rows(activity_file, recorded)]
+    SensorChannel.objects.bulk_create(rows)
+    return rows
+
+
+def _offset(page_start, channel_row):
+    return (channel_row.started_at - page_start).total_seconds()
+
+
+def page_channels(rows):
+    """Channel index for a page: which channels exist, their ranges and units."""
+    page_start = min((row.started_at for row in rows), default=None)
+    index = {}
+    for row in rows:
+        entry = index.setdefault(row.channel, {
+            'channel': row.channel,
+            'label': CHANNELS[row.channel][1],
+            'unit': CHANNELS[row.channel][2],
+            'samples': 0,
+            'min': row.min_value,
+            'max': row.max_value,
+            'end_s': 0,
+        })
+        entry['samples'] += row.sample_count
+        entry['min'] = min(entry['min'], row.min_value)
+        entry['max'] = max(entry['max'], row.max_value)
+        entry['end_s'] = max(entry['end_s'], _offset(page_start, row) + row.duration_s)
+    return {
+        'started_at': page_start.isoformat() if page_start else None,
+        'channels': [index[name] for name in CHANNELS if name in index],
+    }
+
+
+def _samples_in_range(row, offset, start, end):
+    """A row's raw samples within [start, end] (page seconds); values outside are never unpacked."""
+    times = unpack('I', row.times)
+    first = bisect.bisect_left(times, start - offset)
+    last = bisect.bisect_right(times, end - offset)
+    typecode = CHANNELS[row.channel][0]
+    itemsize = array.array(typecode).itemsize
+    values = unpack(typecode, memoryview(row.values)[first * itemsize:last * itemsize])
+    return [t + offset for t in times[first:last]], values
+
+
+def page_series(rows, buckets=DEFAULT_BUCKETS, start=None, end=None):
+    """
+    Bucketed series of one channel across a page's files.
+
+    Times are seconds after the page's first sample. Without a range the stored
+    summaries are merged; with one, the sorted sample times are bisected and only
+    the values inside the range are decoded.
+    """
+    if not rows:
+        return {'started_at': None, 'buckets': []}
+    page_start = min(row.started_at for row in rows)
+    full_end = max(_offset(page_start, row) + row.duration_s for row in rows)
+    zoomed = start is not None or end is not None
+    start = max(0, start or 0)
+    end = min(full_end, full_end if end is None else end)
+
+    combined = []
+    for row in sorted(rows, key=lambda row: row.started_at):
+        offset = _offset(page_start, row)
+        if offset > end or offset + row.duration_s < start:
+            continue
+        if zoomed:
+            times, values = _samples_in_range(row, offset, start, end)
+            combined += bucketize(times, values, start, end, buckets)
+        else:
+            combined += [[t + offset, low, avg, high, n] for t, low, avg, high, n in row.summary]
+    return {
+        'started_at': page_start.isoformat(),
+        'start_s': start,
+        'end_s': end,
+        'buckets': merge_buckets(combined, start, end, buckets),
+    }
+
@@ -0,0 +1,152 @@
+"""
+Elevation correction from local SRTM DEM tiles.
+
+GPS altitude in GPX files is noisy, and many files have none at all (parsed as
+None). When ``settings.DEM_TILE_DIR`` points at a directory of SRTM ``.hgt`` tiles
+(e.g. ``N47W122.hgt``, 1201² or 3601² big-endian int16 samples, north row first),
+each point's elevation in a GPX file is replaced by the bilinearly interpolated
+terrain height and the file's gain/loss are recomputed from it.
+
+Tiles are memory-mapped and kept open per process (``_open_tile`` is cached), so
+only the pages a track touches are read from disk. Consecutive points nearly
+always fall in the same tile, so the lookup of the current tile is reused.
+
+FIT files keep their own elevations and totals unless they recorded no altitude
+at all (none, or only zeros); barometric altimeters beat a 30 m DEM.
+"""
+
+import functools
+import math
+import mmap
+import os
+import struct
+
+from django.conf import settings
+
+VOID = -32768
+# Elevation changes below this are treated as DEM noise when summing gain/loss
+HYSTERESIS_M = 3
+
+_PAIR = struct.Struct('>2h')
+
+
+def tile_name(lon, lat):
+    """SRTM tile file name for the 1°×1° tile containing (lon, lat), e.g. N47W122.hgt."""
+    lat_index, lon_index = math.floor(lat), math.floor(lon)
+    return '{}{:02d}{}{:03d}.hgt'.format(
+        'N' if lat_index >= 0 else 'S', abs(lat_index),
+        'E' if lon_index >= 0 else 'W', abs(lon_index),
+    )
+
+
+class HgtTile:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = math.isqrt(len(self.data) // 2)
+        if self.size * self.size * 2 != len(self.data) or self.size < 2:
+            raise ValueError(f'{path} is not an SRTM .hgt tile')
+
+    def _pair(self, row, col):
+        return _PAIR.unpack_from(self.data, (row * self.size + col) * 2)
+
+    def elevation(self, lon, lat):
+        """Bilinearly interpolated height at (lon, lat), or None over voids."""
+        last = self.size - 1
+        # Row 0 is the tile's north edge
+        y = (1 - (lat - math.floor(lat))) * last
+        x = (lon - math.floor(lon)) * last
+        row, col = min(int(y), last - 1), min(int(x), last - 1)
+        dy, dx = y - row, x - col
+        nw, ne = self._pair(row, col)
+        sw, se = self._pair(row + 1, col)
+        corners = ((nw, (1 - dx) * (1 - dy)), (ne, dx * (1 - dy)), (sw, (1 - dx) * dy), (se, dx * dy))
+        valid = [(value, weight) for value, weight in corners if value != VOID]
+        total = sum(weight for _, weight in valid)
+        if not valid or total == 0:
+            return None
+        return sum(value * weight for value, weight in valid) / total
+
+
+@functools.lru_cache(maxsize=32)
+def _open_tile(path):
+    try:
+        return HgtTile(path)
+    except (OSError, ValueError):
+        return None
+
+
+def dem_elevations(coords, tile_dir=None):
+    """Terrain height per [lon, lat, ...] coordinate; None where no tile covers it."""
+    tile_dir = tile_dir or settings.DEM_TILE_DIR
+    if not tile_dir:
+        return [None] * len(coords)
+    heights = []
+    current_name = tile = None
+    for lon, lat, *_ in coords:
+        name = tile_name(lon, lat)
+        if name != current_name:
+            current_name = name
+            tile = _open_tile(os.path.join(tile_dir, name))
+        heights.append(tile.elevation(lon, lat) if tile is not None else None)
+    return heights
+
+
+def gain_loss(elevations):
+    """(gain, loss) in metres, ignoring changes smaller than ``HYSTERESIS_M`` and points without elevation."""
+    gain = loss = 0.0
+    reference = None
+    for elevation in elevations:
+        if elevation is None:
+            continue
+        if reference is None:
+            reference = elevation
+            continue
+        climb = elevation - reference
+        if climb >= HYSTERESIS_M:
+            gain += climb
+            reference = elevation
+        elif climb <= -HYSTERESIS_M:
+            loss -= climb
+            reference = elevation
+    return gain, loss
+
+
+def _needs_correction(file_type, gps_points):
+    """GPX elevations are always replaced; FIT ones only when the device recorded no altitude."""
+    if file_type != 'fit':
+        return True
+    return not any(point[2] for point in gps_points)
+
+
+def correct(result, file_type, tile_dir=None):
+    """
+    Replace a parse result's elevations with DEM heights, in place.
+
+    Only applied when every point is covered by a tile, so a track is never half
+    corrected. Gain/loss of the file and of each segment are recomputed; returns
+    whether the result was changed.
+    """
+    gps_points = result['gps_points']
+    if not gps_points or not (tile_dir or settings.DEM_TILE_DIR) or not _needs_correction(file_type, gps_points):
+        return False
+    heights = dem_elevations(gps_points, tile_dir)
+    if any(height is None for height in heights):
+        return False
+
+    for point, height in zip(gps_points, heights):
+        point[2] = round(height, 1)
+    _apply_gain_loss(result['stats'], heights)
+    for segment in result['segments']:
+        if segment['stats'] is not result['stats']:
+            _apply_gain_loss(segment['stats'], heights[segment['start']:segment['end']])
+        for lap in segment['laps']:
+            _apply_gain_loss(lap['stats'], heights[lap['start']:lap['end']])
+    return True
+
+
+def _apply_gain_loss(stats, heights):
+    gain, loss = gain_loss(heights)
+    stats['elevation_gain_m'] = int(gain)
+    stats['elevation_loss_m'] = int(loss)
+    stats['elevation_source'] = 'dem'
@@ -0,0 +1,27 @@
+from django.utils import timezone
+from wagtail.admin.forms import WagtailAdminPageForm
+
+
+class AdventurePageForm(WagtailAdminPageForm):
+    """Fills in a new adventure's dates from the start times sniffed from its activity files."""
+
+    def _sniffed_start_times(self):
+        formset = self.formsets.get('activity_files')
+        if formset is None:
+            return []
+        return sorted(
+            form.instance.started_at for form in formset.forms
+            if form.instance.started_at is not None and not formset._should_delete_form(form)
+        )
+
+    def save(self, commit=True):
+        page = self.instance
+        # Only for pages being created whose author left the dates at their defaults
+        if page.pk is None and 'date_start' not in self.changed_data:
+            started = self._sniffed_start_times()
+            if started:
+                first, last = (timezone.localdate(started[0]), timezone.localdate(started[-1]))
+                page.date_start = first
+                if last != first and page.date_end is None and 'date_end' not in self.changed_data:
+                    page.date_end = last
+        return super().save(commit=commit)
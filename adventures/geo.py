@@ -0,0 +1,141 @@
+"""Small pure-Python geometry helpers shared by the route processing code."""
+
+import math
+
+EARTH_RADIUS_M = 6371000
+
+
+def haversine_m(lon1, lat1, lon2, lat2):
+    """Great-circle distance in metres between two (lon, lat) points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """
+    Uniform lat/lon grid over points, for radius queries.
+
+    Points are bucketed into square cells of ``cell_m`` metres (longitude cells are
+    widened by 1/cos(latitude) so cells stay roughly square), so building is O(n)
+    and a query only scans the cells within its radius.
+    """
+
+    def __init__(self, cell_m=50.0, reference_lat=0.0):
+        self.cell_deg = cell_m / 111320
+        self.lon_scale = 1 / max(0.01, math.cos(math.radians(reference_lat)))
+        self.cells = {}
+
+    def _cell(self, lon, lat):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / (self.cell_deg * self.lon_scale)))
+
+    def add(self, lon, lat, item):
+        self.cells.setdefault(self._cell(lon, lat), []).append((lon, lat, item))
+
+    def within(self, lon, lat, radius_m):
+        """(distance_m, item) for every point within ``radius_m`` of (lon, lat)."""
+        row, col = self._cell(lon, lat)
+        reach = int(math.ceil(radius_m / (self.cell_deg * 111320)))
+        found = []
+        for r in range(row - reach, row + reach + 1):
+            for c in range(col - reach, col + reach + 1):
+                for plon, plat, item in self.cells.get((r, c), ()):
+                    distance = haversine_m(lon, lat, plon, plat)
+                    if distance <= radius_m:
+                        found.append((distance, item))
+        return found
+
+    def nearest(self, lon, lat, max_radius_m):
+        """
+        (distance_m, item) of the point nearest to (lon, lat), or None if there is
+        none within ``max_radius_m``.
+
+        Scans rings of cells outwards and stops once no unscanned cell can hold a
+        closer point.
+        """
+        row, col = self._cell(lon, lat)
+        cell_m = self.cell_deg * 111320
+        max_ring = int(math.ceil(max_radius_m / cell_m))
+        best = None
+        for ring in range(max_ring + 1):
+            for r in range(row - ring, row + ring + 1):
+                edge = r in (row - ring, row + ring)
+                for c in (range(col - ring, col + ring + 1) if edge else (col - ring, col + ring)):
+                    for plon, plat, item in self.cells.get((r, c), ()):
+                        distance = haversine_m(lon, lat, plon, plat)
+                        if distance <= max_radius_m and (best is None or distance < best[0]):
+                            best = (distance, item)
+            # Points in further rings are at least ``ring`` whole cells away
+            if best is not None and best[0] <= ring * cell_m:
+                break
+        return best
+
+
+def route_profile(features):
+    """
+    Flatten LineString features into (lon, lat, elevation, distance_km) per point.
+
+    Distance accumulates along each feature; the gap between one feature's last
+    point and the next feature's first is not counted (they are separate tracks).
+    The elevation chart on the adventure page measures distance the same way.
+    """
+    profile = []
+    distance = 0.0
+    for feature in features:
+        previous = None
+        for lon, lat, *rest in (feature.get('geometry') or {}).get('coordinates') or []:
+            if previous is not None:
+                distance += haversine_m(previous[0], previous[1], lon, lat) / 1000
+            profile.append((lon, lat, rest[0] if rest else None, distance))
+            previous = (lon, lat)
+    return profile
+
+
+def snap_points(profile, points, max_distance_m, cell_m=100.0):
+    """
+    Snap (lon, lat) points to their nearest route point.
+
+    ``profile`` is ``route_profile`` output. Returns, per point, the snapped
+    profile entry plus the distance to it in metres, or None if the route is
+    further away than ``max_distance_m``. Indexing is O(n) in the route's points
+    and each lookup only scans nearby cells.
+    """
+    if not profile or not points:
+        return [None] * len(points)
+    index = GridIndex(cell_m=cell_m, reference_lat=profile[0][1])
+    for entry in profile:
+        index.add(entry[0], entry[1], entry)
+    snapped = []
+    for lon, lat in points:
+        found = index.nearest(lon, lat, max_distance_m)
+        snapped.append(None if found is None else (found[1], found[0]))
+    return snapped
+
+
+_GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(lon, lat, precision=7):
+    """Standard base32 geohash of (lon, lat); precision 7 cells are ~150 m across."""
+    lon_range = [-180.0, 180.0]
+    lat_range = [-90.0, 90.0]
+    chars = []
+    bits = value = 0
+    even = True
+    while len(chars) < precision:
+        bounds, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        mid = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_ALPHABET[value])
+            bits = value = 0
+    return ''.join(chars)
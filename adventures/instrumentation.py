@@ -0,0 +1,63 @@
+"""Per-stage timing and metrics for activity file processing."""
+
+import time
+from contextlib import contextmanager
+
+from nicolabeirer import metrics
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def stage_seconds():
+    return metrics.histogram(
+        'adventures_processing_stage_seconds',
+        'Time spent in each activity processing stage.',
+        ['stage', 'file_type'],
+        buckets=STAGE_BUCKETS,
+    )
+
+
+def files_processed():
+    return metrics.counter(
+        'adventures_files_processed',
+        'Activity files processed, by outcome.',
+        ['file_type', 'status'],
+    )
+
+
+def bytes_read():
+    return metrics.counter(
+        'adventures_processing_bytes_read',
+        'Bytes of activity file data read from storage.',
+        ['file_type'],
+    )
+
+
+def points_parsed():
+    return metrics.counter(
+        'adventures_processing_points_parsed',
+        'GPS points extracted from activity files.',
+        ['file_type'],
+    )
+
+
+class StageTimer:
+    """Accumulates wall time per named stage and mirrors it to the stage histogram."""
+
+    def __init__(self, file_type=''):
+        self.file_type = file_type
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            stage_seconds().labels(stage=name, file_type=self.file_type).observe(elapsed)
+
+    @property
+    def total(self):
+        return sum(self.timings.values())
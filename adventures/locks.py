@@ -0,0 +1,50 @@
+"""
+Per-page processing locks.
+
+On PostgreSQL these are session-level advisory locks, so they hold across
+processes and hosts (web workers, background threads, management commands)
+without a row lock or an open transaction while files are parsed. Other
+databases (SQLite in development) fall back to a lock per page within the
+process.
+"""
+
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import connection
+
+# High 32 bits of the advisory lock key, so page ids can't collide with other locks
+ADVISORY_LOCK_NAMESPACE = 0x4E42
+
+_local_locks = defaultdict(threading.Lock)
+_local_locks_guard = threading.Lock()
+
+
+def _advisory_key(page_id):
+    return (ADVISORY_LOCK_NAMESPACE << 32) | page_id
+
+
+@contextmanager
+def page_lock(page_id):
+    """Try to take the processing lock of a page without waiting; yields whether it was taken."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s::bigint)', [_advisory_key(page_id)])
+            acquired = cursor.fetchone()[0]
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_unlock(%s::bigint)', [_advisory_key(page_id)])
+        return
+
+    with _local_locks_guard:
+        lock = _local_locks[page_id]
+    acquired = lock.acquire(blocking=False)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
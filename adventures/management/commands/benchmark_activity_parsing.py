@@ -0,0 +1,155 @@
+import gc
+import io
+import json
+import platform
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from adventures import services, synthetic
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'activity_parsing.json'
+
+
+def _time_best(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def _peak_memory(func):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the activity processing hot path (FIT/GPX parsing, stats aggregation, '
+        'GeoJSON building and serialization, packed route encoding) against a synthetic corpus.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', type=int, default=DEFAULT_SIZES,
+            help='Track sizes in points (default: 1k 10k 100k; add 1000000 for the full sweep).',
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage; the best is kept.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+        parser.add_argument('--save-baseline', action='store_true', help='Overwrite the baseline with this run.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Allowed slowdown/memory growth vs. baseline before a stage is reported as a regression.',
+        )
+
+    def handle(self, *args, **options):
+        results = {}
+        for size in options['sizes']:
+            self.stdout.write(f'Generating {size:,} point corpus...')
+            points = synthetic.generate_track(size, seed=options['seed'])
+            fit_bytes = synthetic.build_fit_bytes(points)
+            gpx_bytes = synthetic.build_gpx_bytes(points)
+            del points
+            results.update(self._run_size(size, fit_bytes, gpx_bytes, options['repeat']))
+
+        self._print_table(results)
+
+        baseline_path = options['baseline']
+        regressions = []
+        if baseline_path.exists() and not options['save_baseline']:
+            baseline = json.loads(baseline_path.read_text())
+            regressions = self._compare(results, baseline.get('results', {}), options['tolerance'])
+
+        if options['save_baseline'] or not baseline_path.exists():
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            }, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline_path}'))
+
+        if regressions:
+            for line in regressions:
+                self.stderr.write(self.style.ERROR(line))
+            raise CommandError(f'{len(regressions)} benchmark regression(s) vs. {baseline_path}')
+
+    def _run_size(self, size, fit_bytes, gpx_bytes, repeat):
+        results = {}
+
+        def record(stage, func, **extra):
+            seconds, result = _time_best(func, repeat)
+            results[f'{stage}@{size}'] = {
+                'points': size,
+                'seconds': round(seconds, 6),
+                'points_per_s': round(size / seconds) if seconds else None,
+                'peak_bytes': _peak_memory(func),
+                **extra,
+            }
+            return result
+
+        fit = record(
+            'parse_fit_file', lambda: services.parse_fit_file(io.BytesIO(fit_bytes)),
+            input_bytes=len(fit_bytes),
+        )
+        gpx = record(
+            'parse_gpx_file', lambda: services.parse_gpx_file(io.BytesIO(gpx_bytes)),
+            input_bytes=len(gpx_bytes),
+        )
+        # One stats dict per thousand points approximates a page with many files
+        stats_list = [fit['stats'], gpx['stats']] * max(1, size // 2000)
+        record('aggregate_stats', lambda: services.aggregate_stats(stats_list))
+        feature = record('build_geojson_linestring', lambda: services.build_geojson_linestring(fit['gps_points']))
+        merged = services.merge_geojson_features([feature])
+        serialized = record('json_dumps', lambda: json.dumps(merged, separators=(',', ':')))
+        results[f'json_dumps@{size}']['serialized_bytes'] = len(serialized)
+        record('json_loads', lambda: json.loads(serialized))
+        # Packed binary route (services.encode_route) vs. the GeoJSON above
+        packed = record('encode_route', lambda: services.encode_route(merged))
+        results[f'encode_route@{size}']['serialized_bytes'] = len(packed)
+        record('decode_route', lambda: services.decode_route(packed))
+        return results
+
+    def _compare(self, results, baseline, tolerance):
+        regressions = []
+        for key, current in results.items():
+            previous = baseline.get(key)
+            if not previous:
+                continue
+            for metric in ('seconds', 'peak_bytes', 'serialized_bytes'):
+                old, new = previous.get(metric), current.get(metric)
+                if not (old and new) or new <= old * (1 + tolerance):
+                    continue
+                # Sub-millisecond stages are dominated by timer noise
+                if metric == 'seconds' and new - old < 0.001:
+                    continue
+                regressions.append(f'{key} {metric}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)')
+        return regressions
+
+    def _print_table(self, results):
+        self.stdout.write(
+            f'{"stage":<34} {"seconds":>10} {"points/s":>12} {"peak MiB":>10} {"size KiB":>10}'
+        )
+        for key, row in results.items():
+            size = row.get('serialized_bytes') or row.get('input_bytes')
+            self.stdout.write(
+                f'{key:<34} {row["seconds"]:>10.4f} {row["points_per_s"] or 0:>12,} '
+                f'{row["peak_bytes"] / 2**20:>10.2f} {(size or 0) / 1024:>10.1f}'
+            )
@@ -0,0 +1,127 @@
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+
+from adventures import archive_import, services
+from adventures.models import AdventureIndexPage, AdventurePage
+
+
+class Command(BaseCommand):
+    help = (
+        'Import a Garmin Connect or Strava export zip: FIT/GPX entries are streamed from the '
+        'archive, parsed in parallel and stored as ActivityFiles grouped into one AdventurePage '
+        'per day. Re-running the same archive resumes where it stopped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive', help='Path to the export .zip.')
+        parser.add_argument('--index', type=int, help='AdventureIndexPage ID to import under (default: the first one).')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Parser processes (1 = in-process).')
+        parser.add_argument('--batch-size', type=int, default=200, help='Parsed files per database batch.')
+        parser.add_argument(
+            '--activity-type', default=AdventurePage.ActivityType.OTHER,
+            choices=AdventurePage.ActivityType.values,
+            help='Activity type for new pages when the archive does not say (Strava activities.csv does).',
+        )
+        parser.add_argument('--publish', action='store_true', help='Publish new pages instead of leaving drafts.')
+        parser.add_argument('--limit', type=int, help='Stop after this many new files (for trial runs).')
+
+    def handle(self, *args, **options):
+        path = options['archive']
+        if not zipfile.is_zipfile(path):
+            raise CommandError(f'{path} is not a zip archive')
+        index_page = (
+            AdventureIndexPage.objects.filter(pk=options['index']).first() if options['index']
+            else AdventureIndexPage.objects.order_by('path').first()
+        )
+        if index_page is None:
+            raise CommandError('No AdventureIndexPage to import under')
+
+        archive_id = archive_import.archive_id_for(path)
+        done = archive_import.imported_names(archive_id)
+
+        with zipfile.ZipFile(path) as archive:
+            entries = list(archive_import.iter_entries(archive, archive_id))
+            todo = [entry for entry in entries if entry.storage_name not in done]
+            if options['limit']:
+                todo = todo[:options['limit']]
+            self.stdout.write(
+                f'{len(entries)} activity files in archive, {len(entries) - len(todo)} already imported, '
+                f'{len(todo)} to import into "{index_page.title}"'
+            )
+            self._import(todo, index_page, options)
+
+    def _import(self, todo, index_page, options):
+        workers = max(1, options['workers'])
+        batch_size = options['batch_size']
+        started = time.monotonic()
+        stats = {'imported': 0, 'failed': 0}
+        batch = []
+
+        def flush():
+            if batch:
+                stats['imported'] += archive_import.store_batch(
+                    batch, index_page, options['activity_type'], options['publish'],
+                )
+                batch.clear()
+            finished = stats['imported'] + stats['failed']
+            elapsed = time.monotonic() - started
+            rate = finished / elapsed if elapsed else 0
+            eta = (len(todo) - finished) / rate if rate else 0
+            self.stdout.write(
+                f'[{finished}/{len(todo)}] imported {stats["imported"]}, failed {stats["failed"]}, '
+                f'{rate:.1f} files/s, ETA {eta:.0f}s'
+            )
+
+        def read(entry):
+            # A corrupt member or broken .gz is reported and skipped like a parse failure
+            try:
+                return entry.read()
+            except Exception as exc:
+                stats['failed'] += 1
+                self.stderr.write(f'  {entry.key}: cannot read: {exc}')
+                return None
+
+        def collect(entry, raw, outcome):
+            try:
+                fields, recorded = outcome()
+            except Exception as exc:
+                stats['failed'] += 1
+                self.stderr.write(f'  {entry.key}: {exc}')
+                return
+            if fields['started_at'] is None:
+                stats['failed'] += 1
+                self.stderr.write(f'  {entry.key}: no timestamps, cannot place it on a date')
+                return
+            batch.append(archive_import.ParsedEntry(entry, raw, fields, recorded))
+            if len(batch) >= batch_size:
+                flush()
+
+        if workers == 1:
+            for entry in todo:
+                raw = read(entry)
+                if raw is None:
+                    continue
+                collect(entry, raw, lambda: services.parse_activity_bytes(entry.file_type, raw))
+            flush()
+            return
+
+        # Entries are read in this process and handed to the pool; at most a few per
+        # worker are in flight so memory stays bounded for archives of any size.
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+            for entry in todo:
+                raw = read(entry)
+                if raw is None:
+                    continue
+                pending[pool.submit(services.parse_activity_bytes, entry.file_type, raw)] = (entry, raw)
+                if len(pending) >= workers * 4:
+                    completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        collect(*pending.pop(future), future.result)
+            for future in list(pending):
+                collect(*pending.pop(future), future.result)
+        flush()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from adventures import similarity
+
+
+class Command(BaseCommand):
+    help = 'Recompute the route fingerprints used to find similar adventures.'
+
+    def handle(self, *args, **options):
+        indexed = similarity.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'Fingerprinted {indexed} adventure route(s).'))
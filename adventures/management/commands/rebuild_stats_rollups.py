@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from adventures import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute every monthly StatsRollup row from the live adventure pages.'
+
+    def handle(self, *args, **options):
+        months = rollups.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(months)} month(s) of adventure stats.'))
@@ -0,0 +1,225 @@
+import datetime
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg, Count, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from adventures import channels, services
+from adventures.models import ActivityFile, AdventurePage, ProcessingRun
+from nicolabeirer.page_cache import bump_generation
+
+
+def _timed_parse(file_type, raw):
+    started = time.perf_counter()
+    fields, recorded = services.parse_activity_bytes(file_type, raw)
+    return fields, recorded, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-parse stored activity files and refresh their stats, routes and page totals. '
+        'Progress is checkpointed so an interrupted run can be resumed with --resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', type=int, action='append', help='Only files of this AdventurePage ID; may be repeated.')
+        parser.add_argument('--file-type', choices=['fit', 'gpx'])
+        parser.add_argument(
+            '--outdated', action='store_true',
+            help=f'Only files parsed by an older parser than the current version ({services.PARSER_VERSION}).',
+        )
+        parser.add_argument('--parser-version', type=int, help='Only files stamped with this parser version.')
+        parser.add_argument('--since', type=datetime.date.fromisoformat, help='Only adventures starting on or after YYYY-MM-DD.')
+        parser.add_argument('--until', type=datetime.date.fromisoformat, help='Only adventures starting on or before YYYY-MM-DD.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Parser processes (1 = in-process).')
+        parser.add_argument('--batch-size', type=int, default=100, help='Files per database write batch.')
+        parser.add_argument(
+            '--checkpoint', default='reprocess_activities.checkpoint.json',
+            help='File recording the last committed file ID for --resume.',
+        )
+        parser.add_argument('--resume', action='store_true', help='Continue after the ID stored in the checkpoint.')
+        parser.add_argument('--dry-run', action='store_true', help='Report the work that would be done and exit.')
+
+    def _queryset(self, options):
+        files = ActivityFile.objects.exclude(file='')
+        if options['page']:
+            files = files.filter(page_id__in=options['page'])
+        if options['file_type']:
+            files = files.filter(file_type=options['file_type'])
+        if options['outdated']:
+            files = files.filter(Q(parser_version__isnull=True) | Q(parser_version__lt=services.PARSER_VERSION))
+        if options['parser_version'] is not None:
+            files = files.filter(parser_version=options['parser_version'])
+        if options['since']:
+            files = files.filter(page__date_start__gte=options['since'])
+        if options['until']:
+            files = files.filter(page__date_start__lte=options['until'])
+        return files.order_by('pk')
+
+    def _filters_key(self, options):
+        keys = ('page', 'file_type', 'outdated', 'parser_version', 'since', 'until')
+        return json.dumps({key: options[key] for key in keys}, default=str, sort_keys=True)
+
+    def handle(self, *args, **options):
+        files = self._queryset(options)
+        filters_key = self._filters_key(options)
+
+        if options['resume']:
+            try:
+                with open(options['checkpoint']) as f:
+                    checkpoint = json.load(f)
+            except FileNotFoundError:
+                raise CommandError(f'No checkpoint at {options["checkpoint"]}')
+            if checkpoint['filters'] != filters_key:
+                raise CommandError('Checkpoint was written with different filters; rerun with the same options.')
+            files = files.filter(pk__gt=checkpoint['last_pk'])
+
+        if options['dry_run']:
+            self._report(files, options['workers'])
+            return
+        self._run(files, filters_key, options)
+
+    def _report(self, files, workers):
+        """Estimate the run from each file's most recent ProcessingRun."""
+        latest = ProcessingRun.objects.filter(activity_file=OuterRef('pk'), status=ProcessingRun.Status.SUCCESS).order_by('-started_at')
+        rows = files.annotate(
+            last_bytes=Subquery(latest.values('bytes_read')[:1]),
+            last_parse_s=Subquery(latest.values('parse_s')[:1]),
+        )
+        summary = rows.aggregate(
+            files=Count('pk'),
+            pages=Count('page', distinct=True),
+            known=Count('last_parse_s'),
+            avg_parse_s=Avg('last_parse_s'),
+            avg_bytes=Avg('last_bytes'),
+        )
+        by_type = dict(files.values_list('file_type').annotate(n=Count('pk')).order_by())
+
+        avg_parse = summary['avg_parse_s'] or 0
+        est_bytes = (summary['avg_bytes'] or 0) * summary['files']
+        est_seconds = avg_parse * summary['files'] / max(1, workers)
+        self.stdout.write(f'Files to reprocess: {summary["files"]} ({", ".join(f"{n} {t}" for t, n in by_type.items()) or "none"})')
+        self.stdout.write(f'Adventure pages affected: {summary["pages"]}')
+        if summary['known']:
+            self.stdout.write(
+                f'Estimated read: {est_bytes / 1e6:.1f} MB, parse time: {est_seconds:.0f}s with {workers} worker(s) '
+                f'(from {summary["known"]} previous run(s), avg {avg_parse * 1000:.0f} ms/file)'
+            )
+        else:
+            self.stdout.write('No previous processing runs to estimate time from.')
+
+    def _run(self, files, filters_key, options):
+        total = files.count()
+        workers = max(1, options['workers'])
+        batch_size = options['batch_size']
+        started = time.monotonic()
+        done = {'ok': 0, 'failed': 0}
+        batch = []
+        # IDs read but not yet written (or failed); the checkpoint stays below the smallest
+        unfinished = set()
+        last_read = [0]
+
+        def write_checkpoint(last_pk):
+            tmp = options['checkpoint'] + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump({'filters': filters_key, 'last_pk': last_pk}, f)
+            os.replace(tmp, options['checkpoint'])
+
+        def flush():
+            if not batch:
+                return
+            now = timezone.now()
+            updated = [activity_file for activity_file, _, _ in batch]
+            for activity_file in updated:
+                activity_file.processed_at = now
+                activity_file.parser_version = services.PARSER_VERSION
+            ActivityFile.objects.bulk_update(
+                updated, ['parsed_stats', 'route_geojson', 'started_at', 'point_times', 'processed_at', 'parser_version'],
+            )
+            ProcessingRun.objects.bulk_create([
+                ProcessingRun(
+                    page_id=activity_file.page_id,
+                    activity_file=activity_file,
+                    file_name=str(activity_file.file)[:255],
+                    file_type=activity_file.file_type,
+                    started_at=now,
+                    bytes_read=size,
+                    point_count=len(activity_file.route_geojson['geometry']['coordinates']),
+                    parse_s=parse_s,
+                    total_s=parse_s,
+                )
+                for activity_file, _, (size, parse_s) in batch
+            ])
+            channels.store_channels((activity_file, recorded) for activity_file, recorded, _ in batch)
+            for page in AdventurePage.objects.filter(pk__in={activity_file.page_id for activity_file in updated}):
+                services.process_adventure_files(page)
+            unfinished.difference_update(activity_file.pk for activity_file in updated)
+            batch.clear()
+            # Parallel results arrive out of order; resume after the last ID with nothing pending below it
+            write_checkpoint(min(unfinished) - 1 if unfinished else last_read[0])
+
+            finished = done['ok'] + done['failed']
+            elapsed = time.monotonic() - started
+            rate = finished / elapsed if elapsed else 0
+            self.stdout.write(
+                f'[{finished}/{total}] ok {done["ok"]}, failed {done["failed"]}, {rate:.1f} files/s, '
+                f'ETA {(total - finished) / rate if rate else 0:.0f}s'
+            )
+
+        def collect(activity_file, size, outcome):
+            try:
+                fields, recorded, parse_s = outcome()
+            except Exception as exc:
+                done['failed'] += 1
+                unfinished.discard(activity_file.pk)
+                self.stderr.write(f'  {activity_file.file} (pk={activity_file.pk}): {exc}')
+                return
+            for name, value in fields.items():
+                setattr(activity_file, name, value)
+            batch.append((activity_file, recorded, (size, parse_s)))
+            done['ok'] += 1
+            if len(batch) >= batch_size:
+                flush()
+
+        def read(activity_file):
+            unfinished.add(activity_file.pk)
+            last_read[0] = activity_file.pk
+            # Missing files and storage backend errors (S3 ClientError isn't an OSError) fail just this file
+            try:
+                with activity_file.file.open('rb') as f:
+                    return f.read()
+            except Exception as exc:
+                done['failed'] += 1
+                unfinished.discard(activity_file.pk)
+                self.stderr.write(f'  {activity_file.file} (pk={activity_file.pk}): cannot read: {exc}')
+                return None
+
+        files = files.only('pk', 'page_id', 'file', 'file_type', 'sort_order')
+        if workers == 1:
+            for activity_file in files.iterator(chunk_size=batch_size):
+                raw = read(activity_file)
+                if raw is None:
+                    continue
+                collect(activity_file, len(raw), lambda: _timed_parse(activity_file.file_type, raw))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = {}
+                for activity_file in files.iterator(chunk_size=batch_size):
+                    raw = read(activity_file)
+                    if raw is None:
+                        continue
+                    pending[pool.submit(_timed_parse, activity_file.file_type, raw)] = (activity_file, len(raw))
+                    if len(pending) >= workers * 4:
+                        completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in completed:
+                            collect(*pending.pop(future), future.result)
+                for future in list(pending):
+                    collect(*pending.pop(future), future.result)
+        flush()
+        if done['ok']:
+            bump_generation()
+        self.stdout.write(self.style.SUCCESS(f'Reprocessed {done["ok"]} file(s), {done["failed"]} failed.'))
@@ -0,0 +1,306 @@
+"""
+Merging a page's activity files into one chronological track.
+
+Files are ordered by their first timestamp. Files whose time ranges overlap are
+found with a sweep over the sorted intervals; for each overlapping pair a grid
+index over one track's points checks whether the other track follows the same
+path at the same time. Such files are duplicate recordings of the same activity
+(a watch and a phone, say) and are grouped.
+
+Within a group, every moment is taken from the best source recording it (denser
+sampling first, FIT before GPX): each source owns its time range minus the ranges
+of better sources, and the owned runs are merged by time. Groups are then chained
+in time order into one stitched LineString; a group that overlaps the chain in
+time without matching it (a different activity) becomes its own feature.
+
+Single-file groups keep the stats parsed from the file (the device's own totals);
+stats of multi-file groups are recomputed from the stitched points. Everything is
+O(n log n) over the total number of points.
+
+Files without per-point timestamps (GPX routes, files parsed before point times
+were stored) can't be placed in time and are appended as separate features with
+their own stats; files without positions only contribute their stats.
+"""
+
+import array
+import bisect
+import heapq
+import logging
+from dataclasses import dataclass, field
+
+from adventures import channels, elevation, geo
+
+logger = logging.getLogger(__name__)
+
+# A point of one track "matches" the other if a point of it lies within this
+# distance and time; a pair of tracks is a duplicate when most sampled points match.
+MATCH_DISTANCE_M = 60
+MATCH_TIME_S = 120
+DUPLICATE_FRACTION = 0.6
+MATCH_SAMPLES = 500
+
+# Consecutive stitched points further apart in time than this are a pause, not movement
+MOVING_MAX_GAP_S = 30
+MOVING_MIN_SPEED_MS = 0.5
+
+
+@dataclass
+class Track:
+    key: object
+    coords: list
+    # Epoch seconds per point, or None when the file has no timestamps
+    times: list | None
+    stats: dict
+    file_type: str = 'gpx'
+    order: int = 0
+    segments: list = field(default_factory=list)
+
+    @property
+    def start(self):
+        return self.times[0]
+
+    @property
+    def end(self):
+        return self.times[-1]
+
+    @property
+    def priority(self):
+        duration = max(self.end - self.start, 1)
+        return (len(self.times) / duration, self.file_type == 'fit', -self.order)
+
+
+def pack_times(point_times):
+    """(first timestamp, packed uint32 second offsets) or (None, None) if any point lacks a time."""
+    if not point_times or any(timestamp is None for timestamp in point_times):
+        return None, None
+    first = point_times[0]
+    offsets = [max(0, int(round((timestamp - first).total_seconds()))) for timestamp in point_times]
+    return first, channels.pack(array.array('I', offsets))
+
+
+def unpack_times(started_at, blob):
+    """Epoch seconds per point from ``pack_times`` output."""
+    if started_at is None or blob is None:
+        return None
+    base = started_at.timestamp()
+    return [base + offset for offset in channels.unpack('I', blob)]
+
+
+def overlapping_pairs(tracks):
+    """Index pairs of tracks whose time ranges overlap; ``tracks`` sorted by start."""
+    pairs = []
+    active = []  # heap of (end, index)
+    for index, track in enumerate(tracks):
+        while active and active[0][0] < track.start:
+            heapq.heappop(active)
+        pairs += [(other, index) for _, other in active]
+        heapq.heappush(active, (track.end, index))
+    return pairs
+
+
+def _window(track, start, end):
+    return bisect.bisect_left(track.times, start), bisect.bisect_right(track.times, end)
+
+
+def is_duplicate(a, b):
+    """Whether ``b`` follows ``a``'s path at the same time over their common time range."""
+    start, end = max(a.start, b.start), min(a.end, b.end)
+    a_lo, a_hi = _window(a, start, end)
+    b_lo, b_hi = _window(b, start, end)
+    if a_hi <= a_lo or b_hi <= b_lo:
+        return False
+
+    index = geo.GridIndex(cell_m=MATCH_DISTANCE_M, reference_lat=a.coords[a_lo][1])
+    for i in range(a_lo, a_hi):
+        index.add(a.coords[i][0], a.coords[i][1], a.times[i])
+
+    stride = max(1, (b_hi - b_lo) // MATCH_SAMPLES)
+    sampled = matched = 0
+    for i in range(b_lo, b_hi, stride):
+        sampled += 1
+        t = b.times[i]
+        if any(abs(other_t - t) <= MATCH_TIME_S for _, other_t in index.within(b.coords[i][0], b.coords[i][1], MATCH_DISTANCE_M)):
+            matched += 1
+    return matched >= sampled * DUPLICATE_FRACTION
+
+
+def _groups(tracks, pairs):
+    parent = list(range(len(tracks)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        parent[find(i)] = find(j)
+    groups = {}
+    for i in range(len(tracks)):
+        groups.setdefault(find(i), []).append(tracks[i])
+    return sorted(groups.values(), key=lambda group: min(track.start for track in group))
+
+
+def _subtract(interval, covered):
+    """Parts of ``interval`` not inside any of the sorted, disjoint ``covered`` intervals."""
+    start, end = interval
+    parts = []
+    for c_start, c_end in covered:
+        if c_end < start or c_start > end:
+            continue
+        if c_start > start:
+            parts.append((start, c_start))
+        start = max(start, c_end)
+    if start < end or (start == end and not parts and not covered):
+        parts.append((start, end))
+    return parts
+
+
+def _union(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _covered(t, covered):
+    return any(start <= t <= end for start, end in covered)
+
+
+def stitch_group(group):
+    """Points of a duplicate group as (times, coords), each moment from its best source."""
+    covered = []
+    runs = []
+    for track in sorted(group, key=lambda track: track.priority, reverse=True):
+        for start, end in _subtract((track.start, track.end), covered):
+            lo = bisect.bisect_left(track.times, start)
+            hi = bisect.bisect_right(track.times, end)
+            # Points exactly on a boundary belong to the better source
+            if lo < hi and _covered(track.times[lo], covered):
+                lo += 1
+            if lo < hi and _covered(track.times[hi - 1], covered):
+                hi -= 1
+            runs.append(zip(track.times[lo:hi], track.coords[lo:hi]))
+        covered = _union(covered + [(track.start, track.end)])
+    merged = list(heapq.merge(*runs, key=lambda point: point[0]))
+    return [t for t, _ in merged], [coord for _, coord in merged]
+
+
+def track_stats(times, coords):
+    """Stats recomputed from stitched points, in the same shape as parsed file stats."""
+    distance = moving_distance = moving_time = max_speed = 0.0
+    for (t1, c1), (t2, c2) in zip(zip(times, coords), zip(times[1:], coords[1:])):
+        step = geo.haversine_m(c1[0], c1[1], c2[0], c2[1])
+        distance += step
+        dt = t2 - t1
+        if 0 < dt <= MOVING_MAX_GAP_S and step / dt >= MOVING_MIN_SPEED_MS:
+            moving_time += dt
+            moving_distance += step
+            max_speed = max(max_speed, step / dt)
+    # Same hysteresis as DEM-corrected files; points without elevation are skipped
+    gain, loss = elevation.gain_loss([coord[2] for coord in coords])
+    # Cap at 22.2 m/s (80 km/h) to filter GPS artifacts, as for FIT sessions
+    max_speed = max_speed if max_speed <= 22.2 else 0
+    return {
+        'distance_km': round(distance / 1000, 3),
+        'elevation_gain_m': int(gain),
+        'elevation_loss_m': int(loss),
+        'elapsed_time_s': round(times[-1] - times[0], 1) if times else 0,
+        'moving_time_s': round(moving_time, 1),
+        'calories': None,
+        'avg_speed_kmh': round(moving_distance / moving_time * 3.6, 2) if moving_time else 0,
+        'max_speed_kmh': round(max_speed * 3.6, 2),
+    }
+
+
+def _group_stats(group, times, coords):
+    if len(group) == 1:
+        return group[0].stats
+    stats = track_stats(times, coords)
+    # The same activity recorded twice: keep one calorie figure rather than a sum
+    calories = [track.stats.get('calories') for track in group if track.stats.get('calories') is not None]
+    stats['calories'] = max(calories) if calories else None
+    return stats
+
+
+def _remap_segments(track, times, offset):
+    """``track``'s segments as offsets into a feature whose point times are ``times``."""
+    segments = []
+    for segment in track.segments:
+        if segment['end'] <= segment['start']:
+            continue
+        start_t = track.times[segment['start']]
+        end_t = track.times[segment['end'] - 1]
+        remapped = dict(
+            segment,
+            start=offset + bisect.bisect_left(times, start_t),
+            end=offset + bisect.bisect_right(times, end_t),
+            laps=[
+                dict(
+                    lap,
+                    start=offset + bisect.bisect_left(times, track.times[lap['start']]),
+                    end=offset + bisect.bisect_right(times, track.times[lap['end'] - 1]),
+                )
+                for lap in segment.get('laps', []) if lap['end'] > lap['start']
+            ],
+        )
+        segments.append(remapped)
+    return segments
+
+
+def _feature(coords, segments, sources):
+    properties = {'sources': sources}
+    if segments:
+        properties['segments'] = segments
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'LineString', 'coordinates': coords},
+        'properties': properties,
+    }
+
+
+def merge_tracks(tracks):
+    """
+    Merge tracks into (features, stats list).
+
+    Returns the GeoJSON features of the stitched track(s) and one stats dict per
+    stitched group or untimed file, ready for ``services.aggregate_stats``.
+    """
+    timed = sorted((track for track in tracks if track.times and track.coords), key=lambda track: track.start)
+    untimed = [track for track in tracks if not track.times or not track.coords]
+
+    pairs = [(i, j) for i, j in overlapping_pairs(timed) if is_duplicate(timed[i], timed[j])]
+    groups = _groups(timed, pairs)
+
+    features = []
+    stats_list = []
+    chain = None  # {'coords', 'segments', 'sources', 'end'}
+    for group in groups:
+        times, coords = stitch_group(group)
+        if not coords:
+            continue
+        stats_list.append(_group_stats(group, times, coords))
+        if chain is None or times[0] < chain['end']:
+            # First group, or a different activity recorded at the same time
+            chain = {'coords': [], 'segments': [], 'sources': [], 'end': times[-1]}
+            features.append(chain)
+        offset = len(chain['coords'])
+        primary = max(group, key=lambda track: track.priority)
+        chain['segments'] += _remap_segments(primary, times, offset)
+        chain['sources'] += [track.key for track in sorted(group, key=lambda track: track.start)]
+        chain['coords'] += coords
+        chain['end'] = times[-1]
+
+    features = [_feature(chain['coords'], chain['segments'], chain['sources']) for chain in features]
+    for track in untimed:
+        if track.coords:
+            features.append(_feature(track.coords, track.segments, [track.key]))
+        if track.stats:
+            stats_list.append(track.stats)
+
+    if pairs:
+        logger.info('Merged %d duplicate recording pair(s) across %d file(s)', len(pairs), len(tracks))
+    return features, stats_list
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0006_alter_adventurepage_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_type', models.CharField(max_length=3)),
+                ('status', models.CharField(choices=[('success', 'Success'), ('error', 'Error')], default='success', max_length=10)),
+                ('started_at', models.DateTimeField()),
+                ('bytes_read', models.BigIntegerField(blank=True, null=True)),
+                ('point_count', models.IntegerField(blank=True, null=True)),
+                ('download_s', models.FloatField(blank=True, null=True)),
+                ('parse_s', models.FloatField(blank=True, null=True)),
+                ('geojson_s', models.FloatField(blank=True, null=True)),
+                ('db_update_s', models.FloatField(blank=True, null=True)),
+                ('total_s', models.FloatField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('activity_file', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='processing_runs', to='adventures.activityfile')),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='processing_runs', to='adventures.adventurepage')),
+            ],
+            options={
+                'verbose_name': 'Processing Run',
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0007_processingrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adventurepage',
+            name='rollup_month',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='StatsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('activity_type', models.CharField(choices=[('hiking', 'Hiking'), ('cycling', 'Cycling'), ('running', 'Running'), ('skiing', 'Skiing'), ('climbing', 'Climbing'), ('kayaking', 'Kayaking'), ('sailing', 'Sailing'), ('other', 'Other')], max_length=20)),
+                ('adventure_count', models.PositiveIntegerField(default=0)),
+                ('distance_km', models.FloatField(default=0)),
+                ('elevation_gain_m', models.BigIntegerField(default=0)),
+                ('moving_time_s', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Stats Rollup',
+                'ordering': ['year', 'month', 'activity_type'],
+                'constraints': [models.UniqueConstraint(fields=('year', 'month', 'activity_type'), name='adventures_rollup_period_type')],
+            },
+        ),
+    ]
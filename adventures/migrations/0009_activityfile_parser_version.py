@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0008_statsrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activityfile',
+            name='parser_version',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0010_activityupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activityfile',
+            name='device',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='activityfile',
+            name='estimated_points',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='activityfile',
+            name='started_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0011_activityfile_sniffed_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorChannel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('heart_rate', 'Heart rate'), ('cadence', 'Cadence'), ('power', 'Power'), ('temperature', 'Temperature')], max_length=20)),
+                ('started_at', models.DateTimeField()),
+                ('sample_count', models.PositiveIntegerField()),
+                ('duration_s', models.PositiveIntegerField()),
+                ('times', models.BinaryField()),
+                ('values', models.BinaryField()),
+                ('min_value', models.FloatField()),
+                ('max_value', models.FloatField()),
+                ('avg_value', models.FloatField()),
+                ('summary', models.JSONField(default=list)),
+                ('activity_file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='channels', to='adventures.activityfile')),
+            ],
+            options={
+                'verbose_name': 'Sensor Channel',
+                'ordering': ['activity_file', 'channel'],
+                'constraints': [models.UniqueConstraint(fields=('activity_file', 'channel'), name='adventures_sensor_channel_per_file')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0012_sensorchannel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activityfile',
+            name='point_times',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
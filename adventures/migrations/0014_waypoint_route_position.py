@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0013_activityfile_point_times'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='waypoint',
+            name='route_distance_km',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='waypoint',
+            name='route_elevation_m',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='waypoint',
+            name='route_offset_m',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0014_waypoint_route_position'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell_count', models.PositiveIntegerField()),
+                ('signature', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='route_fingerprint', to='adventures.adventurepage')),
+            ],
+            options={
+                'verbose_name': 'Route Fingerprint',
+            },
+        ),
+        migrations.CreateModel(
+            name='RouteBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True)),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='route_buckets', to='adventures.adventurepage')),
+            ],
+            options={
+                'verbose_name': 'Route Bucket',
+                'constraints': [models.UniqueConstraint(fields=('page', 'key'), name='adventures_routebucket_page_key')],
+            },
+        ),
+    ]
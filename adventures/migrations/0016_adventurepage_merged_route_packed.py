@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0015_route_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adventurepage',
+            name='merged_route_packed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-18 19:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0016_adventurepage_merged_route_packed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageProcessingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requested_version', models.PositiveIntegerField(default=0)),
+                ('processed_version', models.PositiveIntegerField(default=0)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='processing_state', to='adventures.adventurepage')),
+            ],
+            options={
+                'verbose_name': 'Page Processing State',
+            },
+        ),
+    ]
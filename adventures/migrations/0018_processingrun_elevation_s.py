@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0017_pageprocessingstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingrun',
+            name='elevation_s',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.2 on 2026-10-18 23:24
+
+from django.db import migrations, models
+
+
+def copy_rollup_months(apps, schema_editor):
+    AdventurePage = apps.get_model('adventures', 'AdventurePage')
+    PageRollupMonth = apps.get_model('adventures', 'PageRollupMonth')
+    PageRollupMonth.objects.bulk_create(
+        PageRollupMonth(page_id=page_id, month=month)
+        for page_id, month in AdventurePage.objects.filter(rollup_month__isnull=False).values_list('pk', 'rollup_month')
+    )
+
+
+def copy_rollup_months_back(apps, schema_editor):
+    AdventurePage = apps.get_model('adventures', 'AdventurePage')
+    PageRollupMonth = apps.get_model('adventures', 'PageRollupMonth')
+    for page_id, month in PageRollupMonth.objects.values_list('page_id', 'month'):
+        AdventurePage.objects.filter(pk=page_id).update(rollup_month=month)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0018_processingrun_elevation_s'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageRollupMonth',
+            fields=[
+                ('page_id', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('month', models.DateField()),
+            ],
+            options={
+                'verbose_name': 'Page Rollup Month',
+            },
+        ),
+        migrations.RunPython(copy_rollup_months, reverse_code=copy_rollup_months_back),
+        migrations.RemoveField(
+            model_name='adventurepage',
+            name='rollup_month',
+        ),
+    ]
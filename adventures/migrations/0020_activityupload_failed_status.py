@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0019_page_rollup_month'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activityupload',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('complete', 'Complete'), ('aborted', 'Aborted'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+    ]
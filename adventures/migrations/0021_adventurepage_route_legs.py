@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-18 23:58
+
+from django.db import migrations, models
+
+
+def fill_route_summaries(apps, schema_editor):
+    # What services._process_page now stores for every page it processes
+    from adventures.services import encode_route, route_legs
+
+    AdventurePage = apps.get_model('adventures', 'AdventurePage')
+    pages = AdventurePage.objects.exclude(merged_route_geojson=None).only('merged_route_geojson', 'merged_route_packed')
+    for page in pages.iterator(chunk_size=100):
+        features = page.merged_route_geojson.get('features', [])
+        AdventurePage.objects.filter(pk=page.pk).update(
+            route_legs=route_legs(features),
+            merged_route_packed=page.merged_route_packed or encode_route(page.merged_route_geojson),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0020_activityupload_failed_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adventurepage',
+            name='route_legs',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_route_summaries, migrations.RunPython.noop),
+    ]
@@ -1,16 +1,24 @@
 import datetime
+import uuid
 
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.http import Http404
+from django.utils.functional import cached_property
 from modelcluster.contrib.taggit import ClusterTaggableManager
 from modelcluster.fields import ParentalKey
 from taggit.models import TaggedItemBase
 from wagtail.admin.panels import FieldPanel, InlinePanel, MultiFieldPanel
 from wagtail.blocks import RichTextBlock
+from wagtail.contrib.routable_page.models import RoutablePageMixin, path
 from wagtail.embeds.blocks import EmbedBlock
 from wagtail.fields import RichTextField, StreamField
 from wagtail.models import Orderable, Page
+from wagtail.search import index
 
-from blog.models import HeadingBlock, ImageBlock
+from adventures.forms import AdventurePageForm
+from blog.models import HeadingBlock, ImageBlock, TagCount
 
 
 class AdventurePageTag(TaggedItemBase):
@@ -31,6 +39,11 @@ class Waypoint(Orderable):
     description = models.CharField(max_length=500, blank=True)
     latitude = models.DecimalField(max_digits=9, decimal_places=6)
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    # Nearest point of the merged route, set by services.snap_waypoints; null when
+    # the waypoint is further than SNAP_MAX_DISTANCE_M from the route
+    route_distance_km = models.FloatField(null=True, blank=True, editable=False)
+    route_elevation_m = models.FloatField(null=True, blank=True, editable=False)
+    route_offset_m = models.FloatField(null=True, blank=True, editable=False)
 
     panels = [
         FieldPanel('name'),
@@ -39,6 +52,10 @@ class Waypoint(Orderable):
         FieldPanel('longitude'),
     ]
 
+    @property
+    def on_route(self):
+        return self.route_distance_km is not None
+
     def __str__(self):
         return self.name
 
@@ -59,8 +76,44 @@ class ActivityFile(Orderable):
     parsed_stats = models.JSONField(null=True, blank=True)
     route_geojson = models.JSONField(null=True, blank=True)
     processed_at = models.DateTimeField(null=True, blank=True)
+    # services.PARSER_VERSION that produced parsed_stats/route_geojson
+    parser_version = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    # Sniffed from the file header at upload time (see adventures.sniffing), then
+    # replaced by the first point's time when the file is parsed
+    started_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # uint32 seconds after started_at per route point, packed (see adventures.merge)
+    point_times = models.BinaryField(null=True, blank=True, editable=False)
+    device = models.CharField(max_length=255, blank=True, editable=False)
+    estimated_points = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    panels = [
+        FieldPanel('file'),
+        FieldPanel('started_at', read_only=True),
+        FieldPanel('device', read_only=True),
+        FieldPanel('estimated_points', read_only=True),
+    ]
+
+    def apply_sniff(self, result):
+        if result.file_type:
+            self.file_type = result.file_type
+        self.started_at = result.started_at
+        self.device = result.device
+        self.estimated_points = result.estimated_points
+        self._sniffed = True
+
+    def sniff(self):
+        from adventures.sniffing import read_head, sniff
 
-    panels = [FieldPanel('file')]
+        result = sniff(read_head(self.file), self.file.size)
+        self.apply_sniff(result)
+        return result
+
+    def clean(self):
+        super().clean()
+        if self.file and not getattr(self.file, '_committed', True):
+            result = self.sniff()
+            if not result.valid:
+                raise ValidationError({'file': result.error})
 
     def save(self, *args, **kwargs):
         if self.file and not self.pk:
@@ -69,13 +122,20 @@ class ActivityFile(Orderable):
                 ext = name.rsplit('.', 1)[-1].lower()
                 if ext in ('fit', 'gpx'):
                     self.file_type = ext
+            if not getattr(self, '_sniffed', False):
+                # Best effort: parsing fills in the start time later anyway. Storage
+                # backends raise their own errors (botocore's ClientError isn't an OSError)
+                try:
+                    self.sniff()
+                except Exception:
+                    pass
         super().save(*args, **kwargs)
 
     def __str__(self):
         return str(self.file)
 
 
-class AdventureIndexPage(Page):
+class AdventureIndexPage(RoutablePageMixin, Page):
     intro = RichTextField(blank=True)
 
     content_panels = Page.content_panels + [FieldPanel('intro')]
@@ -87,6 +147,28 @@ class AdventureIndexPage(Page):
         context['adventure_posts'] = AdventurePage.objects.child_of(self).live().order_by('-date_start')
         return context
 
+    @path('stats/')
+    def stats(self, request):
+        from adventures import rollups
+
+        year = request.GET.get('year')
+        return self.render(
+            request,
+            template='adventures/adventure_stats.html',
+            context_overrides=rollups.dashboard(int(year) if year and year.isdigit() else None),
+        )
+
+    @path('tags/<str:tag>/')
+    def tag_archive(self, request, tag):
+        active_tag = TagCount.objects.filter(section=TagCount.Section.ADVENTURES, slug=tag).first()
+        if active_tag is None:
+            raise Http404
+        adventures = AdventurePage.objects.child_of(self).live().filter(tags__slug=tag).order_by('-date_start')
+        return self.render(
+            request,
+            context_overrides={'adventure_posts': adventures, 'active_tag': active_tag},
+        )
+
     class Meta:
         verbose_name = 'Adventure Index Page'
 
@@ -127,6 +209,11 @@ class AdventurePage(Page):
     )
     computed_stats = models.JSONField(null=True, blank=True)
     merged_route_geojson = models.JSONField(null=True, blank=True)
+    # merged_route_geojson in services.encode_route's binary format, served as is
+    merged_route_packed = models.BinaryField(null=True, blank=True, editable=False)
+    # Per-leg stats of the merged route (see services.route_legs), so the page
+    # renders its legs table without the route geometry
+    route_legs = models.JSONField(null=True, blank=True, editable=False)
     body = StreamField([
         ('heading', HeadingBlock()),
         ('paragraph', RichTextBlock(
@@ -143,6 +230,14 @@ class AdventurePage(Page):
     ], blank=True, use_json_field=True)
     tags = ClusterTaggableManager(through=AdventurePageTag, blank=True)
 
+    search_fields = Page.search_fields + [
+        index.SearchField('location', boost=2),
+        index.SearchField('intro', boost=2),
+        index.SearchField('body'),
+        index.FilterField('date_start'),
+        index.FilterField('activity_type'),
+    ]
+
     @property
     def effective_distance_km(self):
         if self.distance_km is not None:
@@ -155,6 +250,43 @@ class AdventurePage(Page):
             return self.elevation_gain_m
         return self.computed_stats.get('elevation_gain_m') if self.computed_stats else None
 
+    @cached_property
+    def has_sensor_channels(self):
+        return SensorChannel.objects.filter(activity_file__page=self).exists()
+
+    @property
+    def has_route(self):
+        """Whether there is a route to draw; the page fetches it from ``route.bin``."""
+        return self.merged_route_packed is not None
+
+    @property
+    def legs(self):
+        """
+        Per-session breakdown of the route (multisport sessions, GPX tracks); empty
+        unless there is more than one leg or a leg has several laps.
+        """
+        legs = self.route_legs or []
+        if len(legs) > 1 or any(len(leg['laps']) > 1 for leg in legs):
+            return legs
+        return []
+
+    @cached_property
+    def similar_adventures(self):
+        """[(AdventurePage, similarity)] of other adventures on largely the same route."""
+        from adventures import similarity
+        return similarity.similar_pages(self)
+
+    @property
+    def waypoint_markers(self):
+        """Snapped waypoints as elevation chart markers, ordered along the route."""
+        return sorted(
+            (
+                {'name': waypoint.name, 'distance_km': waypoint.route_distance_km, 'elevation_m': waypoint.route_elevation_m}
+                for waypoint in self.waypoints.all() if waypoint.on_route
+            ),
+            key=lambda marker: marker['distance_km'],
+        )
+
     @property
     def date_display(self):
         start = self.date_start
@@ -183,9 +315,254 @@ class AdventurePage(Page):
         FieldPanel('body'),
     ]
 
+    base_form_class = AdventurePageForm
+
     parent_page_types = ['adventures.AdventureIndexPage']
     subpage_types = []
 
     class Meta:
         verbose_name = 'Adventure Post'
         ordering = ['-date_start']
+
+
+class PageProcessingState(models.Model):
+    """
+    Version stamps of a page's processing, kept outside the page so publishing an
+    older revision can't roll them back.
+
+    Every trigger bumps ``requested_version``; a run records the version it started
+    from in ``processed_version`` together with its results, so the page is up to
+    date when the two are equal (see ``services.process_adventure_files``).
+    """
+
+    page = models.OneToOneField(AdventurePage, on_delete=models.CASCADE, related_name='processing_state')
+    requested_version = models.PositiveIntegerField(default=0)
+    processed_version = models.PositiveIntegerField(default=0)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def outdated(self):
+        return self.processed_version < self.requested_version
+
+    def __str__(self):
+        return f'Page {self.page_id}: {self.processed_version}/{self.requested_version}'
+
+    class Meta:
+        verbose_name = 'Page Processing State'
+
+
+class ProcessingRun(models.Model):
+    """Timing, size and outcome of processing one activity file."""
+
+    class Status(models.TextChoices):
+        SUCCESS = 'success', 'Success'
+        ERROR = 'error', 'Error'
+
+    page = models.ForeignKey(
+        'adventures.AdventurePage',
+        related_name='processing_runs',
+        on_delete=models.CASCADE,
+    )
+    activity_file = models.ForeignKey(
+        'adventures.ActivityFile',
+        null=True, blank=True,
+        related_name='processing_runs',
+        on_delete=models.SET_NULL,
+    )
+    file_name = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=3)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.SUCCESS)
+    started_at = models.DateTimeField()
+    bytes_read = models.BigIntegerField(null=True, blank=True)
+    point_count = models.IntegerField(null=True, blank=True)
+    download_s = models.FloatField(null=True, blank=True)
+    parse_s = models.FloatField(null=True, blank=True)
+    elevation_s = models.FloatField(null=True, blank=True)
+    geojson_s = models.FloatField(null=True, blank=True)
+    db_update_s = models.FloatField(null=True, blank=True)
+    total_s = models.FloatField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f'{self.file_name} @ {self.started_at:%Y-%m-%d %H:%M:%S}'
+
+    class Meta:
+        ordering = ['-started_at']
+        verbose_name = 'Processing Run'
+
+
+class SensorChannel(models.Model):
+    """
+    One sensor channel of an activity file, stored as packed arrays.
+
+    ``times`` (uint32 seconds after ``started_at``) and ``values`` are little-endian
+    arrays of ``sample_count`` items; see ``adventures.channels``.
+    """
+
+    class Channel(models.TextChoices):
+        HEART_RATE = 'heart_rate', 'Heart rate'
+        CADENCE = 'cadence', 'Cadence'
+        POWER = 'power', 'Power'
+        TEMPERATURE = 'temperature', 'Temperature'
+
+    activity_file = models.ForeignKey(
+        'adventures.ActivityFile',
+        related_name='channels',
+        on_delete=models.CASCADE,
+    )
+    channel = models.CharField(max_length=20, choices=Channel.choices)
+    started_at = models.DateTimeField()
+    sample_count = models.PositiveIntegerField()
+    duration_s = models.PositiveIntegerField()
+    times = models.BinaryField()
+    values = models.BinaryField()
+    min_value = models.FloatField()
+    max_value = models.FloatField()
+    avg_value = models.FloatField()
+    # Downsampled [[t, min, avg, max, count], ...] over the whole recording
+    summary = models.JSONField(default=list)
+
+    def __str__(self):
+        return f'{self.activity_file} {self.channel}'
+
+    class Meta:
+        ordering = ['activity_file', 'channel']
+        constraints = [
+            models.UniqueConstraint(fields=['activity_file', 'channel'], name='adventures_sensor_channel_per_file'),
+        ]
+        verbose_name = 'Sensor Channel'
+
+
+class PageRollupMonth(models.Model):
+    """
+    The month whose ``StatsRollup`` rows last counted a page (see ``adventures.rollups``).
+
+    Kept outside the page so publishing a revision can't roll it back, and keyed
+    by the bare page ID rather than a foreign key so it outlives a deleted page
+    until that page's old month has been recomputed.
+    """
+
+    page_id = models.PositiveIntegerField(primary_key=True)
+    # First day of the month
+    month = models.DateField()
+
+    def __str__(self):
+        return f'Page {self.page_id}: {self.month:%Y-%m}'
+
+    class Meta:
+        verbose_name = 'Page Rollup Month'
+
+
+class StatsRollup(models.Model):
+    """
+    Totals of live adventures per (year, month, activity_type).
+
+    Maintained by ``adventures.rollups`` whenever a page is processed, published,
+    unpublished or deleted, so the stats dashboard reads a few rows instead of
+    every page's computed_stats.
+    """
+
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    activity_type = models.CharField(max_length=20, choices=AdventurePage.ActivityType.choices)
+    adventure_count = models.PositiveIntegerField(default=0)
+    distance_km = models.FloatField(default=0)
+    elevation_gain_m = models.BigIntegerField(default=0)
+    moving_time_s = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.year}-{self.month:02d} {self.activity_type}'
+
+    class Meta:
+        ordering = ['year', 'month', 'activity_type']
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'month', 'activity_type'], name='adventures_rollup_period_type'),
+        ]
+        verbose_name = 'Stats Rollup'
+
+
+class RouteFingerprint(models.Model):
+    """MinHash signature of a page's merged route, maintained by ``adventures.similarity``."""
+
+    page = models.OneToOneField(AdventurePage, on_delete=models.CASCADE, related_name='route_fingerprint')
+    cell_count = models.PositiveIntegerField()
+    # similarity.NUM_HASHES little-endian uint64 values
+    signature = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Fingerprint of page {self.page_id} ({self.cell_count} cells)'
+
+    class Meta:
+        verbose_name = 'Route Fingerprint'
+
+
+class RouteBucket(models.Model):
+    """One LSH band of a page's route fingerprint; pages sharing a key are similarity candidates."""
+
+    page = models.ForeignKey(AdventurePage, on_delete=models.CASCADE, related_name='route_buckets')
+    key = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f'{self.key} (page {self.page_id})'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['page', 'key'], name='adventures_routebucket_page_key'),
+        ]
+        verbose_name = 'Route Bucket'
+
+
+class ActivityUpload(models.Model):
+    """
+    A chunked upload of one activity file, assembled directly in storage.
+
+    Chunks are fixed-size and may arrive in any order or be retried; ``parts`` keeps
+    each received chunk's size and SHA-256 so an interrupted client can ask which
+    chunks are missing and resume.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        COMPLETE = 'complete', 'Complete'
+        ABORTED = 'aborted', 'Aborted'
+        FAILED = 'failed', 'Failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    page = models.ForeignKey('adventures.AdventurePage', on_delete=models.CASCADE, related_name='uploads')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    file_name = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=3)
+    total_size = models.BigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    storage_name = models.CharField(max_length=100)
+    # S3 multipart upload ID when the default storage is S3
+    multipart_id = models.CharField(max_length=255, blank=True)
+    # {"<index>": {"size": int, "sha256": str, "etag": str}}
+    parts = models.JSONField(default=dict)
+    sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    activity_file = models.ForeignKey(
+        'adventures.ActivityFile', null=True, blank=True, on_delete=models.SET_NULL, related_name='+',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+
+    def chunk_length(self, index):
+        if index == self.chunk_count - 1:
+            return self.total_size - index * self.chunk_size
+        return self.chunk_size
+
+    def missing_chunks(self):
+        return [index for index in range(self.chunk_count) if str(index) not in self.parts]
+
+    def __str__(self):
+        return f'{self.file_name} ({self.status})'
+
+    class Meta:
+        ordering = ['-created_at']
@@ -0,0 +1,158 @@
+"""
+Monthly adventure totals for the stats dashboard.
+
+Each live AdventurePage is counted in exactly one ``StatsRollup`` bucket, the
+month of its ``date_start``. ``refresh_page`` recomputes the bucket a page is in now
+and the one it was last counted in (``PageRollupMonth``), so moving a trip to
+another date, retyping it, unpublishing or deleting it keeps the totals exact
+without a full rebuild. Each recompute is one grouped query over a single month of
+pages.
+"""
+
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, FloatField, Sum
+from django.db.models.fields.json import KT
+from django.db.models.functions import Cast, Coalesce, TruncMonth
+
+
+def _month(date):
+    return date.replace(day=1) if date else None
+
+
+def recompute_month(month):
+    """Rebuild the StatsRollup rows for the month starting at ``month``."""
+    from adventures.models import AdventurePage, StatsRollup
+
+    # Manual overrides win over values computed from activity files, as on the page
+    totals = (
+        AdventurePage.objects.live()
+        .filter(date_start__year=month.year, date_start__month=month.month)
+        .values('activity_type')
+        .annotate(
+            adventure_count=Count('pk'),
+            distance_km=Sum(Coalesce(
+                Cast('distance_km', FloatField()),
+                Cast(KT('computed_stats__distance_km'), FloatField()),
+                0.0,
+            )),
+            elevation_gain_m=Sum(Coalesce(
+                Cast('elevation_gain_m', FloatField()),
+                Cast(KT('computed_stats__elevation_gain_m'), FloatField()),
+                0.0,
+            )),
+            moving_time_s=Sum(Coalesce(Cast(KT('computed_stats__moving_time_s'), FloatField()), 0.0)),
+        )
+        .order_by()
+    )
+    rows = [
+        StatsRollup(
+            year=month.year,
+            month=month.month,
+            activity_type=row['activity_type'],
+            adventure_count=row['adventure_count'],
+            distance_km=round(row['distance_km'], 3),
+            elevation_gain_m=int(row['elevation_gain_m']),
+            moving_time_s=round(row['moving_time_s'], 1),
+        )
+        for row in totals
+    ]
+    with transaction.atomic():
+        StatsRollup.objects.filter(year=month.year, month=month.month).delete()
+        StatsRollup.objects.bulk_create(rows)
+    return rows
+
+
+def refresh_page(page):
+    """Bring the rollups up to date after ``page`` changed; returns the months recomputed."""
+    from adventures.models import AdventurePage, PageRollupMonth
+
+    counted = PageRollupMonth.objects.filter(page_id=page.pk).values_list('month', flat=True).first()
+    date_start = AdventurePage.objects.filter(pk=page.pk).values_list('date_start', flat=True).first()
+    if date_start is None:
+        # Deleted: only the bucket it used to be counted in needs fixing
+        months = {counted} - {None}
+        PageRollupMonth.objects.filter(page_id=page.pk).delete()
+    else:
+        new_month = _month(date_start)
+        months = {new_month, counted} - {None}
+        if counted != new_month:
+            PageRollupMonth.objects.update_or_create(page_id=page.pk, defaults={'month': new_month})
+
+    for month in sorted(months):
+        recompute_month(month)
+    return months
+
+
+def rebuild_all():
+    """Recompute every month that has live adventures or existing rollup rows."""
+    from adventures.models import AdventurePage, PageRollupMonth, StatsRollup
+
+    months = {
+        _month(date)
+        for date in AdventurePage.objects.dates('date_start', 'month')
+    }
+    months |= {
+        datetime.date(year, month, 1)
+        for year, month in StatsRollup.objects.values_list('year', 'month').distinct()
+    }
+    with transaction.atomic():
+        PageRollupMonth.objects.all().delete()
+        PageRollupMonth.objects.bulk_create(
+            PageRollupMonth(page_id=page_id, month=month)
+            for page_id, month in AdventurePage.objects.values_list('pk', TruncMonth('date_start'))
+        )
+    for month in sorted(months):
+        recompute_month(month)
+    return months
+
+
+def dashboard(year=None):
+    """Chart data for the stats page, built from the rollup rows only."""
+    from adventures.models import AdventurePage, StatsRollup
+
+    rows = list(StatsRollup.objects.all())
+    labels = dict(AdventurePage.ActivityType.choices)
+
+    by_year = defaultdict(lambda: {'adventure_count': 0, 'distance_km': 0.0, 'elevation_gain_m': 0, 'moving_time_s': 0.0})
+    by_type = defaultdict(lambda: {'adventure_count': 0, 'distance_km': 0.0, 'elevation_gain_m': 0, 'moving_time_s': 0.0})
+    for row in rows:
+        for bucket in (by_year[row.year], by_type[row.activity_type]):
+            bucket['adventure_count'] += row.adventure_count
+            bucket['distance_km'] += row.distance_km
+            bucket['elevation_gain_m'] += row.elevation_gain_m
+            bucket['moving_time_s'] += row.moving_time_s
+
+    years = sorted(by_year)
+    if year not in by_year:
+        year = years[-1] if years else None
+
+    monthly = [0.0] * 12
+    for row in rows:
+        if row.year == year:
+            monthly[row.month - 1] += row.distance_km
+
+    return {
+        'totals': {
+            key: sum(bucket[key] for bucket in by_year.values())
+            for key in ('adventure_count', 'distance_km', 'elevation_gain_m', 'moving_time_s')
+        },
+        'years': years,
+        'selected_year': year,
+        'distance_by_year': _bars([(str(y), by_year[y]['distance_km']) for y in years]),
+        'elevation_by_type': _bars(sorted(
+            ((labels.get(t, t), by_type[t]['elevation_gain_m']) for t in by_type),
+            key=lambda item: item[1], reverse=True,
+        )),
+        'distance_by_month': _bars([
+            (datetime.date(2000, m, 1).strftime('%b'), monthly[m - 1]) for m in range(1, 13)
+        ]),
+    }
+
+
+def _bars(items):
+    """[(label, value)] -> [{'label', 'value', 'pct'}] scaled to the largest value."""
+    peak = max((value for _, value in items), default=0) or 1
+    return [{'label': label, 'value': value, 'pct': round(value / peak * 100, 1)} for label, value in items]
@@ -0,0 +1,18 @@
+"""
+Helpers for talking to S3 directly when the default storage is django-storages'
+S3Storage, for what the Storage API can't do (multipart uploads, ranged reads).
+"""
+
+
+def is_s3(storage):
+    return hasattr(storage, 'bucket') and hasattr(storage, 'bucket_name')
+
+
+def s3_client(storage):
+    return storage.connection.meta.client
+
+
+def s3_key(storage, name):
+    """Object key S3Storage._save would use for ``name``."""
+    from storages.utils import clean_name
+    return storage._normalize_name(clean_name(name))
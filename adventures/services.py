@@ -1,6 +1,22 @@
 """Parsing and aggregation logic for FIT/GPX activity files."""
 
+import bisect
+import datetime
 import io
+import json
+import logging
+import traceback
+
+from adventures import channels, elevation, geo, instrumentation, locks, merge, rollups, similarity
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever parsing or route building changes in a way that alters stored
+# results; reprocess_activities --outdated then picks up every older file.
+PARSER_VERSION = 6
+
+# Waypoints further than this from the route are not placed on it
+SNAP_MAX_DISTANCE_M = 500
 
 
 def _semicircles_to_degrees(semicircles):
@@ -14,16 +30,99 @@ def _get_fit_field(frame, field_name):
     return None
 
 
+def _fit_summary_stats(frame):
+    """Stats dict from a FIT session or lap message (both use the same field names)."""
+    elapsed = _get_fit_field(frame, 'total_elapsed_time') or 0
+    moving = _get_fit_field(frame, 'total_timer_time') or elapsed
+    max_speed = _get_fit_field(frame, 'max_speed') or 0
+    # Cap at 22.2 m/s (80 km/h) to filter GPS artifacts
+    if max_speed > 22.2:
+        max_speed = 0
+
+    return {
+        'distance_km': round((_get_fit_field(frame, 'total_distance') or 0) / 1000, 3),
+        'elevation_gain_m': int(_get_fit_field(frame, 'total_ascent') or 0),
+        'elevation_loss_m': int(_get_fit_field(frame, 'total_descent') or 0),
+        'elapsed_time_s': round(float(elapsed), 1),
+        'moving_time_s': round(float(moving), 1),
+        'calories': int(_get_fit_field(frame, 'total_calories') or 0),
+        'avg_speed_kmh': round((_get_fit_field(frame, 'avg_speed') or 0) * 3.6, 2),
+        'max_speed_kmh': round(float(max_speed) * 3.6, 2),
+    }
+
+
+def _fit_summary(frame):
+    """Session/lap summary: time bounds, sport and stats; offsets are resolved later."""
+    end = _get_fit_field(frame, 'timestamp')
+    start = _get_fit_field(frame, 'start_time')
+    if start is None and end is not None:
+        start = end - datetime.timedelta(seconds=float(_get_fit_field(frame, 'total_elapsed_time') or 0))
+    sport = _get_fit_field(frame, 'sport')
+    return {
+        'sport': str(sport) if sport is not None else '',
+        'started_at': start,
+        'ended_at': end,
+        'stats': _fit_summary_stats(frame),
+    }
+
+
+def _point_range(point_times, started_at, ended_at):
+    """[start, end) offsets of the points recorded between two timestamps."""
+    if started_at is None or ended_at is None or not point_times or point_times[0] is None:
+        return 0, len(point_times)
+    return bisect.bisect_left(point_times, started_at), bisect.bisect_right(point_times, ended_at)
+
+
+def _by_start(summary):
+    return summary['started_at'] is None, summary['started_at'] or 0
+
+
+def build_fit_segments(sessions, laps, point_times):
+    """
+    Turn FIT session and lap summaries into segments indexing the point array.
+
+    Each session becomes ``{'sport', 'started_at', 'start', 'end', 'stats', 'laps'}``
+    where ``start``/``end`` are offsets into the file's coordinates; its laps (those
+    starting inside it) carry their own offsets and stats.
+    """
+    segments = []
+    for session in sorted(sessions, key=_by_start):
+        start, end = _point_range(point_times, session['started_at'], session['ended_at'])
+        segments.append({
+            'sport': session['sport'],
+            'started_at': session['started_at'].isoformat() if session['started_at'] else None,
+            'start': start,
+            'end': end,
+            'stats': session['stats'],
+            'laps': [],
+        })
+    for lap in sorted(laps, key=_by_start):
+        start, end = _point_range(point_times, lap['started_at'], lap['ended_at'])
+        owner = next(
+            (segment for segment in reversed(segments) if segment['start'] <= start), segments[0] if segments else None,
+        )
+        if owner is not None:
+            owner['laps'].append({'start': start, 'end': end, 'stats': lap['stats']})
+    return segments
+
+
 def parse_fit_file(file_obj):
     """
     Parse a FIT file-like object.
 
-    Returns {'stats': {...}, 'gps_points': [[lon, lat, elevation], ...]}
+    Returns {'stats': {...}, 'gps_points': [[lon, lat, elevation|None], ...], 'point_times': [...],
+    'segments': [...], 'channels': {...}, 'started_at': datetime|None}. Multisport
+    files have one segment per session; their stats are summed into the file's
+    stats. Sensor samples are collected by ``channels.ChannelRecorder``.
     """
     import fitdecode
 
     gps_points = []
-    session_stats = None
+    point_times = []
+    sessions = []
+    laps = []
+    started_at = None
+    recorder = channels.ChannelRecorder()
 
     with fitdecode.FitReader(file_obj) as fit:
         for frame in fit:
@@ -31,55 +130,102 @@ def parse_fit_file(file_obj):
                 continue
 
             if frame.name == 'record':
+                timestamp = _get_fit_field(frame, 'timestamp')
+                # Sensor samples are kept even from records without a position fix
+                for name in channels.CHANNELS:
+                    recorder.add(timestamp, name, _get_fit_field(frame, name))
+
                 lat = _get_fit_field(frame, 'position_lat')
                 lon = _get_fit_field(frame, 'position_long')
                 if lat is None or lon is None:
                     continue
+                if started_at is None:
+                    started_at = timestamp
 
                 elevation = _get_fit_field(frame, 'enhanced_altitude')
                 if elevation is None:
-                    elevation = _get_fit_field(frame, 'altitude') or 0.0
+                    elevation = _get_fit_field(frame, 'altitude')
 
                 gps_points.append([
                     round(_semicircles_to_degrees(lon), 7),
                     round(_semicircles_to_degrees(lat), 7),
-                    round(float(elevation), 1),
+                    round(float(elevation), 1) if elevation is not None else None,
                 ])
+                # Records without a timestamp inherit the previous one so offsets stay monotonic
+                point_times.append(timestamp or (point_times[-1] if point_times else None))
 
             elif frame.name == 'session':
-                elapsed = _get_fit_field(frame, 'total_elapsed_time') or 0
-                moving = _get_fit_field(frame, 'total_timer_time') or elapsed
-                max_speed = _get_fit_field(frame, 'max_speed') or 0
-                # Cap at 22.2 m/s (80 km/h) to filter GPS artifacts
-                if max_speed > 22.2:
-                    max_speed = 0
-
-                session_stats = {
-                    'distance_km': round((_get_fit_field(frame, 'total_distance') or 0) / 1000, 3),
-                    'elevation_gain_m': int(_get_fit_field(frame, 'total_ascent') or 0),
-                    'elevation_loss_m': int(_get_fit_field(frame, 'total_descent') or 0),
-                    'elapsed_time_s': round(float(elapsed), 1),
-                    'moving_time_s': round(float(moving), 1),
-                    'calories': int(_get_fit_field(frame, 'total_calories') or 0),
-                    'avg_speed_kmh': round((_get_fit_field(frame, 'avg_speed') or 0) * 3.6, 2),
-                    'max_speed_kmh': round(float(max_speed) * 3.6, 2),
-                }
-
-    if session_stats is None:
+                sessions.append(_fit_summary(frame))
+            elif frame.name == 'lap':
+                laps.append(_fit_summary(frame))
+
+    if not sessions:
         session_stats = {
             'distance_km': 0, 'elevation_gain_m': 0, 'elevation_loss_m': 0,
             'elapsed_time_s': 0, 'moving_time_s': 0, 'calories': 0,
             'avg_speed_kmh': 0, 'max_speed_kmh': 0,
         }
+    elif len(sessions) == 1:
+        session_stats = sessions[0]['stats']
+    else:
+        session_stats = aggregate_stats([session['stats'] for session in sessions])
+
+    if point_times and point_times[0] is None:
+        # Leading records without a timestamp take the first one that follows
+        first = next((timestamp for timestamp in point_times if timestamp is not None), None)
+        point_times = [first if timestamp is None else timestamp for timestamp in point_times]
+
+    return {
+        'stats': session_stats,
+        'gps_points': gps_points,
+        'point_times': point_times,
+        'segments': build_fit_segments(sessions, laps, point_times),
+        'channels': recorder.result(),
+        'started_at': started_at,
+    }
+
+
+def _gpx_stats(moving_data, uphill_downhill, elapsed_time_s):
+    distance_km = round((moving_data.moving_distance if moving_data else 0) / 1000, 3)
+    moving_time_s = round(float(moving_data.moving_time if moving_data else 0), 1)
+
+    avg_speed_kmh = 0.0
+    if moving_time_s > 0:
+        avg_speed_kmh = round(distance_km / moving_time_s * 3600, 2)
 
-    return {'stats': session_stats, 'gps_points': gps_points}
+    return {
+        'distance_km': distance_km,
+        'elevation_gain_m': int(uphill_downhill.uphill if uphill_downhill else 0),
+        'elevation_loss_m': int(uphill_downhill.downhill if uphill_downhill else 0),
+        'elapsed_time_s': round(elapsed_time_s, 1),
+        'moving_time_s': moving_time_s,
+        'calories': None,
+        'avg_speed_kmh': avg_speed_kmh,
+        'max_speed_kmh': 0.0,
+    }
+
+
+def _record_gpx_extensions(recorder, point):
+    for extension in point.extensions:
+        for element in extension.iter():
+            name = channels.GPX_EXTENSION_CHANNELS.get(element.tag.rsplit('}', 1)[-1].lower())
+            if name is None or not element.text:
+                continue
+            try:
+                value = float(element.text)
+            except ValueError:
+                continue
+            recorder.add(point.time, name, value)
 
 
 def parse_gpx_file(file_obj):
     """
     Parse a GPX file-like object.
 
-    Returns {'stats': {...}, 'gps_points': [[lon, lat, elevation], ...]}
+    Returns {'stats': {...}, 'gps_points': [[lon, lat, elevation|None], ...], 'point_times': [...],
+    'segments': [...], 'channels': {...}, 'started_at': datetime|None}, with one
+    segment per track. Heart rate, cadence, power and temperature are read from
+    track point extensions (Garmin TrackPointExtension and similar).
     """
     import gpxpy
 
@@ -89,58 +235,109 @@ def parse_gpx_file(file_obj):
     gpx = gpxpy.parse(content)
 
     gps_points = []
+    point_times = []
+    track_ranges = []
+    recorder = channels.ChannelRecorder()
     for track in gpx.tracks:
+        start = len(gps_points)
         for segment in track.segments:
             for point in segment.points:
                 gps_points.append([
                     round(point.longitude, 7),
                     round(point.latitude, 7),
-                    round(float(point.elevation or 0), 1),
+                    round(float(point.elevation), 1) if point.elevation is not None else None,
                 ])
-
-    moving_data = gpx.get_moving_data()
-    uphill_downhill = gpx.get_uphill_downhill()
-
-    distance_km = round((moving_data.moving_distance if moving_data else 0) / 1000, 3)
-    moving_time_s = round(float(moving_data.moving_time if moving_data else 0), 1)
+                point_times.append(point.time)
+                if point.extensions:
+                    _record_gpx_extensions(recorder, point)
+        track_ranges.append((track, start, len(gps_points)))
 
     elapsed_time_s = 0.0
     for track in gpx.tracks:
         td = track.get_duration()
         if td:
             elapsed_time_s += td
-
-    avg_speed_kmh = 0.0
-    if moving_time_s > 0:
-        avg_speed_kmh = round(distance_km / moving_time_s * 3600, 2)
+    stats = _gpx_stats(gpx.get_moving_data(), gpx.get_uphill_downhill(), elapsed_time_s)
+
+    segments = []
+    for track, start, end in track_ranges:
+        if start == end:
+            continue
+        track_stats = stats if len(track_ranges) == 1 else _gpx_stats(
+            track.get_moving_data(), track.get_uphill_downhill(), float(track.get_duration() or 0),
+        )
+        track_start = track.get_time_bounds().start_time
+        segments.append({
+            'sport': track.type or '',
+            'started_at': track_start.isoformat() if track_start else None,
+            'start': start,
+            'end': end,
+            'stats': track_stats,
+            'laps': [],
+        })
 
     return {
-        'stats': {
-            'distance_km': distance_km,
-            'elevation_gain_m': int(uphill_downhill.uphill if uphill_downhill else 0),
-            'elevation_loss_m': int(uphill_downhill.downhill if uphill_downhill else 0),
-            'elapsed_time_s': round(elapsed_time_s, 1),
-            'moving_time_s': moving_time_s,
-            'calories': None,
-            'avg_speed_kmh': avg_speed_kmh,
-            'max_speed_kmh': 0.0,
-        },
+        'stats': stats,
         'gps_points': gps_points,
+        'point_times': point_times,
+        'segments': segments,
+        'channels': recorder.result(),
+        'started_at': gpx.get_time_bounds().start_time,
     }
 
 
-def build_geojson_linestring(gps_points):
-    """Build a GeoJSON LineString Feature from [[lon, lat, elev], ...] coords."""
+def build_geojson_linestring(gps_points, segments=None):
+    """
+    Build a GeoJSON LineString Feature from [[lon, lat, elev], ...] coords.
+
+    ``segments`` (sessions/laps as point offsets, see ``build_fit_segments``) are kept
+    in the feature's properties so legs can be shown without re-parsing.
+    """
     return {
         'type': 'Feature',
         'geometry': {
             'type': 'LineString',
             'coordinates': gps_points,
         },
-        'properties': {},
+        'properties': {'segments': segments} if segments else {},
     }
 
 
+def activity_fields(result):
+    """ActivityFile field values for a parse result: stats, route and packed point times."""
+    times_started_at, point_times = merge.pack_times(result['point_times'])
+    return {
+        'parsed_stats': result['stats'],
+        'route_geojson': build_geojson_linestring(result['gps_points'], result['segments']),
+        'started_at': times_started_at or result['started_at'],
+        'point_times': point_times,
+    }
+
+
+def parse_activity_bytes(file_type, raw):
+    """
+    Parse raw FIT/GPX bytes into (ActivityFile field values, sensor channels).
+
+    Pure function of its input (and the DEM tiles on disk, see
+    ``adventures.elevation``), so it can run in worker processes.
+    """
+    if file_type == 'fit':
+        result = parse_fit_file(io.BytesIO(raw))
+    else:
+        result = parse_gpx_file(io.BytesIO(raw))
+    elevation.correct(result, file_type)
+    return activity_fields(result), result['channels']
+
+
+def route_legs(features):
+    """Legs of a merged route: the segments stored with each feature, tagged with its index."""
+    return [
+        dict(segment, file_index=index)
+        for index, feature in enumerate(features)
+        for segment in (feature.get('properties') or {}).get('segments', [])
+    ]
+
+
 def merge_geojson_features(features):
     """Wrap a list of GeoJSON Features in a FeatureCollection."""
     return {
@@ -149,6 +346,113 @@ def merge_geojson_features(features):
     }
 
 
+# Packed route format (see encode_route): magic, then varints
+PACKED_ROUTE_MAGIC = b'NBR2'
+# Coordinates are stored in 1e-6 degrees (~0.1 m) and elevations in decimetres
+PACKED_COORD_SCALE = 1_000_000
+PACKED_ELEVATION_SCALE = 10
+
+
+def _write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value):
+    return (value << 1) if value >= 0 else ((-value << 1) - 1)
+
+
+def _write_zigzag(out, value):
+    _write_varint(out, _zigzag(value))
+
+
+def encode_route(route_geojson):
+    """
+    Pack a route FeatureCollection into a compact binary blob.
+
+    Layout: ``PACKED_ROUTE_MAGIC``, then unsigned LEB128 varints: the coordinate
+    and elevation scales, the feature count, and per feature the length of its
+    properties as UTF-8 JSON, those bytes, the point count and, per point, the
+    zigzag-encoded deltas of lon and lat from the previous point and the elevation:
+    0 for none, otherwise one more than the zigzag-encoded delta from the last
+    point that had one. Lossy to ~0.1 m; a 1 Hz track packs into 3-5 bytes per
+    point instead of ~35 bytes of JSON.
+    """
+    out = bytearray(PACKED_ROUTE_MAGIC)
+    features = (route_geojson or {}).get('features', [])
+    _write_varint(out, PACKED_COORD_SCALE)
+    _write_varint(out, PACKED_ELEVATION_SCALE)
+    _write_varint(out, len(features))
+    for feature in features:
+        properties = feature.get('properties') or {}
+        encoded = json.dumps(properties, separators=(',', ':')).encode() if properties else b''
+        _write_varint(out, len(encoded))
+        out += encoded
+        coords = (feature.get('geometry') or {}).get('coordinates') or []
+        _write_varint(out, len(coords))
+        last_lon = last_lat = last_ele = 0
+        for lon, lat, *rest in coords:
+            lon = round(lon * PACKED_COORD_SCALE)
+            lat = round(lat * PACKED_COORD_SCALE)
+            _write_zigzag(out, lon - last_lon)
+            _write_zigzag(out, lat - last_lat)
+            last_lon, last_lat = lon, lat
+            if not rest or rest[0] is None:
+                out.append(0)
+                continue
+            ele = round(rest[0] * PACKED_ELEVATION_SCALE)
+            _write_varint(out, _zigzag(ele - last_ele) + 1)
+            last_ele = ele
+    return bytes(out)
+
+
+def decode_route(blob):
+    """Inverse of ``encode_route``: the route FeatureCollection, coordinates rounded to the packed precision."""
+    data = bytes(blob)
+    if not data.startswith(PACKED_ROUTE_MAGIC):
+        raise ValueError('Not a packed route')
+    position = len(PACKED_ROUTE_MAGIC)
+
+    def varint():
+        nonlocal position
+        value = shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def unzigzag(value):
+        return (value >> 1) ^ -(value & 1)
+
+    coord_scale = varint()
+    elevation_scale = varint()
+    features = []
+    for _ in range(varint()):
+        length = varint()
+        properties = json.loads(data[position:position + length]) if length else {}
+        position += length
+        coords = []
+        lon = lat = ele = 0
+        for _ in range(varint()):
+            lon += unzigzag(varint())
+            lat += unzigzag(varint())
+            packed_ele = varint()
+            if packed_ele:
+                ele += unzigzag(packed_ele - 1)
+            coords.append([
+                round(lon / coord_scale, 7), round(lat / coord_scale, 7),
+                round(ele / elevation_scale, 1) if packed_ele else None,
+            ])
+        features.append(build_geojson_linestring(coords))
+        features[-1]['properties'] = properties
+    return merge_geojson_features(features)
+
+
 def aggregate_stats(stats_list):
     """Aggregate a list of per-file stats dicts into totals."""
     total_distance_km = sum(s.get('distance_km') or 0 for s in stats_list)
@@ -178,50 +482,222 @@ def aggregate_stats(stats_list):
     }
 
 
-def process_adventure_files(adventure_page):
+def _process_activity_file(activity_file):
     """
-    Process all activity files for an AdventurePage.
+    Parse one activity file and store its stats and route.
 
-    - Parses unprocessed files, saves per-file results.
-    - Aggregates stats across all files.
-    - Updates adventure_page.computed_stats and merged_route_geojson via queryset
-      update to avoid re-triggering the publish signal.
+    Every attempt is recorded as a ProcessingRun with per-stage timings; errors are
+    captured on the run and logged instead of propagating, so one bad file does not
+    stop the rest of the page from being processed.
     """
     from django.utils import timezone
-    from adventures.models import ActivityFile, AdventurePage as AP
-
-    all_stats = []
-    all_features = []
+    from adventures.models import ActivityFile, ProcessingRun
+
+    timer = instrumentation.StageTimer(file_type=activity_file.file_type)
+    run = ProcessingRun(
+        page_id=activity_file.page_id,
+        activity_file=activity_file,
+        file_name=str(activity_file.file)[:255],
+        file_type=activity_file.file_type,
+        started_at=timezone.now(),
+    )
 
-    for activity_file in adventure_page.activity_files.all().order_by('sort_order'):
-        if activity_file.processed_at is None:
+    try:
+        with timer.stage('download'):
             with activity_file.file.open('rb') as f:
                 raw = f.read()
+        run.bytes_read = len(raw)
 
+        with timer.stage('parse'):
             if activity_file.file_type == 'fit':
                 result = parse_fit_file(io.BytesIO(raw))
             else:
                 result = parse_gpx_file(io.BytesIO(raw))
+        run.point_count = len(result['gps_points'])
 
-            feature = build_geojson_linestring(result['gps_points'])
+        with timer.stage('elevation'):
+            elevation.correct(result, activity_file.file_type)
 
+        with timer.stage('geojson'):
+            fields = activity_fields(result)
+
+        with timer.stage('db_update'):
             ActivityFile.objects.filter(pk=activity_file.pk).update(
-                parsed_stats=result['stats'],
-                route_geojson=feature,
+                **fields,
                 processed_at=timezone.now(),
+                parser_version=PARSER_VERSION,
             )
-            activity_file.parsed_stats = result['stats']
-            activity_file.route_geojson = feature
+            channels.store_channels([(activity_file, result['channels'])])
+        for name, value in fields.items():
+            setattr(activity_file, name, value)
+    except Exception:
+        logger.exception('Processing activity file %s (pk=%s) failed', activity_file.file, activity_file.pk)
+        run.status = ProcessingRun.Status.ERROR
+        run.error = traceback.format_exc()
+
+    run.download_s = timer.timings.get('download')
+    run.parse_s = timer.timings.get('parse')
+    run.elevation_s = timer.timings.get('elevation')
+    run.geojson_s = timer.timings.get('geojson')
+    run.db_update_s = timer.timings.get('db_update')
+    run.total_s = timer.total
+    run.save()
+
+    instrumentation.files_processed().labels(file_type=run.file_type, status=run.status).inc()
+    if run.bytes_read:
+        instrumentation.bytes_read().labels(file_type=run.file_type).inc(run.bytes_read)
+    if run.point_count:
+        instrumentation.points_parsed().labels(file_type=run.file_type).inc(run.point_count)
+    return run
+
+
+def snap_waypoints(adventure_page, route_geojson=None):
+    """
+    Store each waypoint's distance along the page's merged route and the route's
+    elevation there, from its nearest route point (see ``geo.snap_points``).
+
+    ``route_geojson`` defaults to the page's stored merged route. Returns the
+    number of waypoints placed on the route.
+    """
+    from adventures.models import Waypoint
+
+    if route_geojson is None:
+        route_geojson = adventure_page.merged_route_geojson
+    waypoints = list(Waypoint.objects.filter(page_id=adventure_page.pk))
+    if not waypoints:
+        return 0
+    profile = geo.route_profile((route_geojson or {}).get('features', []))
+    snapped = geo.snap_points(
+        profile,
+        [(float(waypoint.longitude), float(waypoint.latitude)) for waypoint in waypoints],
+        SNAP_MAX_DISTANCE_M,
+    )
+    for waypoint, found in zip(waypoints, snapped):
+        if found is None:
+            waypoint.route_distance_km = waypoint.route_elevation_m = waypoint.route_offset_m = None
+            continue
+        (_, _, elevation, distance_km), offset_m = found
+        waypoint.route_distance_km = round(distance_km, 3)
+        waypoint.route_elevation_m = elevation
+        waypoint.route_offset_m = round(offset_m, 1)
+    Waypoint.objects.bulk_update(waypoints, ['route_distance_km', 'route_elevation_m', 'route_offset_m'])
+    return sum(1 for found in snapped if found is not None)
+
+
+def request_processing(page_id):
+    """Record that a page needs processing; returns the requested version."""
+    from django.db.models import F
+    from adventures.models import PageProcessingState
+
+    PageProcessingState.objects.get_or_create(page_id=page_id)
+    PageProcessingState.objects.filter(page_id=page_id).update(requested_version=F('requested_version') + 1)
+    return PageProcessingState.objects.values_list('requested_version', flat=True).get(page_id=page_id)
+
+
+def _pending_version(page_id):
+    """The requested version if the page is behind it, else None."""
+    from adventures.models import PageProcessingState
+
+    state = PageProcessingState.objects.filter(page_id=page_id).first()
+    return state.requested_version if state is not None and state.outdated else None
+
+
+def process_adventure_files(adventure_page):
+    """
+    Bring an AdventurePage's processed data up to date.
+
+    Every call is a processing request (see ``PageProcessingState``); whoever holds
+    the page's lock (``adventures.locks``) runs ``_process_page`` until no request
+    is left, so concurrent and repeated triggers coalesce into as few runs as
+    possible and never interleave. A caller that finds the lock taken returns
+    straight away: the holder picks up its request.
+
+    Returns whether this call ran the processing.
+    """
+    request_processing(adventure_page.pk)
+    ran = False
+    while True:
+        with locks.page_lock(adventure_page.pk) as acquired:
+            if not acquired:
+                return ran
+            while (version := _pending_version(adventure_page.pk)) is not None:
+                _process_page(adventure_page, version)
+                ran = True
+        # A request made while the lock was being released found it still taken
+        if _pending_version(adventure_page.pk) is None:
+            return ran
+
+
+def _process_page(adventure_page, version):
+    """
+    Process all activity files for an AdventurePage, as of requested ``version``.
+
+    - Parses unprocessed files, saves per-file results and a ProcessingRun each.
+    - Merges the files into one chronological track, collapsing duplicate
+      recordings of the same activity (see ``adventures.merge``), and aggregates
+      stats over the merged result.
+    - In one transaction, so readers see either the old results or the new ones:
+      updates adventure_page.computed_stats and merged_route_geojson (plus its
+      packed encoding and leg summaries) via queryset update to avoid re-triggering the publish
+      signal, snaps the page's waypoints to the merged route, fingerprints the
+      route for similar-adventure lookups (see ``adventures.similarity``),
+      refreshes the monthly StatsRollup rows the page counts towards and stamps
+      ``version`` as processed.
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from adventures.models import AdventurePage as AP, PageProcessingState
+
+    tracks = []
+
+    for activity_file in adventure_page.activity_files.all().order_by('sort_order'):
+        if activity_file.processed_at is None:
+            _process_activity_file(activity_file)
+
+        if activity_file.parsed_stats or activity_file.route_geojson:
+            feature = activity_file.route_geojson or {}
+            tracks.append(merge.Track(
+                key=activity_file.pk,
+                coords=(feature.get('geometry') or {}).get('coordinates') or [],
+                times=merge.unpack_times(activity_file.started_at, activity_file.point_times),
+                stats=activity_file.parsed_stats,
+                file_type=activity_file.file_type,
+                order=activity_file.sort_order or 0,
+                segments=(feature.get('properties') or {}).get('segments', []),
+            ))
+
+    timer = instrumentation.StageTimer()
+    with timer.stage('aggregate'):
+        features, all_stats = merge.merge_tracks(tracks)
+        aggregated = aggregate_stats(all_stats) if all_stats else None
+        merged = merge_geojson_features(features) if features else None
+        packed = encode_route(merged) if merged else None
+
+    with transaction.atomic():
+        with timer.stage('page_update'):
+            AP.objects.filter(pk=adventure_page.pk).update(
+                computed_stats=aggregated,
+                merged_route_geojson=merged,
+                merged_route_packed=packed,
+                route_legs=route_legs(features),
+            )
+
+        with timer.stage('waypoints'):
+            snap_waypoints(adventure_page, merged)
 
-        if activity_file.parsed_stats:
-            all_stats.append(activity_file.parsed_stats)
-        if activity_file.route_geojson:
-            all_features.append(activity_file.route_geojson)
+        with timer.stage('fingerprint'):
+            similarity.index_page(adventure_page, merged)
 
-    aggregated = aggregate_stats(all_stats) if all_stats else None
-    merged = merge_geojson_features(all_features) if all_features else None
+        with timer.stage('rollup'):
+            rollups.refresh_page(adventure_page)
 
-    AP.objects.filter(pk=adventure_page.pk).update(
-        computed_stats=aggregated,
-        merged_route_geojson=merged,
+        PageProcessingState.objects.filter(page_id=adventure_page.pk).update(
+            processed_version=version,
+            processed_at=timezone.now(),
+        )
+    logger.info(
+        'Processed adventure page %s (version %d): %d file(s), aggregate %.3fs, page update %.3fs, '
+        'waypoints %.3fs, fingerprint %.3fs, rollup %.3fs',
+        adventure_page.pk, version, len(tracks), timer.timings['aggregate'], timer.timings['page_update'],
+        timer.timings['waypoints'], timer.timings['fingerprint'], timer.timings['rollup'],
     )
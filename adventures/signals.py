@@ -1,16 +1,55 @@
+import logging
 import threading
 
-from adventures import services
+from django.db import close_old_connections, connection
+
+from adventures import rollups, services
+
+logger = logging.getLogger(__name__)
+
+
+def _process_in_background(instance):
+    close_old_connections()
+    try:
+        if not services.process_adventure_files(instance):
+            # Coalesced into a run already in progress, which does the rest
+            return
+        # Stats changed after the publish-time cache bump and export; redo both
+        from django.conf import settings
+        from nicolabeirer import static_export
+        from nicolabeirer.page_cache import bump_generation
+        bump_generation()
+        if settings.STATIC_EXPORT_ENABLED:
+            static_export.export_for_page(instance)
+    except Exception:
+        logger.exception('Background processing of adventure page %s failed', instance.pk)
+    finally:
+        # Threads get their own connection; release it (or return it to the pool)
+        # rather than leaking one per publish.
+        connection.close()
+
+
+def process_in_background(page):
+    """Process a page (see ``services.process_adventure_files``) on a background thread."""
+    t = threading.Thread(
+        target=_process_in_background,
+        args=(page,),
+        daemon=True,
+    )
+    t.start()
 
 
 def process_activity_files_on_publish(sender, instance, **kwargs):
     from adventures.models import AdventurePage
     if not isinstance(instance, AdventurePage):
         return
-    if instance.activity_files.filter(processed_at__isnull=True).exists():
-        t = threading.Thread(
-            target=services.process_adventure_files,
-            args=(instance,),
-            daemon=True,
-        )
-        t.start()
+    # Always reprocess: new files may need parsing, waypoints or dates may have
+    # changed, and the published revision may carry stale computed stats. Files
+    # already parsed are not parsed again, and overlapping publishes coalesce.
+    process_in_background(instance)
+
+
+def refresh_rollups(sender, instance, **kwargs):
+    from adventures.models import AdventurePage
+    if isinstance(instance, AdventurePage):
+        rollups.refresh_page(instance)
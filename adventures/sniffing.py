@@ -0,0 +1,199 @@
+"""
+Fast validation and metadata sniffing of activity files.
+
+Only the first ``SNIFF_BYTES`` of a file are read, so this runs at upload time
+(admin form validation, the first chunk of a chunked upload, archive imports)
+instead of waiting for the full parse after publishing:
+
+- FIT: the 12/14-byte header is checked (size, ``.FIT`` signature, header CRC and
+  declared data size against the file size), then the messages inside the head are
+  decoded for the device (``file_id`` manufacturer/product) and start time.
+- GPX: the root element must be ``<gpx>``; its ``creator`` attribute is the device
+  and the first ``<time>`` inside a track point (or the metadata) is the start time.
+
+The point count is estimated by extrapolating the records seen in the head over
+the whole file; it is exact when the file fits in the head.
+"""
+
+import io
+import struct
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+
+from django.utils.dateparse import parse_datetime
+
+from adventures.s3 import is_s3, s3_client, s3_key
+
+SNIFF_BYTES = 64 * 1024
+
+FIT_SIGNATURE = b'.FIT'
+# Trailing file CRC after the data records
+FIT_CRC_SIZE = 2
+
+
+@dataclass
+class SniffResult:
+    file_type: str = ''
+    started_at: object = None
+    device: str = ''
+    estimated_points: int | None = None
+    error: str = ''
+
+    @property
+    def valid(self):
+        return not self.error
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _fit_field(frame, name):
+    if frame.has_field(name):
+        return frame.get_value(name, fallback=None)
+    return None
+
+
+def sniff_fit(head, total_size=None):
+    import fitdecode
+    from fitdecode.utils import compute_crc
+
+    result = SniffResult(file_type='fit')
+    if len(head) < 12:
+        result.error = 'File is too short to be a FIT file'
+        return result
+    header_size, _, _, data_size, signature = struct.unpack('<BBHI4s', head[:12])
+    if header_size not in (12, 14) or signature != FIT_SIGNATURE:
+        result.error = 'Not a FIT file (missing .FIT header)'
+        return result
+    if header_size == 14:
+        if len(head) < 14:
+            result.error = 'FIT header is truncated'
+            return result
+        (header_crc,) = struct.unpack('<H', head[12:14])
+        # A zero header CRC means "not computed" per the FIT protocol
+        if header_crc and header_crc != compute_crc(head[:12]):
+            result.error = 'FIT header CRC does not match'
+            return result
+    if total_size is not None and total_size < header_size + data_size:
+        result.error = (
+            f'FIT file is truncated: header declares {data_size} data bytes, '
+            f'file has {max(0, total_size - header_size - FIT_CRC_SIZE)}'
+        )
+        return result
+
+    records = 0
+    record_time = created = manufacturer = product = None
+    complete = total_size is not None and len(head) >= total_size
+    try:
+        reader = fitdecode.FitReader(
+            io.BytesIO(head),
+            check_crc=fitdecode.CrcCheck.RAISE if complete else fitdecode.CrcCheck.DISABLED,
+        )
+        with reader as fit:
+            for frame in fit:
+                if not isinstance(frame, fitdecode.FitDataMessage):
+                    continue
+                if frame.name == 'file_id':
+                    created = _fit_field(frame, 'time_created')
+                    manufacturer = _fit_field(frame, 'manufacturer')
+                    product = _fit_field(frame, 'garmin_product') or _fit_field(frame, 'product')
+                elif frame.name == 'record':
+                    records += 1
+                    if record_time is None:
+                        record_time = _fit_field(frame, 'timestamp')
+    except fitdecode.FitEOFError:
+        # Expected: the head usually ends mid-message
+        complete = False
+    except fitdecode.FitError as exc:
+        result.error = f'Invalid FIT data: {exc}'
+        return result
+
+    result.started_at = record_time or created
+    result.device = ' '.join(str(part) for part in (manufacturer, product) if part not in (None, ''))[:255]
+    if complete:
+        result.estimated_points = records
+    elif records:
+        read = max(1, len(head) - header_size)
+        result.estimated_points = int(records * data_size / read)
+    return result
+
+
+def sniff_gpx(head, total_size=None):
+    result = SniffResult(file_type='gpx')
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    root = None
+    points = 0
+    in_point = False
+    metadata_time = point_time = None
+    try:
+        parser.feed(head)
+        for event, element in parser.read_events():
+            name = _local_name(element.tag)
+            if root is None:
+                root = element
+                if name != 'gpx':
+                    result.error = f'Not a GPX file (root element is <{name}>)'
+                    return result
+                result.device = (element.get('creator') or '')[:255]
+                continue
+            if event == 'start':
+                if name in ('trkpt', 'rtept'):
+                    points += 1
+                    in_point = True
+                continue
+            if name in ('trkpt', 'rtept'):
+                in_point = False
+            elif name == 'time' and element.text:
+                if in_point and point_time is None:
+                    point_time = parse_datetime(element.text.strip())
+                elif not in_point and metadata_time is None:
+                    metadata_time = parse_datetime(element.text.strip())
+            element.clear()
+    except ET.ParseError as exc:
+        result.error = f'Invalid GPX: {exc}'
+        return result
+    except ValueError:
+        # Unparseable <time>; leave the start time empty
+        pass
+
+    if root is None:
+        result.error = 'Not a GPX file (no root element)'
+        return result
+    result.started_at = point_time or metadata_time
+    complete = total_size is None or len(head) >= total_size
+    if complete or not points:
+        result.estimated_points = points
+    else:
+        first = max(0, head.find(b'<trkpt'))
+        result.estimated_points = int(points * (total_size - first) / max(1, len(head) - first))
+    return result
+
+
+def sniff(head, total_size=None):
+    """Identify and validate an activity file from its first bytes."""
+    if len(head) >= 12 and head[8:12] == FIT_SIGNATURE:
+        return sniff_fit(head, total_size)
+    stripped = head.lstrip(b'\xef\xbb\xbf \t\r\n')
+    if stripped.startswith(b'<'):
+        return sniff_gpx(head, total_size)
+    return SniffResult(error='Not a FIT or GPX file')
+
+
+def read_head(field_file, size=SNIFF_BYTES):
+    """First ``size`` bytes of a FieldFile, committed to storage or freshly uploaded."""
+    if not getattr(field_file, '_committed', True):
+        upload = field_file.file
+        upload.seek(0)
+        head = upload.read(size)
+        upload.seek(0)
+        return head
+    storage = field_file.storage
+    if is_s3(storage):
+        # Ranged GET: S3File would download the whole object on first read
+        response = s3_client(storage).get_object(
+            Bucket=storage.bucket_name, Key=s3_key(storage, field_file.name), Range=f'bytes=0-{size - 1}',
+        )
+        return response['Body'].read()
+    with storage.open(field_file.name, 'rb') as f:
+        return f.read(size)
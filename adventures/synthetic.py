@@ -0,0 +1,237 @@
+"""Synthetic FIT/GPX corpus generation for benchmarks."""
+
+import datetime
+import math
+import random
+import struct
+
+# FIT timestamps count seconds from 1989-12-31T00:00:00Z
+FIT_EPOCH = datetime.datetime(1989, 12, 31, tzinfo=datetime.timezone.utc)
+
+_FIT_ENUM = 0x00
+_FIT_SINT8 = 0x01
+_FIT_UINT8 = 0x02
+_FIT_UINT16 = 0x84
+_FIT_SINT32 = 0x85
+_FIT_UINT32 = 0x86
+
+# (field number, size, base type) per message, in the order values are packed
+_FILE_ID_FIELDS = [(0, 1, _FIT_UINT8), (4, 4, _FIT_UINT32)]
+_RECORD_FIELDS = [
+    (253, 4, _FIT_UINT32),  # timestamp
+    (0, 4, _FIT_SINT32),    # position_lat
+    (1, 4, _FIT_SINT32),    # position_long
+    (2, 2, _FIT_UINT16),    # altitude, scale 5 offset 500
+]
+_SENSOR_FIELDS = [
+    (3, 1, _FIT_UINT8),     # heart_rate
+    (4, 1, _FIT_UINT8),     # cadence
+    (7, 2, _FIT_UINT16),    # power
+    (13, 1, _FIT_SINT8),    # temperature
+]
+_SESSION_FIELDS = [
+    (253, 4, _FIT_UINT32),  # timestamp
+    (2, 4, _FIT_UINT32),    # start_time
+    (7, 4, _FIT_UINT32),    # total_elapsed_time, scale 1000
+    (8, 4, _FIT_UINT32),    # total_timer_time, scale 1000
+    (9, 4, _FIT_UINT32),    # total_distance, scale 100
+    (11, 2, _FIT_UINT16),   # total_calories
+    (14, 2, _FIT_UINT16),   # avg_speed, scale 1000
+    (15, 2, _FIT_UINT16),   # max_speed, scale 1000
+    (22, 2, _FIT_UINT16),   # total_ascent
+    (23, 2, _FIT_UINT16),   # total_descent
+    (5, 1, _FIT_ENUM),      # sport
+]
+# Same stats as a session; lap field numbers differ
+_LAP_FIELDS = [
+    (253, 4, _FIT_UINT32),  # timestamp
+    (2, 4, _FIT_UINT32),    # start_time
+    (7, 4, _FIT_UINT32),    # total_elapsed_time, scale 1000
+    (8, 4, _FIT_UINT32),    # total_timer_time, scale 1000
+    (9, 4, _FIT_UINT32),    # total_distance, scale 100
+    (11, 2, _FIT_UINT16),   # total_calories
+    (13, 2, _FIT_UINT16),   # avg_speed, scale 1000
+    (14, 2, _FIT_UINT16),   # max_speed, scale 1000
+    (21, 2, _FIT_UINT16),   # total_ascent
+    (22, 2, _FIT_UINT16),   # total_descent
+    (25, 1, _FIT_ENUM),     # sport
+]
+# FIT sport enum values used for multisport files: running, cycling, swimming
+_SPORTS = [1, 2, 5]
+
+
+def _haversine_m(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+
+def generate_track(n_points, seed=0, start=None):
+    """
+    Generate a deterministic random-walk track.
+
+    Returns [(datetime, lat, lon, elevation), ...] sampled once per second.
+    """
+    rng = random.Random(seed)
+    start = start or datetime.datetime(2024, 6, 1, 8, 0, tzinfo=datetime.timezone.utc)
+    lat, lon, elevation = 47.6, -121.5, 400.0
+    heading = rng.uniform(0, 2 * math.pi)
+    points = []
+    for i in range(n_points):
+        points.append((start + datetime.timedelta(seconds=i), lat, lon, elevation))
+        heading += rng.gauss(0, 0.15)
+        step = rng.uniform(0.8, 1.6) / 111320  # ~1.2 m/s walking pace, in degrees
+        lat += step * math.cos(heading)
+        lon += step * math.sin(heading) / math.cos(math.radians(lat))
+        elevation = max(0.0, elevation + math.sin(i / 600) * 0.3 + rng.gauss(0, 0.2))
+    return points
+
+
+def track_summary(points):
+    """Distance/ascent/descent/duration totals for a generated track."""
+    distance = ascent = descent = 0.0
+    for (_, lat1, lon1, ele1), (_, lat2, lon2, ele2) in zip(points, points[1:]):
+        distance += _haversine_m(lat1, lon1, lat2, lon2)
+        if ele2 > ele1:
+            ascent += ele2 - ele1
+        else:
+            descent += ele1 - ele2
+    duration = (points[-1][0] - points[0][0]).total_seconds() if points else 0
+    return {
+        'distance_m': distance,
+        'ascent_m': ascent,
+        'descent_m': descent,
+        'duration_s': duration,
+    }
+
+
+def _fit_timestamp(dt):
+    return int((dt - FIT_EPOCH).total_seconds())
+
+
+def _fit_degrees_to_semicircles(degrees):
+    return int(round(degrees * (2**31 / 180)))
+
+
+def _fit_definition(local_type, global_num, fields):
+    header = struct.pack('<BBBHB', 0x40 | local_type, 0, 0, global_num, len(fields))
+    return header + b''.join(struct.pack('<BBB', *field) for field in fields)
+
+
+def _split(items, parts):
+    """Split ``items`` into ``parts`` contiguous, near-equal, non-empty chunks."""
+    parts = max(1, min(parts, len(items))) if items else 1
+    size, extra = divmod(len(items), parts)
+    chunks, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+def _pack_summary(local_type, points, sport):
+    summary = track_summary(points)
+    duration = summary['duration_s']
+    avg_speed = summary['distance_m'] / duration if duration else 0
+    return struct.pack(
+        '<BIIIIIHHHHHB',
+        local_type,
+        _fit_timestamp(points[-1][0]) if points else 0,
+        _fit_timestamp(points[0][0]) if points else 0,
+        int(duration * 1000),
+        int(duration * 1000),
+        int(summary['distance_m'] * 100),
+        min(int(summary['distance_m'] / 20), 0xFFFE),
+        int(avg_speed * 1000),
+        int(avg_speed * 1.5 * 1000),
+        min(int(summary['ascent_m']), 0xFFFE),
+        min(int(summary['descent_m']), 0xFFFE),
+        sport,
+    )
+
+
+def sensor_sample(i):
+    """Deterministic (heart rate, cadence, power, temperature) for the i-th point."""
+    return (
+        int(130 + 25 * math.sin(i / 300)),
+        int(80 + 10 * math.sin(i / 45)),
+        int(180 + 60 * math.sin(i / 120)),
+        round(18 - i / 1800),
+    )
+
+
+def build_fit_bytes(points, sessions=1, laps_per_session=1, sensors=False):
+    """
+    Encode a generated track as a FIT activity file.
+
+    The track is split evenly into ``sessions`` (a multisport file when more than
+    one, cycling through running/cycling/swimming), each with ``laps_per_session``
+    laps; lap and session messages follow the records they summarise. With
+    ``sensors``, every record also carries heart rate, cadence, power and temperature.
+    """
+    from fitdecode.utils import compute_crc
+
+    body = bytearray()
+    body += _fit_definition(0, 0, _FILE_ID_FIELDS)
+    body += struct.pack('<BBI', 0, 4, _fit_timestamp(points[0][0]) if points else 0)
+
+    body += _fit_definition(1, 20, _RECORD_FIELDS + (_SENSOR_FIELDS if sensors else []))
+    body += _fit_definition(2, 18, _SESSION_FIELDS)
+    body += _fit_definition(3, 19, _LAP_FIELDS)
+    pack_record = struct.Struct('<BIiiH').pack
+    pack_sensors = struct.Struct('<BBHb').pack
+    number = 0
+    for index, session_points in enumerate(_split(points, sessions)):
+        sport = _SPORTS[index % len(_SPORTS)] if sessions > 1 else 0
+        for lap_points in _split(session_points, laps_per_session):
+            for dt, lat, lon, elevation in lap_points:
+                body += pack_record(
+                    1,
+                    _fit_timestamp(dt),
+                    _fit_degrees_to_semicircles(lat),
+                    _fit_degrees_to_semicircles(lon),
+                    int(round((elevation + 500) * 5)),
+                )
+                if sensors:
+                    body += pack_sensors(*sensor_sample(number))
+                number += 1
+            body += _pack_summary(3, lap_points, sport)
+        body += _pack_summary(2, session_points, sport)
+
+    header = bytearray(struct.pack('<BBHI4s', 14, 0x20, 2132, len(body), b'.FIT'))
+    header += struct.pack('<H', compute_crc(header))
+    data = header + body
+    data += struct.pack('<H', compute_crc(data))
+    return bytes(data)
+
+
+def build_gpx_bytes(points, sensors=False):
+    """
+    Encode a generated track as a single-segment GPX 1.1 document.
+
+    With ``sensors``, points carry Garmin TrackPointExtension heart rate, cadence
+    and temperature plus a power element, as Garmin and Strava exports do.
+    """
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<gpx version="1.1" creator="nicolabeirer-synthetic" xmlns="http://www.topografix.com/GPX/1/1" '
+        'xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">\n'
+        '<trk><name>synthetic</name><trkseg>\n'
+    ]
+    for i, (dt, lat, lon, elevation) in enumerate(points):
+        extensions = ''
+        if sensors:
+            hr, cadence, power, temperature = sensor_sample(i)
+            extensions = (
+                f'<extensions><power>{power}</power><gpxtpx:TrackPointExtension><gpxtpx:atemp>{temperature}</gpxtpx:atemp>'
+                f'<gpxtpx:hr>{hr}</gpxtpx:hr><gpxtpx:cad>{cadence}</gpxtpx:cad></gpxtpx:TrackPointExtension></extensions>'
+            )
+        parts.append(
+            f'<trkpt lat="{lat:.7f}" lon="{lon:.7f}"><ele>{elevation:.1f}</ele>'
+            f'<time>{dt.strftime("%Y-%m-%dT%H:%M:%SZ")}</time>{extensions}</trkpt>\n'
+        )
+    parts.append('</trkseg></trk>\n</gpx>\n')
+    return ''.join(parts).encode('utf-8')
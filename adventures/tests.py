@@ -1,3 +1,537 @@
-from django.test import TestCase
+import array
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import re
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from wagtail.models import Page, Site
+
+from adventures import channels, elevation, geo, merge, services, similarity, synthetic, uploads
+from adventures.models import (
+    ActivityFile, ActivityUpload, AdventureIndexPage, AdventurePage, PageRollupMonth, SensorChannel, StatsRollup,
+)
+
+
+class MediaTestCase(TestCase):
+    """Runs with MEDIA_ROOT in a temporary directory and an adventure index page."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = Path(media.name)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.index_page = Page.objects.get(depth=1).add_child(
+            instance=AdventureIndexPage(title='Adventures', slug='adventures'),
+        )
+
+
+class ImportActivityArchiveTests(MediaTestCase):
+    def _archive(self, members):
+        path = self.media_root / 'export.zip'
+        with zipfile.ZipFile(path, 'w') as archive:
+            for name, data in members.items():
+                archive.writestr(name, data)
+        return str(path)
+
+    def test_unreadable_entry_is_reported_and_skipped(self):
+        gpx = synthetic.build_gpx_bytes(synthetic.generate_track(60))
+        path = self._archive({
+            'activities/good.gpx.gz': gzip.compress(gpx),
+            'activities/broken.gpx.gz': gzip.compress(gpx)[:40],
+        })
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_activity_archive', path, workers=1, stdout=stdout, stderr=stderr)
+
+        self.assertIn('broken.gpx.gz: cannot read', stderr.getvalue())
+        self.assertIn('imported 1, failed 1', stdout.getvalue())
+        self.assertEqual(ActivityFile.objects.count(), 1)
+
+    def test_hand_made_page_on_the_same_day_is_not_reused(self):
+        hand_made = self.index_page.add_child(instance=AdventurePage(
+            title='Birthday hike', slug='birthday-hike', date_start=datetime.date(2024, 6, 1),
+        ))
+        track = synthetic.generate_track(60)
+        call_command(
+            'import_activity_archive', self._archive({'morning.gpx': synthetic.build_gpx_bytes(track)}),
+            workers=1, stdout=io.StringIO(),
+        )
+        later = synthetic.generate_track(60, start=datetime.datetime(2024, 6, 1, 17, tzinfo=datetime.timezone.utc))
+        call_command(
+            'import_activity_archive', self._archive({'evening.gpx': synthetic.build_gpx_bytes(later)}),
+            workers=1, stdout=io.StringIO(),
+        )
+
+        self.assertFalse(hand_made.activity_files.exists())
+        imported = AdventurePage.objects.exclude(pk=hand_made.pk).get(date_start=datetime.date(2024, 6, 1))
+        self.assertEqual(imported.activity_files.count(), 2)
+        self.assertEqual(imported.slug, '2024-06-01')
+
+
+class ReprocessActivitiesTests(MediaTestCase):
+    def test_unreadable_file_is_counted_as_failed(self):
+        page = self.index_page.add_child(instance=AdventurePage(title='Walk', slug='walk'))
+        gpx = synthetic.build_gpx_bytes(synthetic.generate_track(60))
+        ActivityFile.objects.create(page=page, file=ContentFile(gpx, name='walk.gpx'), file_type='gpx')
+        missing = ActivityFile.objects.create(page=page, file=ContentFile(gpx, name='gone.gpx'), file_type='gpx')
+        missing.file.storage.delete(missing.file.name)
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        checkpoint = self.media_root / 'checkpoint.json'
+        # Refreshing the page's totals afterwards logs the missing file too
+        with self.assertLogs('adventures.services', level='ERROR'):
+            call_command(
+                'reprocess_activities', workers=1, checkpoint=str(checkpoint), stdout=stdout, stderr=stderr,
+            )
+
+        self.assertIn(f'(pk={missing.pk}): cannot read', stderr.getvalue())
+        self.assertIn('Reprocessed 1 file(s), 1 failed.', stdout.getvalue())
+        missing.refresh_from_db()
+        self.assertIsNone(missing.processed_at)
+
+
+class ChannelSeriesTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.page = self.index_page.add_child(instance=AdventurePage(title='Ride', slug='ride'))
+        activity_file = ActivityFile.objects.create(
+            page=self.page, file=ContentFile(b'', name='ride.fit'), file_type='fit',
+        )
+        times = array.array('I', range(1000))
+        values = array.array('B', (t % 200 for t in times))
+        SensorChannel.objects.create(
+            activity_file=activity_file,
+            channel='heart_rate',
+            started_at=datetime.datetime(2024, 5, 1, 8, tzinfo=datetime.timezone.utc),
+            sample_count=len(times),
+            duration_s=times[-1],
+            times=channels.pack(times),
+            values=channels.pack(values),
+            min_value=min(values),
+            max_value=max(values),
+            avg_value=round(sum(values) / len(values), 1),
+            summary=channels.bucketize(times, values, 0, times[-1], channels.SUMMARY_BUCKETS),
+        )
+        self.url = reverse('adventure_channel_series', args=[self.page.pk, 'heart_rate'])
+
+    def test_zoomed_range_decodes_only_the_values_inside_it(self):
+        with mock.patch('adventures.channels.unpack', wraps=channels.unpack) as unpack:
+            response = self.client.get(self.url, {'start': 100, 'end': 199, 'buckets': 10})
+
+        series = response.json()
+        self.assertEqual((series['start_s'], series['end_s']), (100, 199))
+        self.assertEqual(len(series['buckets']), 10)
+        self.assertEqual(series['buckets'][0], [104.5, 100, 104.5, 109, 10])
+        self.assertEqual(sum(bucket[4] for bucket in series['buckets']), 100)
+        value_blobs = [call.args[1] for call in unpack.call_args_list if call.args[0] == 'B']
+        self.assertEqual([len(blob) for blob in value_blobs], [100])
+
+    def test_full_range_is_built_from_summaries(self):
+        with mock.patch('adventures.channels.unpack', wraps=channels.unpack) as unpack:
+            response = self.client.get(self.url)
+
+        series = response.json()
+        self.assertEqual(sum(bucket[4] for bucket in series['buckets']), 1000)
+        unpack.assert_not_called()
+
+
+@override_settings(ACTIVITY_UPLOAD_CHUNK_SIZE=1024)
+class ChunkedUploadTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.page = self.index_page.add_child(instance=AdventurePage(title='Walk', slug='walk'))
+        self.data = synthetic.build_gpx_bytes(synthetic.generate_track(30))
+        self.upload = uploads.start_upload(self.page, 'walk.gpx', len(self.data))
+
+    def _chunk(self, index):
+        return self.data[index * 1024:(index + 1) * 1024]
+
+    def test_chunks_in_any_order_assemble_the_file(self):
+        for index in reversed(range(self.upload.chunk_count)):
+            chunk = self._chunk(index)
+            uploads.write_chunk(self.upload, index, io.BytesIO(chunk), hashlib.sha256(chunk).hexdigest())
+        upload = uploads.complete_upload(self.upload)
+
+        with upload.activity_file.file.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_oversized_chunk_leaves_the_next_chunk_alone(self):
+        uploads.write_chunk(self.upload, 1, io.BytesIO(self._chunk(1)))
+        with self.assertRaisesMessage(uploads.UploadError, 'Expected 1024 bytes'):
+            uploads.write_chunk(self.upload, 0, io.BytesIO(self._chunk(0) + b'\xff' * 100))
+        uploads.write_chunk(self.upload, 0, io.BytesIO(self._chunk(0)))
+        for index in range(2, self.upload.chunk_count):
+            uploads.write_chunk(self.upload, index, io.BytesIO(self._chunk(index)))
+        upload = uploads.complete_upload(self.upload)
+
+        with upload.activity_file.file.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_rejected_chunk_is_not_recorded(self):
+        with self.assertRaisesMessage(uploads.UploadError, 'SHA-256 does not match'):
+            uploads.write_chunk(self.upload, 1, io.BytesIO(self._chunk(1)), '0' * 64)
+        with self.assertRaisesMessage(uploads.UploadError, 'Expected 1024 bytes'):
+            uploads.write_chunk(self.upload, 1, io.BytesIO(self._chunk(1)[:-1]))
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.parts, {})
+
+    def test_storage_error_reading_the_assembled_file_fails_the_upload(self):
+        for index in range(self.upload.chunk_count):
+            uploads.write_chunk(self.upload, index, io.BytesIO(self._chunk(index)))
+        # Stands in for botocore's ClientError, which isn't an OSError
+        storage_error = type('ClientError', (Exception,), {})
+        with mock.patch.object(ActivityFile, 'sniff', side_effect=storage_error('GetObject: 503')):
+            with self.assertLogs('adventures.uploads', level='ERROR'):
+                with self.assertRaisesMessage(uploads.UploadError, 'could not be read back'):
+                    uploads.complete_upload(self.upload)
+
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.status, ActivityUpload.Status.FAILED)
+        self.assertFalse(ActivityFile.objects.exists())
+        with self.assertRaisesMessage(uploads.UploadError, 'Upload is failed'):
+            uploads.complete_upload(self.upload)
+
+    def test_first_chunk_is_sniffed(self):
+        with self.assertRaises(uploads.UploadError):
+            uploads.write_chunk(self.upload, 0, io.BytesIO(b'\0' * 1024))
+
+
+def write_hgt_tile(directory, name, rows):
+    """Write an SRTM tile from rows of heights, north row first."""
+    samples = array.array('h', [height for row in rows for height in row])
+    if sys.byteorder == 'little':
+        samples.byteswap()
+    with open(Path(directory) / name, 'wb') as f:
+        f.write(samples.tobytes())
+
+
+class ElevationTests(TestCase):
+    def setUp(self):
+        tiles = tempfile.TemporaryDirectory()
+        self.addCleanup(tiles.cleanup)
+        self.tile_dir = tiles.name
+        # 3×3 samples: 100 per row southwards, 10 per column eastwards
+        write_hgt_tile(self.tile_dir, 'N47W122.hgt', [[100 * row + 10 * col for col in range(3)] for row in range(3)])
+
+    def test_tile_name(self):
+        self.assertEqual(elevation.tile_name(-121.5, 47.6), 'N47W122.hgt')
+        self.assertEqual(elevation.tile_name(8.2, -33.9), 'S34E008.hgt')
+        self.assertEqual(elevation.tile_name(0.0, 0.0), 'N00E000.hgt')
+
+    def test_bilinear_interpolation(self):
+        tile = elevation.HgtTile(Path(self.tile_dir) / 'N47W122.hgt')
+        self.assertAlmostEqual(tile.elevation(-121.5, 47.5), 110)
+        self.assertAlmostEqual(tile.elevation(-121.5, 47.75), 60)
+        self.assertAlmostEqual(tile.elevation(-121.75, 47.5), 105)
+        # The north-west corner of the tile is its first sample
+        self.assertAlmostEqual(tile.elevation(-122.0, 47.999999), 0, places=3)
+
+    def test_voids_are_skipped_or_none(self):
+        write_hgt_tile(self.tile_dir, 'N10E010.hgt', [[elevation.VOID, 20], [elevation.VOID, elevation.VOID]])
+        tile = elevation.HgtTile(Path(self.tile_dir) / 'N10E010.hgt')
+        self.assertAlmostEqual(tile.elevation(10.5, 10.5), 20)
+        write_hgt_tile(self.tile_dir, 'N11E010.hgt', [[elevation.VOID] * 2] * 2)
+        tile = elevation.HgtTile(Path(self.tile_dir) / 'N11E010.hgt')
+        self.assertIsNone(tile.elevation(10.5, 11.5))
+
+    def test_not_a_tile(self):
+        path = Path(self.tile_dir) / 'N00E000.hgt'
+        path.write_bytes(b'\0' * 6)
+        with self.assertRaises(ValueError):
+            elevation.HgtTile(path)
+
+    def test_dem_elevations_without_a_tile(self):
+        heights = elevation.dem_elevations([[-121.5, 47.5, None], [5.5, 5.5, None]], self.tile_dir)
+        self.assertAlmostEqual(heights[0], 110)
+        self.assertIsNone(heights[1])
+
+    def test_gain_loss_hysteresis_and_missing_points(self):
+        self.assertEqual(elevation.gain_loss([None, 100, 101, 104, None, 100, 99]), (4, 4))
+        self.assertEqual(elevation.gain_loss([100, 102, 101, 102]), (0, 0))
+        self.assertEqual(elevation.gain_loss([None, None]), (0, 0))
+        self.assertEqual(elevation.gain_loss([]), (0, 0))
+
+    def test_gpx_without_elevation_keeps_none_and_gets_corrected(self):
+        gpx = synthetic.build_gpx_bytes(synthetic.generate_track(120))
+        result = services.parse_gpx_file(io.BytesIO(re.sub(rb'<ele>[^<]*</ele>', b'', gpx)))
+        self.assertTrue(all(point[2] is None for point in result['gps_points']))
+
+        self.assertTrue(elevation.correct(result, 'gpx', self.tile_dir))
+        self.assertTrue(all(point[2] is not None for point in result['gps_points']))
+        self.assertEqual(result['stats']['elevation_source'], 'dem')
+
+    def test_fit_altitude_is_kept(self):
+        fit = synthetic.build_fit_bytes(synthetic.generate_track(120))
+        result = services.parse_fit_file(io.BytesIO(fit))
+        before = [point[2] for point in result['gps_points']]
+        self.assertFalse(elevation.correct(result, 'fit', self.tile_dir))
+        self.assertEqual([point[2] for point in result['gps_points']], before)
+
+    def test_partly_covered_track_is_left_alone(self):
+        result = {
+            'gps_points': [[-121.5, 47.5, None], [5.5, 5.5, None]],
+            'stats': {}, 'segments': [],
+        }
+        self.assertFalse(elevation.correct(result, 'gpx', self.tile_dir))
+        self.assertEqual(result['gps_points'][0][2], None)
+
+
+def make_track(key, points, file_type='fit', lon_offset=0.0, stride=1):
+    """merge.Track from ``synthetic.generate_track`` points, optionally moved east or thinned out."""
+    points = points[::stride]
+    return merge.Track(
+        key=key,
+        coords=[[lon + lon_offset, lat, ele] for _, lat, lon, ele in points],
+        times=[dt.timestamp() for dt, *_ in points],
+        stats={'distance_km': 1.0},
+        file_type=file_type,
+    )
+
+
+class MergeTests(TestCase):
+    start = datetime.datetime(2024, 6, 1, 8, 0, tzinfo=datetime.timezone.utc)
+
+    def test_pack_times_round_trip(self):
+        times = [self.start + datetime.timedelta(seconds=offset) for offset in (0, 1, 5, 3600)]
+        started_at, blob = merge.pack_times(times)
+        self.assertEqual(started_at, self.start)
+        self.assertEqual(merge.unpack_times(started_at, blob), [time.timestamp() for time in times])
+        self.assertEqual(merge.pack_times(times + [None]), (None, None))
+        self.assertIsNone(merge.unpack_times(None, None))
+
+    def test_overlapping_pairs(self):
+        tracks = [
+            merge.Track(key=key, coords=[[0, 0, 0]] * 2, times=[start, end], stats={})
+            for key, (start, end) in enumerate([(0, 10), (5, 20), (15, 30), (40, 50)])
+        ]
+        self.assertEqual(sorted(merge.overlapping_pairs(tracks)), [(0, 1), (1, 2)])
+
+    def test_duplicate_recordings_collapse(self):
+        points = synthetic.generate_track(600, seed=1, start=self.start)
+        watch = make_track('watch', points)
+        phone = make_track('phone', points, file_type='gpx', stride=3)
+        self.assertTrue(merge.is_duplicate(watch, phone))
+
+        features, stats_list = merge.merge_tracks([phone, watch])
+        self.assertEqual(len(features), 1)
+        self.assertEqual(features[0]['geometry']['coordinates'], watch.coords)
+        self.assertEqual(sorted(features[0]['properties']['sources']), ['phone', 'watch'])
+        # Recomputed from the stitched points rather than either file's totals
+        self.assertEqual(len(stats_list), 1)
+        self.assertNotEqual(stats_list[0], watch.stats)
+
+    def test_sequential_files_are_chained(self):
+        morning = make_track('morning', synthetic.generate_track(300, seed=1, start=self.start))
+        afternoon = make_track('afternoon', synthetic.generate_track(
+            300, seed=2, start=self.start + datetime.timedelta(hours=5),
+        ))
+
+        features, stats_list = merge.merge_tracks([afternoon, morning])
+        self.assertEqual(len(features), 1)
+        self.assertEqual(features[0]['geometry']['coordinates'], morning.coords + afternoon.coords)
+        self.assertEqual(features[0]['properties']['sources'], ['morning', 'afternoon'])
+        self.assertEqual(stats_list, [morning.stats, afternoon.stats])
+
+    def test_concurrent_different_activities_stay_apart(self):
+        points = synthetic.generate_track(300, seed=1, start=self.start)
+        here = make_track('here', points)
+        elsewhere = make_track('elsewhere', points, lon_offset=0.5)
+        self.assertFalse(merge.is_duplicate(here, elsewhere))
+
+        features, stats_list = merge.merge_tracks([here, elsewhere])
+        self.assertEqual(len(features), 2)
+        self.assertEqual(len(stats_list), 2)
+
+    def test_untimed_files_are_appended(self):
+        timed = make_track('timed', synthetic.generate_track(60, start=self.start))
+        untimed = merge.Track(
+            key='route', coords=[[8.0, 47.0, None], [8.001, 47.0, None]], times=None, stats={'distance_km': 0.1},
+        )
+
+        features, stats_list = merge.merge_tracks([untimed, timed])
+        self.assertEqual([feature['properties']['sources'] for feature in features], [['timed'], ['route']])
+        self.assertEqual(stats_list, [timed.stats, untimed.stats])
+
+    def test_track_stats_skip_points_without_elevation(self):
+        coords = [[8.0, 47.0, None], [8.0001, 47.0, 100.0], [8.0002, 47.0, None], [8.0003, 47.0, 110.0]]
+        stats = merge.track_stats([0, 10, 20, 30], coords)
+        self.assertEqual(stats['elevation_gain_m'], 10)
+        self.assertEqual(stats['elevation_loss_m'], 0)
+        self.assertEqual(stats['elapsed_time_s'], 30)
+
+
+class PackedRouteTests(TestCase):
+    route = services.merge_geojson_features([
+        services.build_geojson_linestring(
+            [
+                [-121.5, 47.6, 400.0], [-121.5000123, 47.6000456, 399.8],
+                [-121.4999, 47.6001, None], [-121.4998, 47.6002, 401.3],
+            ],
+            [{'start': 0, 'end': 2, 'sport': 'hiking'}],
+        ),
+        services.build_geojson_linestring([[8.25, -33.9, -12.5], [8.2501, -33.9001, 0.0]]),
+    ])
+
+    def test_round_trip(self):
+        blob = services.encode_route(self.route)
+        self.assertTrue(blob.startswith(services.PACKED_ROUTE_MAGIC))
+        self.assertEqual(services.decode_route(blob), {
+            'type': 'FeatureCollection',
+            'features': [
+                {
+                    'type': 'Feature',
+                    'geometry': {'type': 'LineString', 'coordinates': [
+                        [-121.5, 47.6, 400.0], [-121.500012, 47.600046, 399.8],
+                        [-121.4999, 47.6001, None], [-121.4998, 47.6002, 401.3],
+                    ]},
+                    'properties': {'segments': [{'start': 0, 'end': 2, 'sport': 'hiking'}]},
+                },
+                {
+                    'type': 'Feature',
+                    'geometry': {'type': 'LineString', 'coordinates': [[8.25, -33.9, -12.5], [8.2501, -33.9001, 0.0]]},
+                    'properties': {},
+                },
+            ],
+        })
+
+    def test_empty_route(self):
+        self.assertEqual(services.decode_route(services.encode_route(None)), services.merge_geojson_features([]))
+
+    def test_smaller_than_json(self):
+        points = synthetic.generate_track(3600)
+        route = services.merge_geojson_features([services.build_geojson_linestring(
+            [[round(lon, 7), round(lat, 7), round(ele, 1)] for _, lat, lon, ele in points],
+        )])
+        self.assertLess(len(services.encode_route(route)), len(json.dumps(route)) / 5)
+
+    def test_rejects_other_data(self):
+        with self.assertRaises(ValueError):
+            services.decode_route(b'{"type": "FeatureCollection"}')
+
+
+class RoutePackedViewTests(TestCase):
+    def test_page_renders_from_packed_route_and_leg_summaries(self):
+        index_page = Site.objects.get(is_default_site=True).root_page.add_child(
+            instance=AdventureIndexPage(title='Adventures', slug='adventures'),
+        )
+        leg = {'sport': 'cycling', 'stats': {'distance_km': 20.5}, 'laps': []}
+        page = index_page.add_child(instance=AdventurePage(title='Duathlon', slug='duathlon'))
+        AdventurePage.objects.filter(pk=page.pk).update(
+            merged_route_packed=services.encode_route(PackedRouteTests.route),
+            route_legs=[dict(leg, sport='running'), leg],
+        )
+
+        response = self.client.get(page.url)
+        self.assertContains(response, reverse('adventure_route_packed', args=[page.pk]))
+        self.assertContains(response, 'cycling')
+        self.assertContains(response, '20.5 km')
+
+    def test_reencodes_routes_stored_in_an_older_format(self):
+        index_page = Page.objects.get(depth=1).add_child(
+            instance=AdventureIndexPage(title='Adventures', slug='adventures'),
+        )
+        page = index_page.add_child(instance=AdventurePage(title='Walk', slug='walk'))
+        AdventurePage.objects.filter(pk=page.pk).update(
+            merged_route_geojson=PackedRouteTests.route, merged_route_packed=b'NBR1\x00',
+        )
+
+        response = self.client.get(reverse('adventure_route_packed', args=[page.pk]))
+        self.assertEqual(response.status_code, 200)
+        expected = services.decode_route(services.encode_route(PackedRouteTests.route))
+        self.assertEqual(services.decode_route(response.content), expected)
+
+
+def route_geojson(points, lon_offset=0.0, reverse=False):
+    coords = [[lon + lon_offset, lat, ele] for _, lat, lon, ele in points]
+    if reverse:
+        coords.reverse()
+    return services.merge_geojson_features([services.build_geojson_linestring(coords)])
+
+
+class RouteSimilarityTests(TestCase):
+    points = synthetic.generate_track(1800, seed=3)
+
+    def _signature(self, route):
+        return similarity.minhash(similarity.route_cells(route['features']))
+
+    def test_geohash(self):
+        self.assertEqual(geo.geohash(-5.6, 42.6, 5), 'ezs42')
+        self.assertEqual(geo.geohash(10.40744, 57.64911, 11), 'u4pruydqqvj')
+
+    def test_same_route_in_either_direction(self):
+        forward = self._signature(route_geojson(self.points))
+        backward = self._signature(route_geojson(self.points[::5], reverse=True))
+        self.assertEqual(similarity.estimate_similarity(forward, backward), 1.0)
+        self.assertEqual(similarity.band_keys(forward), similarity.band_keys(backward))
+
+    def test_unrelated_routes(self):
+        here = self._signature(route_geojson(self.points))
+        elsewhere = self._signature(route_geojson(synthetic.generate_track(1800, seed=4), lon_offset=0.2))
+        self.assertLess(similarity.estimate_similarity(here, elsewhere), 0.1)
+
+    def test_similar_pages(self):
+        index_page = Page.objects.get(depth=1).add_child(
+            instance=AdventureIndexPage(title='Adventures', slug='adventures'),
+        )
+        routes = {
+            'original': route_geojson(self.points),
+            'repeat': route_geojson(self.points[:1500], reverse=True),
+            'elsewhere': route_geojson(self.points, lon_offset=0.2),
+            'draft': route_geojson(self.points),
+        }
+        pages = {}
+        for slug, route in routes.items():
+            pages[slug] = index_page.add_child(instance=AdventurePage(
+                title=slug, slug=slug, merged_route_geojson=route, live=slug != 'draft',
+            ))
+            similarity.index_page(pages[slug])
+
+        found = similarity.similar_pages(pages['original'])
+        self.assertEqual([page.slug for page, _ in found], ['repeat'])
+        self.assertGreater(found[0][1], 0.7)
+
+        # A page that loses its route drops out of the index
+        self.assertIsNone(similarity.index_page(pages['repeat'], route_geojson={}))
+        self.assertEqual(similarity.similar_pages(pages['original']), [])
+
+
+class StatsRollupTests(TestCase):
+    def setUp(self):
+        index_page = Page.objects.get(depth=1).add_child(
+            instance=AdventureIndexPage(title='Adventures', slug='adventures'),
+        )
+        self.page = index_page.add_child(instance=AdventurePage(
+            title='Walk', slug='walk', date_start=datetime.date(2026, 5, 10), activity_type='hiking', distance_km=12,
+        ))
+        # Process in the foreground instead of on a thread
+        self.enterContext(mock.patch('adventures.signals.process_in_background', services.process_adventure_files))
+
+    def _counts(self):
+        return {(row.year, row.month): row.adventure_count for row in StatsRollup.objects.all()}
+
+    def test_moving_a_page_to_another_month_through_a_revision(self):
+        self.page.save_revision().publish()
+        self.assertEqual(self._counts(), {(2026, 5): 1})
+
+        # An edit publishes a revision made from the page as the editor loaded it
+        self.page.date_start = datetime.date(2026, 6, 3)
+        self.page.save_revision().publish()
+        self.assertEqual(self._counts(), {(2026, 6): 1})
+        self.assertEqual(PageRollupMonth.objects.get(page_id=self.page.pk).month, datetime.date(2026, 6, 1))
+
+    def test_deleted_page_leaves_its_month(self):
+        self.page.save_revision().publish()
+        page_id = self.page.pk
+        self.page.delete()
+        self.assertEqual(self._counts(), {})
+        self.assertFalse(PageRollupMonth.objects.filter(page_id=page_id).exists())
@@ -0,0 +1,237 @@
+"""
+Chunked, resumable uploads of activity files.
+
+A client starts an upload, PUTs fixed-size chunks (in any order, retrying any
+that fail), and completes it. Each chunk is hashed while it streams in and,
+once its length and hash check out, written to its final place in storage:
+
+- S3 (django-storages): every chunk becomes one part of an S3 multipart upload,
+  so the object is assembled by S3 and never passes through local disk in full.
+- Local filesystem storage: verified chunks are written at their offset into a
+  preallocated ``.part`` file that is renamed into place on completion.
+
+The first chunk is sniffed (``adventures.sniffing``) before it is stored, so a
+corrupt or wrong-type file is rejected on its first request rather than after the
+whole file has been sent. Completing an upload creates the ``ActivityFile`` and
+starts processing it in the background immediately, without waiting for the page
+to be published.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from adventures.s3 import is_s3, s3_client, s3_key
+from adventures.sniffing import SNIFF_BYTES, sniff
+
+logger = logging.getLogger(__name__)
+
+READ_BLOCK = 64 * 1024
+
+# S3 rejects multipart parts below 5 MiB (except the last one)
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class UploadError(Exception):
+    """Raised for client errors: bad metadata, wrong chunk length, checksum mismatch."""
+
+
+def _part_path(upload):
+    return default_storage.path(upload.storage_name) + '.part'
+
+
+def start_upload(page, file_name, total_size, user=None):
+    from adventures.models import ActivityUpload
+
+    base_name = os.path.basename(file_name or '')
+    file_type = base_name.rsplit('.', 1)[-1].lower() if '.' in base_name else ''
+    if file_type not in ('fit', 'gpx'):
+        raise UploadError('Only .fit and .gpx files can be uploaded')
+    if not isinstance(total_size, int) or total_size <= 0:
+        raise UploadError('total_size must be a positive integer')
+    if total_size > settings.ACTIVITY_UPLOAD_MAX_SIZE:
+        raise UploadError(f'Files larger than {settings.ACTIVITY_UPLOAD_MAX_SIZE} bytes are not accepted')
+
+    chunk_size = settings.ACTIVITY_UPLOAD_CHUNK_SIZE
+    upload = ActivityUpload(
+        page=page,
+        created_by=user if user is not None and user.is_authenticated else None,
+        file_name=base_name[:255],
+        file_type=file_type,
+        total_size=total_size,
+        chunk_size=chunk_size,
+    )
+    # Prefix with the upload ID so concurrent uploads of the same name can't collide
+    valid_name = default_storage.get_valid_name(base_name)
+    upload.storage_name = default_storage.get_available_name(
+        f'activity_files/{upload.id.hex[:12]}-{valid_name}', max_length=100,
+    )
+
+    storage = default_storage
+    if is_s3(storage):
+        if chunk_size < S3_MIN_PART_SIZE:
+            raise UploadError('ACTIVITY_UPLOAD_CHUNK_SIZE is below the S3 minimum part size')
+        response = s3_client(storage).create_multipart_upload(
+            Bucket=storage.bucket_name, Key=s3_key(storage, upload.storage_name),
+            ContentType='application/octet-stream',
+        )
+        upload.multipart_id = response['UploadId']
+    else:
+        path = _part_path(upload)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.truncate(total_size)
+    upload.save()
+    return upload
+
+
+def write_chunk(upload, index, stream, expected_sha256=''):
+    """Stream chunk ``index`` from ``stream`` into storage, verifying its length and hash."""
+    from adventures.models import ActivityUpload
+
+    if upload.status != ActivityUpload.Status.PENDING:
+        raise UploadError(f'Upload is {upload.status}')
+    if not 0 <= index < upload.chunk_count:
+        raise UploadError(f'Chunk index must be between 0 and {upload.chunk_count - 1}')
+
+    length = upload.chunk_length(index)
+    digest = hashlib.sha256()
+    received = 0
+    etag = ''
+    head = bytearray()
+
+    def blocks():
+        nonlocal received
+        while received <= length:
+            block = stream.read(min(READ_BLOCK, length + 1 - received))
+            if not block:
+                break
+            received += len(block)
+            digest.update(block)
+            if index == 0 and len(head) < SNIFF_BYTES:
+                head.extend(block[:SNIFF_BYTES - len(head)])
+            yield block
+
+    # Spool the chunk (memory first, disk past 1 MiB) and check it before it touches
+    # storage: an oversized chunk must not spill into the next chunk's slot
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool:
+        for block in blocks():
+            spool.write(block)
+        _check_chunk(received, length, digest, expected_sha256)
+        _check_head(upload, index, head)
+        spool.seek(0)
+        if upload.multipart_id:
+            storage = default_storage
+            response = s3_client(storage).upload_part(
+                Bucket=storage.bucket_name, Key=s3_key(storage, upload.storage_name),
+                UploadId=upload.multipart_id, PartNumber=index + 1,
+                Body=spool, ContentLength=length,
+            )
+            etag = response['ETag']
+        else:
+            with open(_part_path(upload), 'r+b') as f:
+                f.seek(index * upload.chunk_size)
+                shutil.copyfileobj(spool, f, READ_BLOCK)
+
+    with transaction.atomic():
+        locked = ActivityUpload.objects.select_for_update().get(pk=upload.pk)
+        locked.parts[str(index)] = {'size': length, 'sha256': digest.hexdigest(), 'etag': etag}
+        locked.save(update_fields=['parts'])
+    upload.parts = locked.parts
+    return digest.hexdigest()
+
+
+def _check_chunk(received, length, digest, expected_sha256):
+    if received != length:
+        raise UploadError(f'Expected {length} bytes for this chunk, received {received}')
+    if expected_sha256 and expected_sha256.lower() != digest.hexdigest():
+        raise UploadError('Chunk SHA-256 does not match')
+
+
+def _check_head(upload, index, head):
+    if index != 0:
+        return
+    result = sniff(bytes(head), upload.total_size)
+    if not result.valid:
+        raise UploadError(result.error)
+    if result.file_type != upload.file_type:
+        raise UploadError(f'File content is {result.file_type.upper()} but the name ends in .{upload.file_type}')
+
+
+def complete_upload(upload):
+    """Finish assembling the file, create its ActivityFile and start processing it."""
+    from adventures.models import ActivityFile, ActivityUpload
+    from adventures.signals import process_in_background
+
+    with transaction.atomic():
+        upload = ActivityUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.status == ActivityUpload.Status.COMPLETE:
+            return upload
+        if upload.status != ActivityUpload.Status.PENDING:
+            raise UploadError(f'Upload is {upload.status}')
+        missing = upload.missing_chunks()
+        if missing:
+            raise UploadError(f'Missing chunks: {missing[:20]}')
+
+        ordered = [upload.parts[str(index)] for index in range(upload.chunk_count)]
+        if upload.multipart_id:
+            storage = default_storage
+            s3_client(storage).complete_multipart_upload(
+                Bucket=storage.bucket_name, Key=s3_key(storage, upload.storage_name),
+                UploadId=upload.multipart_id,
+                MultipartUpload={'Parts': [
+                    {'PartNumber': number, 'ETag': part['etag']} for number, part in enumerate(ordered, start=1)
+                ]},
+            )
+        else:
+            os.replace(_part_path(upload), default_storage.path(upload.storage_name))
+
+        last_order = upload.page.activity_files.order_by('-sort_order').values_list('sort_order', flat=True).first()
+        activity_file = ActivityFile(page=upload.page, file=upload.storage_name, sort_order=(last_order or 0) + 1)
+        try:
+            # The parts are already assembled, so a storage error reading the file back
+            # can't be retried: fail the upload instead of answering with a 500
+            activity_file.sniff()
+        except Exception:
+            logger.exception('Reading back upload %s (%s) failed', upload.pk, upload.storage_name)
+            upload.status = ActivityUpload.Status.FAILED
+            upload.save(update_fields=['status'])
+        else:
+            activity_file.save()
+            # Hash of the ordered chunk hashes: verifiable by the client without rereading the file
+            upload.sha256 = hashlib.sha256(''.join(part['sha256'] for part in ordered).encode()).hexdigest()
+            upload.status = ActivityUpload.Status.COMPLETE
+            upload.completed_at = timezone.now()
+            upload.activity_file = activity_file
+            upload.save()
+            transaction.on_commit(lambda: process_in_background(upload.page))
+    if upload.status == ActivityUpload.Status.FAILED:
+        raise UploadError('The uploaded file could not be read back from storage; please upload it again')
+    return upload
+
+
+def abort_upload(upload):
+    from adventures.models import ActivityUpload
+
+    if upload.status != ActivityUpload.Status.PENDING:
+        return upload
+    if upload.multipart_id:
+        storage = default_storage
+        s3_client(storage).abort_multipart_upload(
+            Bucket=storage.bucket_name, Key=s3_key(storage, upload.storage_name), UploadId=upload.multipart_id,
+        )
+    else:
+        try:
+            os.unlink(_part_path(upload))
+        except FileNotFoundError:
+            pass
+    upload.status = ActivityUpload.Status.ABORTED
+    upload.save(update_fields=['status'])
+    return upload
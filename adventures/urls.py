@@ -0,0 +1,14 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path("<int:page_id>/route/", views.route, name="adventure_route"),
+    path("<int:page_id>/route.bin", views.route_packed, name="adventure_route_packed"),
+    path("<int:page_id>/channels/", views.channel_index, name="adventure_channels"),
+    path("<int:page_id>/channels/<str:channel>/", views.channel_series, name="adventure_channel_series"),
+    path("uploads/", views.start_upload, name="adventure_upload_start"),
+    path("uploads/<uuid:upload_id>/", views.upload_detail, name="adventure_upload_detail"),
+    path("uploads/<uuid:upload_id>/chunks/<int:index>/", views.upload_chunk, name="adventure_upload_chunk"),
+    path("uploads/<uuid:upload_id>/complete/", views.complete_upload, name="adventure_upload_complete"),
+]
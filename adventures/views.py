@@ -1,3 +1,167 @@
-from django.shortcuts import render
+import json
 
-# Create your views here.
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_http_methods
+
+from adventures import channels, services, uploads
+from adventures.models import ActivityUpload, AdventurePage, SensorChannel
+
+
+async def route(request, page_id):
+    """Merged route GeoJSON for a live adventure page."""
+    page = await (
+        AdventurePage.objects.live()
+        .filter(pk=page_id)
+        .only('merged_route_geojson')
+        .afirst()
+    )
+    if page is None or not page.merged_route_geojson:
+        raise Http404
+    return JsonResponse(page.merged_route_geojson)
+
+
+async def route_packed(request, page_id):
+    """Merged route in the packed binary format (``services.encode_route``)."""
+    page = await (
+        AdventurePage.objects.live()
+        .filter(pk=page_id)
+        .only('merged_route_packed')
+        .afirst()
+    )
+    if page is None:
+        raise Http404
+    packed = page.merged_route_packed
+    if packed is None or not bytes(packed).startswith(services.PACKED_ROUTE_MAGIC):
+        # Processed before packed routes (or this version of the format) were stored
+        page = await AdventurePage.objects.only('merged_route_geojson').aget(pk=page_id)
+        if not page.merged_route_geojson:
+            raise Http404
+        packed = services.encode_route(page.merged_route_geojson)
+    return HttpResponse(bytes(packed), content_type='application/octet-stream')
+
+
+async def _live_channels(page_id, raw=False, **filters):
+    if not await AdventurePage.objects.live().filter(pk=page_id).aexists():
+        raise Http404
+    rows = SensorChannel.objects.filter(activity_file__page_id=page_id, **filters)
+    if not raw:
+        # Summaries only; the packed arrays stay in the database
+        rows = rows.defer('times', 'values')
+    return [row async for row in rows]
+
+
+async def channel_index(request, page_id):
+    """Sensor channels recorded for a live adventure page, with their ranges and units."""
+    return JsonResponse(channels.page_channels(await _live_channels(page_id)))
+
+
+def _float_param(request, name):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+async def channel_series(request, page_id, channel):
+    """
+    One channel bucketed server-side: [[t, min, avg, max, count], ...].
+
+    ``buckets`` (default 300) sets the resolution; ``start``/``end`` (seconds after the
+    page's first sample) zoom in; only the raw values inside the range are decoded.
+    """
+    if channel not in channels.CHANNELS:
+        raise Http404
+    start, end = _float_param(request, 'start'), _float_param(request, 'end')
+    rows = await _live_channels(page_id, raw=start is not None or end is not None, channel=channel)
+    if not rows:
+        raise Http404
+    try:
+        buckets = int(request.GET.get('buckets', channels.DEFAULT_BUCKETS))
+    except ValueError:
+        buckets = channels.DEFAULT_BUCKETS
+    buckets = max(1, min(buckets, channels.MAX_BUCKETS))
+    series = channels.page_series(rows, buckets, start, end)
+    label, unit = channels.CHANNELS[channel][1:]
+    return JsonResponse({'channel': channel, 'label': label, 'unit': unit, **series})
+
+
+def _can_edit(user, page):
+    return user.is_authenticated and page.permissions_for_user(user).can_edit()
+
+
+def _upload_for(request, upload_id):
+    upload = get_object_or_404(ActivityUpload.objects.select_related('page'), pk=upload_id)
+    if not _can_edit(request.user, upload.page):
+        raise Http404
+    return upload
+
+
+def _upload_state(upload):
+    return {
+        'id': str(upload.id),
+        'status': upload.status,
+        'file_name': upload.file_name,
+        'total_size': upload.total_size,
+        'chunk_size': upload.chunk_size,
+        'chunk_count': upload.chunk_count,
+        'missing_chunks': upload.missing_chunks(),
+        'sha256': upload.sha256,
+        'activity_file_id': upload.activity_file_id,
+    }
+
+
+@require_http_methods(['POST'])
+def start_upload(request):
+    """Start a chunked upload: {"page_id", "file_name", "total_size"} -> upload state."""
+    try:
+        payload = json.loads(request.body)
+        page = AdventurePage.objects.get(pk=int(payload['page_id']))
+    except (ValueError, KeyError, TypeError, AdventurePage.DoesNotExist):
+        return JsonResponse({'error': 'page_id, file_name and total_size are required'}, status=400)
+    if not _can_edit(request.user, page):
+        return JsonResponse({'error': 'Not allowed to edit this page'}, status=403)
+    try:
+        upload = uploads.start_upload(page, payload.get('file_name'), payload.get('total_size'), request.user)
+    except uploads.UploadError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(_upload_state(upload), status=201)
+
+
+@require_http_methods(['GET', 'DELETE'])
+def upload_detail(request, upload_id):
+    """Upload state (including missing chunks, for resuming); DELETE aborts it."""
+    upload = _upload_for(request, upload_id)
+    if request.method == 'DELETE':
+        upload = uploads.abort_upload(upload)
+    return JsonResponse(_upload_state(upload))
+
+
+@require_http_methods(['PUT'])
+def upload_chunk(request, upload_id, index):
+    """
+    Receive one chunk as the raw request body.
+
+    The body is read from the request stream in small blocks, so chunk size is not
+    limited by DATA_UPLOAD_MAX_MEMORY_SIZE. An optional X-Chunk-SHA256 header is
+    verified.
+    """
+    upload = _upload_for(request, upload_id)
+    try:
+        digest = uploads.write_chunk(upload, index, request, request.headers.get('X-Chunk-SHA256', ''))
+    except uploads.UploadError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse({'index': index, 'sha256': digest, 'missing_chunks': upload.missing_chunks()})
+
+
+@require_http_methods(['POST'])
+def complete_upload(request, upload_id):
+    upload = _upload_for(request, upload_id)
+    try:
+        upload = uploads.complete_upload(upload)
+    except uploads.UploadError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(_upload_state(upload))
@@ -0,0 +1,36 @@
+from wagtail import hooks
+from wagtail.admin.viewsets.model import ModelViewSet
+from wagtail.permission_policies import ModelPermissionPolicy
+from wagtail.permissions import register_permission_policy
+
+from adventures.models import ProcessingRun
+
+
+class ReadOnlyPermissionPolicy(ModelPermissionPolicy):
+    """Processing runs are written by the pipeline only; admins may view and delete them."""
+
+    def user_has_permission(self, user, action):
+        if action in ('add', 'change'):
+            return False
+        return super().user_has_permission(user, action)
+
+
+class ProcessingRunViewSet(ModelViewSet):
+    model = ProcessingRun
+    icon = 'time'
+    menu_label = 'Processing Runs'
+    menu_order = 900
+    add_to_admin_menu = True
+    copy_view_enabled = False
+    inspect_view_enabled = True
+    exclude_form_fields = []
+    list_display = ['file_name', 'page', 'status', 'started_at', 'total_s', 'parse_s', 'point_count', 'bytes_read']
+    list_filter = ['status', 'file_type']
+
+
+register_permission_policy(ProcessingRun, ReadOnlyPermissionPolicy(ProcessingRun))
+
+
+@hooks.register('register_admin_viewset')
+def register_processing_run_viewset():
+    return ProcessingRunViewSet('processing_runs')
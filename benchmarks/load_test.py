@@ -0,0 +1,137 @@
+"""
+Closed-loop HTTP load test for comparing server modes.
+
+Run the site twice, e.g. with ``docker compose --profile loadtest up`` (sync workers
+on :8000, uvicorn workers on :8001), then:
+
+    python benchmarks/load_test.py \\
+        --target sync=http://localhost:8000 --target asgi=http://localhost:8001 \\
+        --path / --path /projects/ --concurrency 32 --duration 30
+
+Each of ``--concurrency`` threads keeps one persistent connection open and requests
+the paths round-robin for ``--duration`` seconds. Only the standard library is used.
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import math
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# Same as monitoring.stats.percentile (but 0.0 when empty); this script runs outside
+# the project with only the standard library, so it can't import it.
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _connect(base):
+    parts = urlsplit(base)
+    conn_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    return conn_class(parts.hostname, parts.port, timeout=30)
+
+
+def _worker(base, paths, deadline, latencies, errors, lock, offset):
+    conn = _connect(base)
+    prefix = urlsplit(base).path.rstrip('/')
+    local_latencies = []
+    local_errors = 0
+    for path in itertools.islice(itertools.cycle(paths), offset, None):
+        if time.perf_counter() >= deadline:
+            break
+        started = time.perf_counter()
+        try:
+            conn.request('GET', prefix + path, headers={'Accept-Encoding': 'gzip'})
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                local_errors += 1
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            conn.close()
+            conn = _connect(base)
+            continue
+        local_latencies.append(time.perf_counter() - started)
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        errors[0] += local_errors
+
+
+def run(base, paths, concurrency, duration, warmup):
+    if warmup:
+        run(base, paths, concurrency, warmup, 0)
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [
+        threading.Thread(target=_worker, args=(base, paths, deadline, latencies, errors, lock, i))
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(_percentile(latencies, 99) * 1000, 1),
+        'max_ms': round((latencies[-1] if latencies else 0) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        '--target', action='append', required=True,
+        help='name=base_url, may be repeated (e.g. sync=http://localhost:8000).',
+    )
+    parser.add_argument('--path', action='append', help='Path to request; may be repeated (default: /).')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20, help='Measured seconds per target.')
+    parser.add_argument('--warmup', type=float, default=3, help='Unmeasured seconds per target before measuring.')
+    parser.add_argument('--json', action='store_true', help='Emit JSON instead of a table.')
+    args = parser.parse_args()
+
+    paths = args.path or ['/']
+    results = {}
+    for target in args.target:
+        name, _, base = target.partition('=')
+        if not base:
+            parser.error(f'--target must be name=url, got {target!r}')
+        results[name] = run(base, paths, args.concurrency, args.duration, args.warmup)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f'{"target":<12} {"requests":>9} {"errors":>7} {"req/s":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"max ms":>8}')
+    for name, row in results.items():
+        print(
+            f'{name:<12} {row["requests"]:>9} {row["errors"]:>7} {row["rps"]:>9} {row["p50_ms"]:>8} '
+            f'{row["p95_ms"]:>8} {row["p99_ms"]:>8} {row["max_ms"]:>8}'
+        )
+    if len(results) > 1:
+        baseline_name, baseline = next(iter(results.items()))
+        for name, row in list(results.items())[1:]:
+            if baseline['rps']:
+                print(f'{name} vs {baseline_name}: {row["rps"] / baseline["rps"]:.2f}x throughput')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class BlogConfig(AppConfig):
     name = "blog"
+
+    def ready(self):
+        from django.db.models.signals import post_delete
+        from wagtail.signals import page_published, page_unpublished
+        from blog.tag_counts import update_tag_counts
+        page_published.connect(update_tag_counts)
+        page_unpublished.connect(update_tag_counts)
+        post_delete.connect(update_tag_counts, sender="blog.BlogPage")
+        post_delete.connect(update_tag_counts, sender="adventures.AdventurePage")
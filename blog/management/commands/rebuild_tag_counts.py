@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import TagCount
+from blog.tag_counts import rebuild_tag_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-section tag counts used by tag lists and tag archive pages."
+
+    def handle(self, *args, **options):
+        for section in TagCount.Section:
+            counts = rebuild_tag_counts(section)
+            self.stdout.write(f"{section.label}: {len(counts)} tags")
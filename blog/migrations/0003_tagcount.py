@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_alter_blogpage_body'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(choices=[('blog', 'Blog'), ('adventures', 'Adventures')], max_length=20)),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(allow_unicode=True, max_length=100)),
+                ('count', models.PositiveIntegerField()),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='taggit.tag')),
+            ],
+            options={
+                'ordering': ['-count', 'name'],
+                'indexes': [models.Index(fields=['section', '-count'], name='blog_tagcount_section_count')],
+                'constraints': [models.UniqueConstraint(fields=('section', 'slug'), name='blog_tagcount_section_slug')],
+            },
+        ),
+    ]
@@ -1,15 +1,18 @@
 import datetime
 
 from django.db import models
+from django.http import Http404
 from modelcluster.contrib.taggit import ClusterTaggableManager
 from modelcluster.fields import ParentalKey
 from taggit.models import TaggedItemBase
 from wagtail.admin.panels import FieldPanel, MultiFieldPanel
 from wagtail.blocks import CharBlock, ChoiceBlock, RichTextBlock, StructBlock, TextBlock
+from wagtail.contrib.routable_page.models import RoutablePageMixin, path
 from wagtail.embeds.blocks import EmbedBlock
 from wagtail.fields import RichTextField, StreamField
 from wagtail.images.blocks import ImageChooserBlock
 from wagtail.models import Page
+from wagtail.search import index
 
 
 class BlogPageTag(TaggedItemBase):
@@ -75,7 +78,37 @@ class QuoteBlock(StructBlock):
         icon = "openquote"
 
 
-class BlogIndexPage(Page):
+class TagCount(models.Model):
+    """
+    Number of live pages per tag, per section.
+
+    Rebuilt from the tag through tables whenever a page in the section is published,
+    unpublished or deleted, so tag clouds and archive headers are a single indexed
+    read instead of a join across taggit on every request.
+    """
+
+    class Section(models.TextChoices):
+        BLOG = "blog", "Blog"
+        ADVENTURES = "adventures", "Adventures"
+
+    section = models.CharField(max_length=20, choices=Section.choices)
+    tag = models.ForeignKey("taggit.Tag", on_delete=models.CASCADE, related_name="+")
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, allow_unicode=True)
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["section", "slug"], name="blog_tagcount_section_slug"),
+        ]
+        indexes = [models.Index(fields=["section", "-count"], name="blog_tagcount_section_count")]
+        ordering = ["-count", "name"]
+
+    def __str__(self):
+        return f"{self.name} ({self.count})"
+
+
+class BlogIndexPage(RoutablePageMixin, Page):
     intro = RichTextField(blank=True)
 
     content_panels = Page.content_panels + [FieldPanel("intro")]
@@ -87,6 +120,17 @@ class BlogIndexPage(Page):
         context["blog_posts"] = BlogPage.objects.child_of(self).live().order_by("-date")
         return context
 
+    @path("tags/<str:tag>/")
+    def tag_archive(self, request, tag):
+        active_tag = TagCount.objects.filter(section=TagCount.Section.BLOG, slug=tag).first()
+        if active_tag is None:
+            raise Http404
+        posts = BlogPage.objects.child_of(self).live().filter(tags__slug=tag).order_by("-date")
+        return self.render(
+            request,
+            context_overrides={"blog_posts": posts, "active_tag": active_tag},
+        )
+
     class Meta:
         verbose_name = "Blog Index Page"
 
@@ -129,6 +173,13 @@ class BlogPage(Page):
     )
     tags = ClusterTaggableManager(through=BlogPageTag, blank=True)
 
+    search_fields = Page.search_fields + [
+        index.SearchField("intro", boost=2),
+        index.SearchField("body"),
+        index.RelatedFields("tags", [index.SearchField("name", boost=2)]),
+        index.FilterField("date"),
+    ]
+
     content_panels = Page.content_panels + [
         MultiFieldPanel(
             [FieldPanel("date"), FieldPanel("tags")], heading="Post Metadata"
@@ -0,0 +1,51 @@
+"""Maintenance of the TagCount aggregate."""
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count
+
+from blog.models import TagCount
+
+# Section -> (page model, tag through model)
+SECTIONS = {
+    TagCount.Section.BLOG: ("blog.BlogPage", "blog.BlogPageTag"),
+    TagCount.Section.ADVENTURES: ("adventures.AdventurePage", "adventures.AdventurePageTag"),
+}
+
+
+def section_for_page(page):
+    for section, (page_model, _) in SECTIONS.items():
+        if isinstance(page.specific_deferred, apps.get_model(page_model)):
+            return section
+    return None
+
+
+def rebuild_tag_counts(section):
+    """Recount live pages per tag for one section with a single GROUP BY."""
+    _, through_model = SECTIONS[section]
+    rows = (
+        apps.get_model(through_model).objects
+        .filter(content_object__live=True)
+        .values("tag_id", "tag__name", "tag__slug")
+        .annotate(count=Count("content_object", distinct=True))
+    )
+    counts = [
+        TagCount(
+            section=section,
+            tag_id=row["tag_id"],
+            name=row["tag__name"],
+            slug=row["tag__slug"],
+            count=row["count"],
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        TagCount.objects.filter(section=section).delete()
+        TagCount.objects.bulk_create(counts)
+    return counts
+
+
+def update_tag_counts(sender, instance, **kwargs):
+    section = section_for_page(instance)
+    if section is not None:
+        rebuild_tag_counts(section)
@@ -0,0 +1,16 @@
+from django import template
+
+from blog.models import TagCount
+
+register = template.Library()
+
+
+@register.inclusion_tag("blog/includes/tag_facets.html", takes_context=True)
+def tag_facets(context, section, index_page, active_tag=None, limit=30):
+    """Render the tag list for a section, most used first, linking to the index's tag archives."""
+    return {
+        "request": context.get("request"),
+        "tags": TagCount.objects.filter(section=section)[:limit],
+        "index_page": index_page,
+        "active_tag": active_tag,
+    }
@@ -1,3 +1,17 @@
 from django.test import TestCase
+from wagtail.models import Site
 
-# Create your tests here.
+from blog.models import BlogIndexPage, BlogPage
+
+
+class BlogPageTests(TestCase):
+    def test_tag_links_reverse_the_index_tag_archive_route(self):
+        index_page = Site.objects.get(is_default_site=True).root_page.add_child(
+            instance=BlogIndexPage(title="Blog", slug="blog"),
+        )
+        post = index_page.add_child(instance=BlogPage(title="Ridge walk", slug="ridge-walk"))
+        post.tags.add("Hiking")
+        post.save()
+
+        response = self.client.get(post.url)
+        self.assertContains(response, 'href="/blog/tags/hiking/"')
@@ -10,7 +10,26 @@ done
 python manage.py migrate --noinput
 python manage.py collectstatic --noinput
 
+# SERVER_MODE=wsgi (default) runs sync/threaded workers; SERVER_MODE=asgi runs uvicorn
+# workers so slow outbound calls in async views don't tie up a whole worker.
+SERVER_MODE="${SERVER_MODE:-wsgi}"
+WEB_WORKERS="${WEB_WORKERS:-2}"
+WEB_TIMEOUT="${WEB_TIMEOUT:-120}"
+
+if [ "$SERVER_MODE" = "asgi" ]; then
+  # Sync code (Wagtail page serving, ORM calls) runs in asgiref's thread pool
+  if [ -n "$WEB_THREADS" ]; then
+    export ASGI_THREADS="$WEB_THREADS"
+  fi
+  exec gunicorn nicolabeirer.asgi:application \
+    --worker-class uvicorn_worker.UvicornWorker \
+    --bind 0.0.0.0:8000 \
+    --workers "$WEB_WORKERS" \
+    --timeout "$WEB_TIMEOUT"
+fi
+
 exec gunicorn nicolabeirer.wsgi:application \
   --bind 0.0.0.0:8000 \
-  --workers 2 \
-  --timeout 120
+  --workers "$WEB_WORKERS" \
+  --threads "${WEB_THREADS:-1}" \
+  --timeout "$WEB_TIMEOUT"
@@ -0,0 +1,74 @@
+import datetime
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from monitoring.models import RequestSample
+from monitoring.stats import percentile
+
+
+class Command(BaseCommand):
+    help = 'Dump per-route latency and query-count percentiles from recorded request samples.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24, help='Only include samples from the last N hours.')
+        parser.add_argument('--route', help='Only include routes containing this substring.')
+        parser.add_argument('--sort', choices=['p50', 'p95', 'p99', 'count', 'queries'], default='p95')
+        parser.add_argument('--json', action='store_true', help='Emit JSON instead of a table.')
+        parser.add_argument('--prune-days', type=int, help='Delete samples older than N days before reporting.')
+
+    def handle(self, *args, **options):
+        if options['prune_days'] is not None:
+            cutoff = timezone.now() - datetime.timedelta(days=options['prune_days'])
+            deleted, _ = RequestSample.objects.filter(created_at__lt=cutoff).delete()
+            self.stdout.write(f'Pruned {deleted} sample(s) older than {options["prune_days"]} day(s)')
+
+        samples = RequestSample.objects.filter(
+            created_at__gte=timezone.now() - datetime.timedelta(hours=options['hours']),
+        )
+        if options['route']:
+            samples = samples.filter(route__contains=options['route'])
+
+        durations = defaultdict(list)
+        queries = defaultdict(list)
+        template_ms = defaultdict(float)
+        for route, duration_ms, db_queries, template in samples.values_list(
+            'route', 'duration_ms', 'db_queries', 'template_ms',
+        ).iterator():
+            durations[route].append(duration_ms)
+            queries[route].append(db_queries)
+            template_ms[route] += template
+
+        rows = []
+        for route, values in durations.items():
+            values.sort()
+            route_queries = sorted(queries[route])
+            rows.append({
+                'route': route,
+                'count': len(values),
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'p99': percentile(values, 99),
+                'max': values[-1],
+                'queries': percentile(route_queries, 50),
+                'queries_max': route_queries[-1],
+                'template_avg': template_ms[route] / len(values),
+            })
+        rows.sort(key=lambda row: row[options['sort']], reverse=True)
+
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+
+        self.stdout.write(
+            f'{"route":<40} {"count":>7} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} '
+            f'{"max ms":>9} {"q p50":>6} {"q max":>6} {"tpl ms":>8}'
+        )
+        for row in rows:
+            self.stdout.write(
+                f'{row["route"][:40]:<40} {row["count"]:>7} {row["p50"]:>9.1f} {row["p95"]:>9.1f} '
+                f'{row["p99"]:>9.1f} {row["max"]:>9.1f} {row["queries"]:>6} {row["queries_max"]:>6} '
+                f'{row["template_avg"]:>8.1f}'
+            )
@@ -0,0 +1,239 @@
+"""
+Request-level performance monitoring.
+
+Enabled with the ``PERFORMANCE_MONITORING`` setting. For every request it records
+wall time, database query count and time, template render time and response size.
+Requests slower than ``SLOW_REQUEST_MS`` are logged with their most expensive
+queries, and samples are buffered and bulk-written to ``RequestSample`` so the
+``request_stats`` command can report per-route percentiles.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from nicolabeirer import metrics
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_LOG_LIMIT = 5
+# Individual queries kept per request for the slow log; counts and totals are always exact
+QUERY_CAPTURE_LIMIT = 200
+
+_current = contextvars.ContextVar('monitoring_request_stats', default=None)
+_template_depth = contextvars.ContextVar('monitoring_template_depth', default=0)
+
+_buffer = []
+_buffer_lock = threading.Lock()
+_last_flush = time.monotonic()
+_template_patched = False
+
+
+class _RequestStats:
+    __slots__ = ('db_queries', 'db_time', 'queries', 'template_time')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.queries = []
+        self.template_time = 0.0
+
+
+def _patch_template_render():
+    """Time top-level Django template renders; nested includes are not counted twice."""
+    global _template_patched
+    if _template_patched:
+        return
+    from django.template.base import Template
+
+    original_render = Template.render
+
+    def render(self, context):
+        stats = _current.get()
+        if stats is None:
+            return original_render(self, context)
+        depth = _template_depth.get()
+        token = _template_depth.set(depth + 1)
+        started = time.perf_counter()
+        try:
+            return original_render(self, context)
+        finally:
+            _template_depth.reset(token)
+            if depth == 0:
+                stats.template_time += time.perf_counter() - started
+
+    Template.render = render
+    _template_patched = True
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.db_queries += 1
+        stats.db_time += elapsed
+        if len(stats.queries) < QUERY_CAPTURE_LIMIT:
+            stats.queries.append((elapsed, sql))
+
+
+def _install_query_wrapper(connection, **kwargs):
+    # On every connection rather than per request: async views run their queries
+    # in worker threads, each with its own connection. The request is found
+    # through the context variable, which sync_to_async carries over.
+    if _query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_wrapper)
+
+
+def _route_for(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    if match.url_name == 'wagtail_serve':
+        # The catch-all page route; group by page type rather than one bucket for every page
+        route_result = getattr(request, '_wagtail_route_for_request', None)
+        page = getattr(route_result, 'page', None)
+        if page is not None:
+            return f'wagtail:{type(page).__name__}'
+    return match.route or match.view_name
+
+
+def _flush_due():
+    return bool(_buffer) and (
+        len(_buffer) >= settings.PERFORMANCE_FLUSH_SIZE
+        or time.monotonic() - _last_flush >= settings.PERFORMANCE_FLUSH_INTERVAL_S
+    )
+
+
+def _flush(force=False):
+    global _last_flush
+    from monitoring.models import RequestSample
+
+    with _buffer_lock:
+        if not _buffer or not (force or _flush_due()):
+            return
+        samples = _buffer[:]
+        _buffer.clear()
+        _last_flush = time.monotonic()
+    try:
+        RequestSample.objects.bulk_create(samples)
+    except Exception:
+        logger.exception('Failed to write %d request samples', len(samples))
+
+
+def request_duration():
+    return metrics.histogram(
+        'http_request_duration_seconds',
+        'Wall time per request, by route.',
+        ['route', 'method'],
+    )
+
+
+def request_queries():
+    return metrics.histogram(
+        'http_request_db_queries',
+        'Database queries per request, by route.',
+        ['route'],
+        buckets=(1, 2, 5, 10, 20, 50, 100, 200),
+    )
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_MONITORING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            # Under ASGI requests stay on the event loop instead of going through
+            # the async-to-sync adapter, whose overhead would be measured too
+            markcoroutinefunction(self)
+        self.exclude_prefixes = tuple(settings.PERFORMANCE_EXCLUDE_PREFIXES)
+        _patch_template_render()
+        connection_created.connect(_install_query_wrapper, dispatch_uid='monitoring_query_wrapper')
+        for connection in connections.all(initialized_only=True):
+            _install_query_wrapper(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if request.path.startswith(self.exclude_prefixes):
+            return self.get_response(request)
+
+        stats = _RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+
+        self._record(request, response, stats, duration)
+        _flush()
+        return response
+
+    async def __acall__(self, request):
+        if request.path.startswith(self.exclude_prefixes):
+            return await self.get_response(request)
+
+        stats = _RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+
+        self._record(request, response, stats, duration)
+        if _flush_due():
+            await sync_to_async(_flush)()
+        return response
+
+    def _record(self, request, response, stats, duration):
+        route = _route_for(request)[:255]
+        response_bytes = None if response.streaming else len(response.content)
+        duration_ms = duration * 1000
+
+        request_duration().labels(route=route, method=request.method).observe(duration)
+        request_queries().labels(route=route).observe(stats.db_queries)
+
+        if duration_ms >= settings.SLOW_REQUEST_MS:
+            top = sorted(stats.queries, key=lambda q: q[0], reverse=True)[:SLOW_QUERY_LOG_LIMIT]
+            logger.warning(
+                'Slow request %s %s (%s): %.0fms, %d queries in %.0fms, templates %.0fms, %s bytes\n%s',
+                request.method, request.get_full_path(), route, duration_ms,
+                stats.db_queries, stats.db_time * 1000, stats.template_time * 1000, response_bytes,
+                '\n'.join(f'  {elapsed * 1000:8.1f}ms  {sql[:500]}' for elapsed, sql in top),
+            )
+
+        from monitoring.models import RequestSample
+        sample = RequestSample(
+            route=route,
+            method=request.method[:10],
+            status_code=response.status_code,
+            duration_ms=round(duration_ms, 2),
+            db_queries=stats.db_queries,
+            db_time_ms=round(stats.db_time * 1000, 2),
+            template_ms=round(stats.template_time * 1000, 2),
+            response_bytes=response_bytes,
+            created_at=timezone.now(),
+        )
+        with _buffer_lock:
+            _buffer.append(sample)
@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class RequestSample(models.Model):
+    """Timing and query counts for one request, recorded by PerformanceMiddleware."""
+
+    route = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    db_queries = models.PositiveIntegerField()
+    db_time_ms = models.FloatField()
+    template_ms = models.FloatField()
+    response_bytes = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['route', 'created_at'])]
+
+    def __str__(self):
+        return f'{self.method} {self.route} {self.duration_ms:.0f}ms'
@@ -0,0 +1,12 @@
+"""Small statistics helpers shared by the monitoring and benchmark commands."""
+
+import math
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank ``pct`` percentile of an ascending list, or None if it is empty."""
+    if not sorted_values:
+        return None
+    # The smallest value with at least pct% of the values at or below it
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
@@ -0,0 +1,61 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from monitoring import middleware
+from monitoring.models import RequestSample
+from monitoring.stats import percentile
+
+
+class PercentileTests(SimpleTestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 51), 3)
+        self.assertEqual(percentile([5], 99), 5)
+
+    def test_empty(self):
+        self.assertIsNone(percentile([], 95))
+
+
+@override_settings(PERFORMANCE_MONITORING=True, PERFORMANCE_FLUSH_SIZE=1)
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/blog/')
+
+        async def async_view(request):
+            return await sync_to_async(self._view)(request)
+
+        # Built here, in the thread holding the test database connection, as at startup
+        self.sync_handler = middleware.PerformanceMiddleware(self._view)
+        self.async_handler = middleware.PerformanceMiddleware(async_view)
+
+    def _view(self, request):
+        User.objects.count()
+        User.objects.count()
+        return HttpResponse('hello')
+
+    def test_sync_request(self):
+        self.assertFalse(iscoroutinefunction(self.sync_handler))
+        self.assertEqual(self.sync_handler(self.request).content, b'hello')
+
+        sample = RequestSample.objects.get()
+        self.assertEqual(sample.db_queries, 2)
+        self.assertEqual(sample.response_bytes, 5)
+
+    async def test_async_request(self):
+        self.assertTrue(iscoroutinefunction(self.async_handler))
+        response = await self.async_handler(self.request)
+        self.assertEqual(response.content, b'hello')
+
+        sample = await RequestSample.objects.aget()
+        self.assertEqual(sample.db_queries, 2)
+
+    def test_excluded_prefix(self):
+        self.sync_handler(RequestFactory().get('/static/site.css'))
+        self.assertFalse(RequestSample.objects.exists())
@@ -0,0 +1,21 @@
+from django.apps import AppConfig
+
+
+class NicolaBeirerConfig(AppConfig):
+    name = "nicolabeirer"
+
+    def ready(self):
+        from django.db.models.signals import post_delete
+        from wagtail.signals import page_published, page_unpublished
+        from nicolabeirer.page_cache import bump_generation
+        from nicolabeirer.signals import export_on_publish, prefetch_embeds_on_publish
+        from nicolabeirer.syndication import rebuild_on_delete, update_page_on_signal
+        page_published.connect(bump_generation)
+        page_published.connect(prefetch_embeds_on_publish)
+        # Sitemap/feeds are rebuilt before the static export thread copies them
+        page_published.connect(update_page_on_signal)
+        page_published.connect(export_on_publish)
+        page_unpublished.connect(bump_generation)
+        page_unpublished.connect(update_page_on_signal)
+        page_unpublished.connect(export_on_publish)
+        post_delete.connect(rebuild_on_delete, sender='wagtailcore.Page')
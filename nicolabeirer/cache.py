@@ -0,0 +1,193 @@
+"""
+Two-tier cache backend with stampede protection.
+
+``TwoTierCache`` keeps a small in-process LRU (short TTL) in front of a shared
+backend named by the ``SHARED_ALIAS`` option — Redis in production, a local-memory
+stand-in in development and tests. Reads that hit the local tier never leave the
+process; writes and deletes go through to the shared tier. Other processes may
+serve a value up to ``LOCAL_TIMEOUT`` seconds after it was overwritten.
+
+``get_or_set_coalesced`` adds single-flight recomputation: when an entry goes stale
+exactly one caller (across threads and worker processes) runs the producer while
+everyone else keeps serving the stale copy, or briefly waits if there is none.
+"""
+
+import pickle
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+
+
+class _LocalLRU:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, pickled = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, value, timeout=None):
+        ttl = self.ttl if timeout is None else min(self.ttl, timeout)
+        if ttl <= 0:
+            self.delete(key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, pickled)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED_ALIAS', 'shared')
+        self._local = _LocalLRU(
+            max_entries=options.get('LOCAL_MAX_ENTRIES', 1000),
+            ttl=options.get('LOCAL_TIMEOUT', 5),
+        )
+        self._key_locks = weakref.WeakValueDictionary()
+        self._key_locks_guard = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _local_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self._local.get(local_key)
+        if value is not _MISSING:
+            return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        self._local.set(local_key, value)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self.shared.set(key, value, timeout, version=version)
+        self._local.set(local_key, value, self._local_timeout(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._local.set(local_key, value, self._local_timeout(timeout))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        if self._local.get(self.make_and_validate_key(key, version=version)) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.incr(key, delta, version=version)
+
+    def clear(self):
+        self._local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def _key_lock(self, key):
+        with self._key_locks_guard:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[key] = lock
+            return lock
+
+    def get_or_set_coalesced(
+        self, key, producer, timeout=DEFAULT_TIMEOUT, stale_timeout=None,
+        lock_timeout=30, wait_timeout=5, should_cache=None, version=None,
+    ):
+        """
+        Return the cached value for ``key``, calling ``producer()`` to (re)compute it.
+
+        The value is fresh for ``timeout`` seconds and then kept for ``stale_timeout``
+        more (default: ``timeout``) so it can be served while one caller refreshes it.
+        ``should_cache(value)`` can veto storing a result, e.g. error responses.
+        """
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if stale_timeout is None:
+            stale_timeout = timeout or 0
+
+        entry = self.get(key, version=version)
+        if entry is not None and entry[1] > time.time():
+            return entry[0]
+
+        lock = self._key_lock(key)
+        with lock:
+            # Another thread in this process may have refreshed it while we waited
+            entry = self.get(key, version=version)
+            if entry is not None and entry[1] > time.time():
+                return entry[0]
+
+            lock_key = f'{key}:lock'
+            token = uuid.uuid4().hex
+            if self.shared.add(lock_key, token, lock_timeout, version=version):
+                try:
+                    value = producer()
+                    if should_cache is None or should_cache(value):
+                        if timeout is None:
+                            self.set(key, (value, float('inf')), None, version=version)
+                        else:
+                            self.set(key, (value, time.time() + timeout), timeout + stale_timeout, version=version)
+                    return value
+                finally:
+                    if self.shared.get(lock_key, version=version) == token:
+                        self.shared.delete(lock_key, version=version)
+
+            # Another worker is recomputing: serve stale if we have it, else wait for it
+            if entry is not None:
+                return entry[0]
+            deadline = time.monotonic() + wait_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = self.shared.get(key, version=version)
+                if entry is not None:
+                    self._local.set(self.make_and_validate_key(key, version=version), entry)
+                    return entry[0]
+        return producer()
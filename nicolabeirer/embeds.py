@@ -0,0 +1,129 @@
+"""
+Embed prefetching and provider-outage fallback.
+
+Video blocks render through ``{% embed %}``, which calls the oEmbed provider
+synchronously whenever the ``Embed`` row for a URL is missing or expired. To keep
+that off the request path:
+
+- ``prefetch_page_embeds`` resolves every embed in a page's StreamFields when the
+  page is published, so the first visitor already hits the database cache.
+- ``SnapshotFallbackFinder`` gives provider results a finite lifetime, and when the
+  provider is unreachable returns the last stored snapshot instead of failing.
+- ``refresh_stale_embeds`` re-fetches entries before they expire; it runs in the
+  background after publish and from the ``refresh_embeds`` command.
+"""
+
+import datetime
+import logging
+
+from django.utils import timezone
+from wagtail.embeds.blocks import EmbedBlock
+from wagtail.embeds.embeds import get_embed, get_embed_hash, get_finder_for_embed
+from wagtail.embeds.exceptions import EmbedException
+from wagtail.embeds.finders import import_finder_class
+from wagtail.embeds.finders.base import EmbedFinder
+from wagtail.fields import StreamField
+
+logger = logging.getLogger(__name__)
+
+# Must match the max_width passed to {% embed %} in blog/blocks/video_block.html,
+# since the width is part of the embed cache key.
+VIDEO_EMBED_MAX_WIDTH = 800
+
+REFRESH_MARGIN = datetime.timedelta(days=1)
+
+
+class SnapshotFallbackFinder(EmbedFinder):
+    def __init__(self, finder='wagtail.embeds.finders.oembed', refresh_after=7 * 24 * 3600,
+                 retry_after=3600, **options):
+        self.finder = import_finder_class(finder)(**options)
+        self.refresh_after = datetime.timedelta(seconds=refresh_after)
+        self.retry_after = datetime.timedelta(seconds=retry_after)
+
+    def accept(self, url):
+        return self.finder.accept(url)
+
+    def find_embed(self, url, max_width=None, max_height=None):
+        from wagtail.embeds.models import Embed
+
+        try:
+            result = self.finder.find_embed(url, max_width=max_width, max_height=max_height)
+        except EmbedException:
+            snapshot = Embed.objects.filter(hash=get_embed_hash(url, max_width, max_height)).first()
+            if snapshot is None or not snapshot.html:
+                raise
+            logger.warning('Embed provider failed for %s; serving snapshot from %s', url, snapshot.last_updated)
+            return {
+                'type': snapshot.type,
+                'html': snapshot.html,
+                'title': snapshot.title,
+                'author_name': snapshot.author_name,
+                'provider_name': snapshot.provider_name,
+                'thumbnail_url': snapshot.thumbnail_url,
+                'width': snapshot.width,
+                'height': snapshot.height,
+                'cache_until': timezone.now() + self.retry_after,
+            }
+
+        if not result.get('cache_until'):
+            result['cache_until'] = timezone.now() + self.refresh_after
+        return result
+
+
+def page_embed_urls(page):
+    """Yield (url, max_width) for every top-level EmbedBlock in the page's StreamFields."""
+    page = page.specific
+    for field in page._meta.get_fields():
+        if not isinstance(field, StreamField):
+            continue
+        for block in getattr(page, field.name):
+            if isinstance(block.block, EmbedBlock) and block.value:
+                yield block.value.url, VIDEO_EMBED_MAX_WIDTH
+
+
+def prefetch_page_embeds(page):
+    """Resolve a page's embeds into the embed cache; returns the number resolved."""
+    resolved = 0
+    for url, max_width in page_embed_urls(page):
+        try:
+            get_embed(url, max_width=max_width)
+        except EmbedException:
+            logger.warning('Could not prefetch embed %s for page %s', url, page.pk)
+        else:
+            resolved += 1
+    return resolved
+
+
+def refresh_embed(embed):
+    """Re-fetch one Embed row from its provider in place; returns True on success."""
+    try:
+        embed_dict = get_finder_for_embed(embed.url, max_width=embed.max_width)
+    except EmbedException:
+        logger.warning('Could not refresh embed %s', embed.url)
+        return False
+
+    for attr in ('width', 'height'):
+        try:
+            embed_dict[attr] = int(embed_dict[attr])
+        except (KeyError, TypeError, ValueError):
+            embed_dict[attr] = None
+    embed_dict['html'] = embed_dict.get('html') or ''
+    embed_dict['thumbnail_url'] = embed_dict.get('thumbnail_url') or ''
+
+    for attr, value in embed_dict.items():
+        setattr(embed, attr, value)
+    embed.save()
+    return True
+
+
+def refresh_stale_embeds(urls=None, margin=REFRESH_MARGIN):
+    """Refresh embeds expiring within ``margin``; optionally limited to ``urls``."""
+    from wagtail.embeds.models import Embed
+
+    stale = Embed.objects.filter(cache_until__lte=timezone.now() + margin)
+    if urls is not None:
+        stale = stale.filter(url__in=list(urls))
+    refreshed = 0
+    for embed in stale.iterator():
+        refreshed += refresh_embed(embed)
+    return refreshed
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from nicolabeirer import syndication
+
+
+class Command(BaseCommand):
+    help = 'Re-render every page\'s sitemap/feed fragments and rebuild sitemap.xml and the Atom feeds.'
+
+    def handle(self, *args, **options):
+        updated = syndication.rebuild_entries()
+        self.stdout.write(self.style.SUCCESS(f'Updated: {", ".join(updated) or "nothing changed"}'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from wagtail.models import Page
+
+from nicolabeirer import static_export
+
+
+class Command(BaseCommand):
+    help = (
+        'Render the public site (home, projects, all live pages, tag archives, stats and '
+        'route data) into STATIC_EXPORT_ROOT. Only files whose content changed are rewritten.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Export directory (default: STATIC_EXPORT_ROOT).')
+        parser.add_argument(
+            '--page', type=int, action='append',
+            help='Only re-export the URLs affected by this page ID; may be repeated.',
+        )
+        parser.add_argument('--no-prune', action='store_true', help='Keep outputs for URLs that no longer exist.')
+
+    def handle(self, *args, **options):
+        if options['page']:
+            urls = []
+            for page in Page.objects.filter(pk__in=options['page']).specific():
+                urls += static_export.urls_for_page(page)
+            result = static_export.export_urls(list(dict.fromkeys(urls)), options['output'])
+        else:
+            result = static_export.export_site(options['output'], prune=not options['no_prune'])
+
+        for url in result['written']:
+            self.stdout.write(f'  wrote    {url}')
+        for url in result['removed']:
+            self.stdout.write(f'  removed  {url}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(result["written"])} written, {len(result["unchanged"])} unchanged, '
+            f'{len(result["removed"])} removed'
+        ))
@@ -0,0 +1,28 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from wagtail.models import Page
+
+from nicolabeirer import embeds
+
+
+class Command(BaseCommand):
+    help = 'Prefetch embeds for live pages and refresh embed cache entries that are about to expire.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--margin-hours', type=float, default=24,
+            help='Refresh entries expiring within this many hours.',
+        )
+        parser.add_argument('--prefetch', action='store_true', help='Also resolve embeds for every live page.')
+
+    def handle(self, *args, **options):
+        if options['prefetch']:
+            resolved = 0
+            for page in Page.objects.live().specific().iterator():
+                resolved += embeds.prefetch_page_embeds(page)
+            self.stdout.write(f'Prefetched {resolved} embed(s)')
+
+        margin = datetime.timedelta(hours=options['margin_hours'])
+        refreshed = embeds.refresh_stale_embeds(margin=margin)
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {refreshed} embed(s)'))
@@ -0,0 +1,70 @@
+"""
+Optional Prometheus metrics.
+
+Metrics are only collected when ``METRICS_ENABLED`` is set and ``prometheus_client``
+is importable; otherwise every metric is a no-op so callers never need to check.
+When gunicorn runs several workers, set ``PROMETHEUS_MULTIPROC_DIR`` so the
+metrics endpoint aggregates across processes.
+"""
+
+import os
+
+from django.conf import settings
+
+_registry = {}
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, amount):
+        pass
+
+
+_NOOP = _NoopMetric()
+
+
+def enabled():
+    if not getattr(settings, 'METRICS_ENABLED', False):
+        return False
+    try:
+        import prometheus_client  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _get_or_create(kind, name, documentation, labelnames, **kwargs):
+    if not enabled():
+        return _NOOP
+    if name not in _registry:
+        import prometheus_client
+        metric_class = getattr(prometheus_client, kind)
+        _registry[name] = metric_class(name, documentation, labelnames, **kwargs)
+    return _registry[name]
+
+
+def counter(name, documentation, labelnames=()):
+    return _get_or_create('Counter', name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=None):
+    kwargs = {'buckets': buckets} if buckets else {}
+    return _get_or_create('Histogram', name, documentation, labelnames, **kwargs)
+
+
+def render_latest():
+    """Return (body, content_type) in the Prometheus text exposition format."""
+    import prometheus_client
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.WAGTAIL_PAGE_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrebuiltDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('content_type', models.CharField(max_length=100)),
+                ('content', models.TextField()),
+                ('etag', models.CharField(max_length=70)),
+                ('last_modified', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SyndicationEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(blank=True, max_length=20)),
+                ('published_at', models.DateTimeField()),
+                ('sitemap_xml', models.TextField()),
+                ('atom_xml', models.TextField(blank=True)),
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.WAGTAIL_PAGE_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Syndication Entries',
+                'indexes': [models.Index(fields=['section', '-published_at'], name='syndication_section_published')],
+            },
+        ),
+    ]
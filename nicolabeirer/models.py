@@ -0,0 +1,37 @@
+from django.db import models
+
+
+class SyndicationEntry(models.Model):
+    """
+    Pre-rendered sitemap and Atom fragments for one live page.
+
+    Rewritten only when that page is published; sitemap.xml and the feeds are
+    assembled by concatenating these fragments, never by re-rendering pages.
+    """
+
+    page = models.OneToOneField('wagtailcore.Page', on_delete=models.CASCADE, related_name='+')
+    # Feed this page appears in ('blog', 'adventures'), or blank for sitemap only
+    section = models.CharField(max_length=20, blank=True)
+    published_at = models.DateTimeField()
+    sitemap_xml = models.TextField()
+    atom_xml = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['section', '-published_at'], name='syndication_section_published')]
+        verbose_name_plural = 'Syndication Entries'
+
+    def __str__(self):
+        return f'Syndication entry for page {self.page_id}'
+
+
+class PrebuiltDocument(models.Model):
+    """A fully rendered sitemap or feed, served with ETag/Last-Modified."""
+
+    name = models.CharField(max_length=100, unique=True)
+    content_type = models.CharField(max_length=100)
+    content = models.TextField()
+    etag = models.CharField(max_length=70)
+    last_modified = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
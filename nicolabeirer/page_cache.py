@@ -0,0 +1,65 @@
+"""
+Whole-response caching for anonymous Wagtail page views.
+
+Rendered pages (status, headers and body) are stored through
+``cache.get_or_set_coalesced`` so that when a popular page expires only one worker
+re-renders it. Keys include a site-wide
+generation that is bumped on every publish/unpublish; index pages list their
+children, so any change invalidates every cached page at once.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+GENERATION_KEY = 'page_cache:generation'
+
+
+def current_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        cache.add(GENERATION_KEY, generation, None)
+        generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def bump_generation(**kwargs):
+    cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+def _is_cacheable_request(request):
+    return (
+        settings.PAGE_CACHE_TIMEOUT
+        and request.method == 'GET'
+        and not request.GET
+        and not getattr(request, 'is_preview', False)
+        and not request.user.is_authenticated
+    )
+
+
+def serve_cached(serve_page, page, request, args, kwargs):
+    if not _is_cacheable_request(request):
+        return serve_page(page, request, args, kwargs)
+
+    # v2: entries hold the response headers, not just the content type
+    key = f'page_cache:v2:{current_generation()}:{request.get_host()}:{request.path}'
+
+    def render():
+        response = serve_page(page, request, args, kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        # Headers only; cookies live in response.cookies and are never shared between visitors
+        return response.status_code, list(response.items()), bytes(response.content)
+
+    status, headers, content = cache.get_or_set_coalesced(
+        key, render,
+        timeout=settings.PAGE_CACHE_TIMEOUT,
+        should_cache=lambda result: result[0] == 200,
+    )
+    response = HttpResponse(content, status=status)
+    for name, value in headers:
+        response.headers[name] = value
+    return response
@@ -0,0 +1,93 @@
+"""
+Site search across blog posts, adventures and resume projects.
+
+Matching and ranking use the Wagtail search backend, which on PostgreSQL reads the
+precomputed tsvector index (``wagtailsearch_indexentry``, GIN-indexed) rather than
+scanning content. Highlighted snippets come from ``ts_headline`` and are computed
+only for the results being shown.
+"""
+
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from wagtail.search.backends import get_search_backend
+
+from adventures.models import AdventurePage
+from blog.models import BlogPage
+from projects.models import ResumeProject
+
+# Each source is searched for at most this many hits before merging by score
+MAX_RESULTS_PER_SOURCE = 100
+
+# Sentinels that can't appear in page text; swapped for <mark> after escaping
+_START, _STOP = '\x02', '\x03'
+
+
+@dataclass
+class SearchResult:
+    kind: str
+    title: str
+    score: float
+    obj: object
+    url: str = ''
+    snippet: str = ''
+
+
+def _search_config():
+    return settings.WAGTAILSEARCH_BACKENDS['default'].get('SEARCH_CONFIG') or 'simple'
+
+
+def _headlines(model, field, ids, query_string):
+    query = SearchQuery(query_string, search_type='websearch', config=_search_config())
+    rows = model.objects.filter(pk__in=ids).annotate(
+        headline=SearchHeadline(
+            field, query, config=_search_config(),
+            start_sel=_START, stop_sel=_STOP, max_words=35, min_words=15,
+        ),
+    ).values_list('pk', 'headline')
+    return {
+        pk: mark_safe(escape(headline).replace(_START, '<mark>').replace(_STOP, '</mark>'))
+        for pk, headline in rows
+        if headline
+    }
+
+
+def search_site(query_string):
+    """Return SearchResults for ``query_string``, best match first."""
+    backend = get_search_backend()
+    results = []
+
+    for model, kind in ((BlogPage, 'blog'), (AdventurePage, 'adventure')):
+        hits = backend.search(query_string, model.objects.live()).annotate_score('_score')
+        for page in hits[:MAX_RESULTS_PER_SOURCE]:
+            results.append(SearchResult(kind, page.title, page._score or 0, page))
+
+    hits = backend.search(query_string, ResumeProject).annotate_score('_score')
+    for project in hits[:MAX_RESULTS_PER_SOURCE]:
+        results.append(SearchResult('project', project.title, project._score or 0, project, url='/projects/'))
+
+    results.sort(key=lambda result: result.score, reverse=True)
+    return results
+
+
+def prepare_results(results, query_string, request=None):
+    """Fill in URLs and highlighted snippets for the results being shown (one query per model)."""
+    sources = {
+        'blog': (BlogPage, 'intro'),
+        'adventure': (AdventurePage, 'intro'),
+        'project': (ResumeProject, 'description'),
+    }
+    for kind, (model, field) in sources.items():
+        ids = [result.obj.pk for result in results if result.kind == kind]
+        if not ids:
+            continue
+        headlines = _headlines(model, field, ids, query_string)
+        for result in results:
+            if result.kind == kind:
+                if not result.url:
+                    result.url = result.obj.get_url(request)
+                result.snippet = headlines.get(result.obj.pk) or getattr(result.obj, field, '')
+    return results
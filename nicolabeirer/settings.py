@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     # Wagtail
     "wagtail.contrib.forms",
     "wagtail.contrib.redirects",
+    "wagtail.contrib.routable_page",
     "wagtail.embeds",
     "wagtail.sites",
     "wagtail.users",
@@ -64,13 +65,16 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "django.contrib.postgres",
     # Project apps
+    "nicolabeirer",
     "projects",
     "resume",
     "blog",
     "adventures",
+    "monitoring",
 ]
 
 MIDDLEWARE = [
+    "monitoring.middleware.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -113,9 +117,61 @@ DATABASES = {
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD"),
         "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
         "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        # Reuse connections across requests instead of reconnecting (TLS + auth) every time
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# DB_POOL=True switches to a psycopg connection pool per worker process. Use it with
+# SERVER_MODE=asgi, where persistent connections are not reused between requests.
+if os.environ.get("DB_POOL", "False") == "True":
+    from psycopg_pool import ConnectionPool
+
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+            "timeout": int(os.environ.get("DB_POOL_TIMEOUT", "10")),
+            "max_idle": int(os.environ.get("DB_POOL_MAX_IDLE", "300")),
+            "check": ConnectionPool.check_connection,
+        },
+    }
+
+
+# Cache
+# "default" is a two-tier cache: an in-process LRU in front of the "shared" backend.
+# Without REDIS_URL the shared tier is process-local memory (fine for dev and tests).
+
+if os.environ.get("REDIS_URL"):
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["REDIS_URL"],
+        "KEY_PREFIX": "nicolabeirer",
+    }
+else:
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "shared",
+    }
+
+CACHES = {
+    "default": {
+        "BACKEND": "nicolabeirer.cache.TwoTierCache",
+        "TIMEOUT": 300,
+        "OPTIONS": {
+            "SHARED_ALIAS": "shared",
+            "LOCAL_MAX_ENTRIES": int(os.environ.get("CACHE_LOCAL_MAX_ENTRIES", "1000")),
+            "LOCAL_TIMEOUT": int(os.environ.get("CACHE_LOCAL_TIMEOUT", "5")),
+        },
+    },
+    "shared": SHARED_CACHE,
+}
+
+# Seconds to cache rendered Wagtail pages for anonymous visitors; 0 disables
+PAGE_CACHE_TIMEOUT = int(os.environ.get("PAGE_CACHE_TIMEOUT", "300"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -163,8 +219,54 @@ STORAGES = {
     },
 }
 
+# Chunked activity uploads (see adventures.uploads). Chunks must be at least 5 MiB
+# when media is on S3, since each one becomes a multipart part.
+ACTIVITY_UPLOAD_CHUNK_SIZE = int(os.environ.get("ACTIVITY_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+ACTIVITY_UPLOAD_MAX_SIZE = int(os.environ.get("ACTIVITY_UPLOAD_MAX_SIZE", str(2 * 1024 * 1024 * 1024)))
+
+# Directory of SRTM .hgt tiles used to correct GPX elevations (see
+# adventures.elevation); correction is skipped when unset.
+DEM_TILE_DIR = os.environ.get("DEM_TILE_DIR") or None
+
+# Static export of the public site (see nicolabeirer.static_export). When enabled,
+# each publish/unpublish re-renders the affected pages into STATIC_EXPORT_ROOT.
+STATIC_EXPORT_ENABLED = os.environ.get("STATIC_EXPORT_ENABLED", "False") == "True"
+STATIC_EXPORT_ROOT = os.environ.get("STATIC_EXPORT_ROOT", BASE_DIR / "static_export")
+
+# Request performance monitoring (see monitoring.middleware)
+PERFORMANCE_MONITORING = os.environ.get("PERFORMANCE_MONITORING", "False") == "True"
+SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", "500"))
+PERFORMANCE_FLUSH_SIZE = int(os.environ.get("PERFORMANCE_FLUSH_SIZE", "50"))
+PERFORMANCE_FLUSH_INTERVAL_S = int(os.environ.get("PERFORMANCE_FLUSH_INTERVAL_S", "30"))
+PERFORMANCE_EXCLUDE_PREFIXES = ["/static/", "/media/", "/metrics/"]
+
+# Prometheus metrics at /metrics/ — requires prometheus-client. The endpoint exposes
+# per-route latency and error counts, so it only answers requests that carry
+# "Authorization: Bearer <METRICS_TOKEN>" or come from an address in
+# METRICS_ALLOWED_IPS (REMOTE_ADDR as seen by Django, i.e. the proxy's address
+# unless it is rewritten); with neither set it always returns 404.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "False") == "True"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get("METRICS_ALLOWED_IPS", "").split(",") if ip]
+
 WAGTAIL_SITE_NAME = "Nicola Beirer"
-WAGTAILSEARCH_BACKENDS = {"default": {"BACKEND": "wagtail.search.backends.database"}}
+# oEmbed results are refreshed weekly and fall back to the stored copy if the provider is down
+WAGTAILEMBEDS_FINDERS = [
+    {
+        "class": "nicolabeirer.embeds.SnapshotFallbackFinder",
+        "finder": "wagtail.embeds.finders.oembed",
+        "refresh_after": 7 * 24 * 3600,
+        "retry_after": 3600,
+    }
+]
+# On PostgreSQL the database backend keeps tsvector columns with GIN indexes in
+# wagtailsearch_indexentry, updated as pages are published and models saved.
+WAGTAILSEARCH_BACKENDS = {
+    "default": {
+        "BACKEND": "wagtail.search.backends.database",
+        "SEARCH_CONFIG": "english",
+    }
+}
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "/media/"
 
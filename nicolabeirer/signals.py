@@ -0,0 +1,56 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from nicolabeirer import embeds, static_export
+
+logger = logging.getLogger(__name__)
+
+
+def _prefetch_in_background(page):
+    close_old_connections()
+    try:
+        urls = [url for url, _ in embeds.page_embed_urls(page)]
+        if urls:
+            embeds.prefetch_page_embeds(page)
+            embeds.refresh_stale_embeds(urls=urls)
+    except Exception:
+        logger.exception('Embed prefetch for page %s failed', page.pk)
+    finally:
+        connection.close()
+
+
+def prefetch_embeds_on_publish(sender, instance, **kwargs):
+    t = threading.Thread(
+        target=_prefetch_in_background,
+        args=(instance,),
+        daemon=True,
+    )
+    t.start()
+
+
+def _export_in_background(page):
+    close_old_connections()
+    try:
+        result = static_export.export_for_page(page)
+        logger.info(
+            'Static export for page %s: %d written, %d unchanged, %d removed',
+            page.pk, len(result['written']), len(result['unchanged']), len(result['removed']),
+        )
+    except Exception:
+        logger.exception('Static export for page %s failed', page.pk)
+    finally:
+        connection.close()
+
+
+def export_on_publish(sender, instance, **kwargs):
+    if not settings.STATIC_EXPORT_ENABLED:
+        return
+    t = threading.Thread(
+        target=_export_in_background,
+        args=(instance,),
+        daemon=True,
+    )
+    t.start()
@@ -0,0 +1,278 @@
+"""
+Static export of the public site.
+
+Every public URL is rendered in-process through the normal request stack
+(middleware, URL routing, Wagtail serving, templates) as an anonymous visitor,
+then written under
+``STATIC_EXPORT_ROOT`` as ``<path>/index.html`` (or ``index.json`` for JSON
+endpoints). ``manifest.json`` records the SHA-256 of each output: a file is only
+rewritten when its hash changes, writes are atomic, and the hash doubles as an
+ETag for whatever host serves the directory (nginx, S3 + CDN, ...).
+
+``export_site`` renders everything; ``export_for_page`` re-renders only the URLs a
+publish or unpublish can affect — the page, its ancestors, the index routes that
+list it, the home page, the sitemap and feeds and, for adventures, the route and
+sensor data endpoints.
+"""
+
+import fcntl
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import unquote_to_bytes
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = '.export.lock'
+
+_EXTENSIONS = {
+    'text/html': 'html',
+    'application/json': 'json',
+    'application/xml': 'xml',
+    'application/atom+xml': 'xml',
+}
+
+
+def _root():
+    return Path(settings.STATIC_EXPORT_ROOT)
+
+
+@contextmanager
+def _export_lock(root):
+    """
+    One export at a time across processes (gunicorn workers, management commands),
+    since the manifest is read-modify-write: an exclusive flock on a file in the
+    export root, released when the file is closed.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / LOCK_NAME, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def _host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host and not host.startswith(('.', '*'))]
+    return hosts[0] if hosts else 'localhost'
+
+
+class _ExportHandler(BaseHandler):
+    """
+    The site's middleware and URL resolution, as WSGIHandler runs them, minus the
+    request_started/request_finished signals: those close database connections,
+    which would end a publish's transaction half-way through an export.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.load_middleware()
+
+
+def _request(url):
+    """An anonymous GET of ``url``, built the way a WSGI server would."""
+    return WSGIRequest({
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        # WSGI passes the path as bytes decoded as latin-1
+        'PATH_INFO': unquote_to_bytes(url).decode('iso-8859-1'),
+        'QUERY_STRING': '',
+        'HTTP_HOST': _host(),
+        'SERVER_NAME': _host(),
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': io.StringIO(),
+    })
+
+
+def _render(handler, url):
+    """(status code, content type, body) of ``url``; errors come back as 500s, already logged."""
+    response = handler.get_response(_request(url))
+    try:
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, response.get('Content-Type', 'text/html'), content
+    finally:
+        response.close()
+
+
+def _load_manifest(root):
+    try:
+        return json.loads((root / MANIFEST_NAME).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_atomic(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.export-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _output_path(url_path, content_type):
+    if not url_path.endswith('/'):
+        # Already a file name, e.g. /sitemap.xml
+        return url_path.lstrip('/')
+    extension = _EXTENSIONS.get(content_type.split(';')[0].strip(), 'html')
+    return url_path.strip('/') + ('/' if url_path.strip('/') else '') + f'index.{extension}'
+
+
+def page_urls():
+    """URL paths of every live, publicly viewable page on the default site."""
+    from wagtail.models import Page
+
+    urls = []
+    for page in Page.objects.live().public().specific().exclude(depth=1):
+        url = page.get_url_parts()
+        if url is not None:
+            urls.append(url[2])
+    return urls
+
+
+def _index_routes(index_page):
+    """Routable sub-URLs of an index page (stats, tag archives)."""
+    from adventures.models import AdventureIndexPage
+    from blog.models import TagCount
+
+    base = index_page.url
+    if base is None:
+        return []
+    section = TagCount.Section.ADVENTURES if isinstance(index_page, AdventureIndexPage) else TagCount.Section.BLOG
+    urls = [f'{base}tags/{slug}/' for slug in TagCount.objects.filter(section=section).values_list('slug', flat=True)]
+    if section == TagCount.Section.ADVENTURES:
+        urls.append(f'{base}stats/')
+    return urls
+
+
+def _syndication_urls():
+    from nicolabeirer.syndication import FEEDS, SITEMAP
+
+    return [reverse('prebuilt_document', args=[name]) for name in [SITEMAP, *(name for name, _ in FEEDS.values())]]
+
+
+def _sensor_urls(page_ids):
+    """Channel index and default series endpoints of adventures with sensor data."""
+    from adventures.models import SensorChannel
+
+    pairs = (
+        SensorChannel.objects.filter(activity_file__page_id__in=page_ids)
+        .values_list('activity_file__page_id', 'channel').distinct().order_by('activity_file__page_id', 'channel')
+    )
+    urls = []
+    for page_id, channel in pairs:
+        urls.append(reverse('adventure_channels', args=[page_id]))
+        urls.append(reverse('adventure_channel_series', args=[page_id, channel]))
+    return list(dict.fromkeys(urls))
+
+
+def site_urls():
+    """Every URL path the static export covers."""
+    from adventures.models import AdventureIndexPage, AdventurePage
+    from blog.models import BlogIndexPage
+
+    urls = [reverse('home'), reverse('index'), *_syndication_urls()]
+    urls += page_urls()
+    for index_page in [*BlogIndexPage.objects.live(), *AdventureIndexPage.objects.live()]:
+        urls += _index_routes(index_page)
+    for page_id in AdventurePage.objects.live().exclude(merged_route_geojson=None).values_list('pk', flat=True):
+        urls.append(reverse('adventure_route', args=[page_id]))
+        urls.append(reverse('adventure_route_packed', args=[page_id]))
+    urls += _sensor_urls(AdventurePage.objects.live().values('pk'))
+    return list(dict.fromkeys(urls))
+
+
+def urls_for_page(page):
+    """URL paths whose output can change when ``page`` is published or unpublished."""
+    from adventures.models import AdventureIndexPage, AdventurePage
+    from blog.models import BlogIndexPage
+
+    page = page.specific
+    urls = [reverse('home'), *_syndication_urls()]
+    if page.url is not None:
+        # Included even when unpublished, so its output gets removed
+        urls.append(page.url)
+    for ancestor in page.get_ancestors().live().specific().exclude(depth=1):
+        if ancestor.url is not None:
+            urls.append(ancestor.url)
+        if isinstance(ancestor, (BlogIndexPage, AdventureIndexPage)):
+            urls += _index_routes(ancestor)
+    if isinstance(page, AdventurePage):
+        urls.append(reverse('adventure_route', args=[page.pk]))
+        urls.append(reverse('adventure_route_packed', args=[page.pk]))
+        urls += _sensor_urls([page.pk])
+    return list(dict.fromkeys(urls))
+
+
+def export_urls(urls, root=None):
+    """
+    Render ``urls`` into the export directory.
+
+    Returns a dict with the paths ``written``, ``unchanged`` and ``removed`` (those
+    that no longer render with a 200, e.g. unpublished pages).
+    """
+    root = Path(root or _root())
+    handler = _ExportHandler()
+    result = {'written': [], 'unchanged': [], 'removed': []}
+
+    with _export_lock(root):
+        manifest = _load_manifest(root)
+        for url in urls:
+            status_code, content_type, content = _render(handler, url)
+            entry = manifest.get(url)
+            if status_code != 200:
+                if entry is not None:
+                    (root / entry['file']).unlink(missing_ok=True)
+                    del manifest[url]
+                    result['removed'].append(url)
+                elif status_code != 404:
+                    logger.warning('Static export of %s returned %s', url, status_code)
+                continue
+
+            digest = hashlib.sha256(content).hexdigest()
+            output = _output_path(url, content_type)
+            if entry and entry['sha256'] == digest and entry['file'] == output and (root / output).exists():
+                result['unchanged'].append(url)
+                continue
+            _write_atomic(root / output, content)
+            if entry and entry['file'] != output:
+                (root / entry['file']).unlink(missing_ok=True)
+            manifest[url] = {'file': output, 'sha256': digest, 'bytes': len(content)}
+            result['written'].append(url)
+
+        _write_atomic(root / MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return result
+
+
+def export_site(root=None, prune=True):
+    """Export every public URL; with ``prune``, delete outputs for URLs that no longer exist."""
+    root = Path(root or _root())
+    urls = site_urls()
+    result = export_urls(urls, root)
+    if prune:
+        with _export_lock(root):
+            manifest = _load_manifest(root)
+            for url in set(manifest) - set(urls):
+                (root / manifest.pop(url)['file']).unlink(missing_ok=True)
+                result['removed'].append(url)
+            _write_atomic(root / MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return result
+
+
+def export_for_page(page, root=None):
+    return export_urls(urls_for_page(page), root)
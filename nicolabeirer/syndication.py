@@ -0,0 +1,192 @@
+"""
+sitemap.xml and Atom feeds, built on publish and served pre-rendered.
+
+Each live public page has a ``SyndicationEntry`` holding its ``<url>`` element and,
+for blog posts and adventures, its Atom ``<entry>``. Publishing a page re-renders
+that page's fragments only; the documents are then rebuilt by joining stored
+fragments and saved as ``PrebuiltDocument`` rows. A document whose bytes did not
+change keeps its ETag and Last-Modified, so crawlers and feed readers revalidating
+with If-None-Match / If-Modified-Since get a 304 without the content being loaded.
+"""
+
+import hashlib
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+SITEMAP = 'sitemap.xml'
+FEEDS = {
+    'blog': ('feeds/blog.atom', 'Nicola Beirer — Blog'),
+    'adventures': ('feeds/adventures.atom', 'Nicola Beirer — Adventures'),
+}
+FEED_LENGTH = 20
+
+SITEMAP_CONTENT_TYPE = 'application/xml; charset=utf-8'
+ATOM_CONTENT_TYPE = 'application/atom+xml; charset=utf-8'
+
+
+def _section(page):
+    from adventures.models import AdventurePage
+    from blog.models import BlogPage
+
+    if isinstance(page, BlogPage):
+        return 'blog'
+    if isinstance(page, AdventurePage):
+        return 'adventures'
+    return ''
+
+
+def _site_root_url():
+    from wagtail.models import Site
+
+    site = Site.objects.filter(is_default_site=True).first()
+    return site.root_url if site else ''
+
+
+def _sitemap_url(location, lastmod=None):
+    parts = [f'<url><loc>{escape(location)}</loc>']
+    if lastmod:
+        parts.append(f'<lastmod>{lastmod.date().isoformat()}</lastmod>')
+    parts.append('</url>')
+    return ''.join(parts)
+
+
+def _atom_entry(page, url):
+    published = page.first_published_at or page.last_published_at
+    updated = page.last_published_at or published
+    summary = getattr(page, 'intro', '') or ''
+    return (
+        '<entry>'
+        f'<title>{escape(page.title)}</title>'
+        f'<link href="{escape(url)}" rel="alternate"/>'
+        f'<id>{escape(url)}</id>'
+        f'<published>{published.isoformat()}</published>'
+        f'<updated>{updated.isoformat()}</updated>'
+        + (f'<summary>{escape(summary)}</summary>' if summary else '')
+        + '</entry>'
+    )
+
+
+def update_page(page):
+    """Refresh (or drop) one page's fragments and rebuild the documents it appears in."""
+    from wagtail.models import Page
+
+    from nicolabeirer.models import SyndicationEntry
+
+    page = page.specific
+    is_public = Page.objects.live().public().filter(pk=page.pk).exists()
+    url = page.get_full_url() if is_public else None
+    if url is None:
+        deleted, _ = SyndicationEntry.objects.filter(page_id=page.pk).delete()
+        if deleted:
+            rebuild_documents()
+        return
+
+    section = _section(page)
+    SyndicationEntry.objects.update_or_create(
+        page_id=page.pk,
+        defaults={
+            'section': section,
+            'published_at': page.first_published_at or page.last_published_at or timezone.now(),
+            'sitemap_xml': _sitemap_url(url, page.last_published_at),
+            'atom_xml': _atom_entry(page, url) if section else '',
+        },
+    )
+    rebuild_documents(sections=[section] if section else [])
+
+
+def rebuild_entries():
+    """Re-render every page's fragments from scratch (management command / first deploy)."""
+    from wagtail.models import Page
+
+    from nicolabeirer.models import SyndicationEntry
+
+    entries = []
+    for page in Page.objects.live().public().specific().exclude(depth=1):
+        url = page.get_full_url()
+        if url is None:
+            continue
+        section = _section(page)
+        entries.append(SyndicationEntry(
+            page_id=page.pk,
+            section=section,
+            published_at=page.first_published_at or page.last_published_at or timezone.now(),
+            sitemap_xml=_sitemap_url(url, page.last_published_at),
+            atom_xml=_atom_entry(page, url) if section else '',
+        ))
+    with transaction.atomic():
+        SyndicationEntry.objects.all().delete()
+        SyndicationEntry.objects.bulk_create(entries)
+    return rebuild_documents(sections=list(FEEDS))
+
+
+def _store(name, content_type, content):
+    """Save a document if its bytes changed; returns True when it was updated."""
+    from nicolabeirer.models import PrebuiltDocument
+
+    etag = '"' + hashlib.sha256(content.encode()).hexdigest()[:32] + '"'
+    existing = PrebuiltDocument.objects.filter(name=name).values_list('etag', flat=True).first()
+    if existing == etag:
+        return False
+    PrebuiltDocument.objects.update_or_create(
+        name=name,
+        defaults={'content_type': content_type, 'content': content, 'etag': etag, 'last_modified': timezone.now()},
+    )
+    return True
+
+
+def rebuild_documents(sections=()):
+    """Assemble sitemap.xml and the given sections' feeds from stored fragments."""
+    from nicolabeirer.models import SyndicationEntry
+
+    root_url = _site_root_url()
+    extra = [_sitemap_url(root_url + reverse('home')), _sitemap_url(root_url + reverse('index'))]
+    fragments = list(SyndicationEntry.objects.order_by('page_id').values_list('sitemap_xml', flat=True))
+    seen = set()
+    urls = [url for url in extra + fragments if not (url in seen or seen.add(url))]
+    updated = [SITEMAP] if _store(SITEMAP, SITEMAP_CONTENT_TYPE, (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        + '\n'.join(urls)
+        + '\n</urlset>\n'
+    )) else []
+
+    for section in sections:
+        name, title = FEEDS[section]
+        entries = list(
+            SyndicationEntry.objects.filter(section=section)
+            .order_by('-published_at')
+            .values_list('atom_xml', flat=True)[:FEED_LENGTH]
+        )
+        feed_url = root_url + reverse('prebuilt_document', args=[name])
+        feed_updated = (
+            SyndicationEntry.objects.filter(section=section).order_by('-published_at')
+            .values_list('published_at', flat=True).first()
+        ) or timezone.now()
+        content = (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom">'
+            f'<title>{escape(title)}</title>'
+            f'<link href="{escape(root_url)}/" rel="alternate"/>'
+            f'<link href="{escape(feed_url)}" rel="self"/>'
+            f'<id>{escape(feed_url)}</id>'
+            f'<author><name>{escape(settings.WAGTAIL_SITE_NAME)}</name></author>'
+            f'<updated>{feed_updated.isoformat()}</updated>\n'
+            + '\n'.join(entries)
+            + '\n</feed>\n'
+        )
+        if _store(name, ATOM_CONTENT_TYPE, content):
+            updated.append(name)
+    return updated
+
+
+def update_page_on_signal(sender, instance, **kwargs):
+    update_page(instance)
+
+
+def rebuild_on_delete(sender, instance, **kwargs):
+    # The entry row cascades with the page; only the documents need rebuilding
+    rebuild_documents(sections=list(FEEDS))
@@ -0,0 +1,256 @@
+import datetime
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from wagtail.embeds.exceptions import EmbedNotFoundException
+from wagtail.embeds.finders import get_finders
+from wagtail.embeds.finders.base import EmbedFinder
+from wagtail.models import Site
+
+from blog.models import BlogIndexPage
+from nicolabeirer import static_export
+from nicolabeirer.models import PrebuiltDocument
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN='secret', METRICS_ALLOWED_IPS=['10.0.0.5'])
+class MetricsEndpointTests(TestCase):
+    def test_requires_token_or_allowed_address(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 404)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+
+    def test_bearer_token(self):
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_allowed_address(self):
+        response = self.client.get('/metrics/', REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='', METRICS_ALLOWED_IPS=[])
+    def test_closed_without_configuration(self):
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer ').status_code, 404)
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def _request(self):
+        from django.contrib.auth.models import AnonymousUser
+        from django.test import RequestFactory
+
+        request = RequestFactory().get('/cached/')
+        request.user = AnonymousUser()
+        return request
+
+    def test_cached_response_keeps_headers(self):
+        from django.http import HttpResponse
+        from nicolabeirer import page_cache
+
+        calls = []
+
+        def serve_page(page, request, args, kwargs):
+            calls.append(request)
+            response = HttpResponse('<p>hello</p>', content_type='text/html; charset=utf-8')
+            response['Cache-Control'] = 'max-age=60'
+            response['Vary'] = 'Accept-Language'
+            response['Content-Language'] = 'en'
+            response.set_cookie('csrftoken', 'visitor-specific')
+            return response
+
+        first = page_cache.serve_cached(serve_page, None, self._request(), (), {})
+        second = page_cache.serve_cached(serve_page, None, self._request(), (), {})
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(second.content, first.content)
+        for header in ('Content-Type', 'Cache-Control', 'Vary', 'Content-Language'):
+            self.assertEqual(second[header], first[header])
+        self.assertNotIn('csrftoken', second.cookies)
+
+
+class FakeProvider(EmbedFinder):
+    """oEmbed stand-in: counts calls, and fails while ``failing`` is set."""
+
+    calls = 0
+    failing = False
+    cache_until = None
+
+    def __init__(self, **options):
+        pass
+
+    def accept(self, url):
+        return url.startswith('https://video.example/')
+
+    def find_embed(self, url, max_width=None, max_height=None):
+        type(self).calls += 1
+        if self.failing:
+            raise EmbedNotFoundException
+        return {
+            'title': f'Video v{self.calls}',
+            'type': 'video',
+            'html': f'<iframe src="{url}" data-version="{self.calls}"></iframe>',
+            'width': 640,
+            'height': 360,
+            'cache_until': self.cache_until,
+        }
+
+
+@override_settings(WAGTAILEMBEDS_FINDERS=[{
+    'class': 'nicolabeirer.embeds.SnapshotFallbackFinder',
+    'finder': 'nicolabeirer.tests.FakeProvider',
+    'refresh_after': 7 * 24 * 3600,
+    'retry_after': 3600,
+}])
+class SnapshotFallbackFinderTests(TestCase):
+    url = 'https://video.example/watch/1'
+
+    def setUp(self):
+        FakeProvider.calls = 0
+        FakeProvider.failing = False
+        FakeProvider.cache_until = None
+        get_finders.cache_clear()
+        self.addCleanup(get_finders.cache_clear)
+
+    def _expire(self, embed):
+        embed.cache_until = timezone.now() - datetime.timedelta(seconds=1)
+        embed.save()
+
+    def test_fresh_fetch_gets_refresh_after_lifetime(self):
+        from wagtail.embeds.embeds import get_embed
+
+        before = timezone.now()
+        embed = get_embed(self.url)
+        self.assertEqual(FakeProvider.calls, 1)
+        self.assertIn('data-version="1"', embed.html)
+        self.assertGreaterEqual(embed.cache_until, before + datetime.timedelta(days=7))
+        self.assertLessEqual(embed.cache_until, timezone.now() + datetime.timedelta(days=7))
+
+        # Still fresh: served from the database without asking the provider
+        get_embed(self.url)
+        self.assertEqual(FakeProvider.calls, 1)
+
+    def test_provider_cache_until_is_kept(self):
+        from wagtail.embeds.embeds import get_embed
+
+        FakeProvider.cache_until = timezone.now() + datetime.timedelta(hours=2)
+        embed = get_embed(self.url)
+        self.assertEqual(embed.cache_until, FakeProvider.cache_until)
+
+    def test_refresh_after_expiry(self):
+        from wagtail.embeds.embeds import get_embed
+
+        self._expire(get_embed(self.url))
+        embed = get_embed(self.url)
+        self.assertEqual(FakeProvider.calls, 2)
+        self.assertIn('data-version="2"', embed.html)
+
+    def test_falls_back_to_snapshot_and_honours_retry_after(self):
+        from wagtail.embeds.embeds import get_embed
+
+        self._expire(get_embed(self.url))
+        FakeProvider.failing = True
+        before = timezone.now()
+        with self.assertLogs('nicolabeirer.embeds', 'WARNING'):
+            embed = get_embed(self.url)
+        self.assertEqual(FakeProvider.calls, 2)
+        self.assertIn('data-version="1"', embed.html)
+        self.assertGreaterEqual(embed.cache_until, before + datetime.timedelta(hours=1))
+        self.assertLess(embed.cache_until, before + datetime.timedelta(days=1))
+
+        # Within retry_after the snapshot is served without retrying the provider
+        get_embed(self.url)
+        self.assertEqual(FakeProvider.calls, 2)
+
+        # Once retry_after has passed the provider is tried again
+        self._expire(embed)
+        FakeProvider.failing = False
+        embed = get_embed(self.url)
+        self.assertEqual(FakeProvider.calls, 3)
+        self.assertIn('data-version="3"', embed.html)
+
+    def test_failure_without_snapshot_raises(self):
+        from wagtail.embeds.embeds import get_embed
+
+        FakeProvider.failing = True
+        with self.assertRaises(EmbedNotFoundException):
+            get_embed(self.url)
+
+
+class StaticExportLockTests(TestCase):
+    def _locked_elsewhere(self, lock_path):
+        """Whether another process fails to take the export lock without waiting."""
+        code = (
+            'import fcntl, sys\n'
+            f'lock_file = open({str(lock_path)!r}, "a")\n'
+            'try:\n'
+            '    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)\n'
+            'except BlockingIOError:\n'
+            '    sys.exit(1)\n'
+        )
+        return subprocess.run([sys.executable, '-c', code]).returncode == 1
+
+    def test_lock_excludes_other_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            lock_path = root / static_export.LOCK_NAME
+            with static_export._export_lock(root):
+                self.assertTrue(self._locked_elsewhere(lock_path))
+            self.assertFalse(self._locked_elsewhere(lock_path))
+
+
+class StaticExportTests(TestCase):
+    def test_renders_pages_and_documents_through_the_site_handler(self):
+        PrebuiltDocument.objects.create(
+            name='sitemap.xml',
+            content_type='application/xml',
+            content='<urlset/>',
+            etag='"abc"',
+            last_modified=timezone.now(),
+        )
+        blog = Site.objects.get(is_default_site=True).root_page.add_child(
+            instance=BlogIndexPage(title='Field notes', slug='blog'),
+        )
+        urls = ['/sitemap.xml', blog.url, '/nowhere/']
+
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            result = static_export.export_urls(urls, root)
+            self.assertEqual(result, {'written': ['/sitemap.xml', '/blog/'], 'unchanged': [], 'removed': []})
+            self.assertEqual((root / 'sitemap.xml').read_bytes(), b'<urlset/>')
+            self.assertIn('Field notes', (root / 'blog' / 'index.html').read_text())
+
+            self.assertEqual(static_export.export_urls(urls, root)['unchanged'], ['/sitemap.xml', '/blog/'])
+
+
+class PrebuiltDocumentTests(TestCase):
+    def setUp(self):
+        self.document = PrebuiltDocument.objects.create(
+            name='sitemap.xml',
+            content_type='application/xml',
+            content='<urlset/>',
+            etag='"abc"',
+            last_modified=datetime.datetime(2026, 10, 18, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+        )
+
+    def test_serves_document_with_validators(self):
+        response = self.client.get('/sitemap.xml')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'<urlset/>')
+        self.assertEqual(response.headers['ETag'], '"abc"')
+        self.assertEqual(response.headers['Last-Modified'], 'Sun, 18 Oct 2026 12:30:15 GMT')
+
+    def test_if_none_match(self):
+        response = self.client.get('/sitemap.xml', HTTP_IF_NONE_MATCH='"abc"')
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get('/sitemap.xml').headers['Last-Modified']
+        response = self.client.get('/sitemap.xml', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/sitemap.xml', HTTP_IF_MODIFIED_SINCE='Sun, 18 Oct 2026 12:30:14 GMT')
+        self.assertEqual(response.status_code, 200)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from wagtail import urls as wagtail_urls
@@ -11,7 +11,15 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('admin/', admin.site.urls),
+    path('metrics/', views.metrics, name='metrics'),
     path('projects/', include('projects.urls')),
+    path('search/', views.search, name='search'),
+    re_path(
+        r'^(?P<name>sitemap\.xml|feeds/(?:blog|adventures)\.atom)$',
+        views.prebuilt_document,
+        name='prebuilt_document',
+    ),
+    path('api/adventures/', include('adventures.urls')),
     path('cms/', include(wagtailadmin_urls)),
     path('documents/', include(wagtaildocs_urls)),
     path('', include(wagtail_urls)),  # catch-all, must be last
@@ -1,14 +1,75 @@
+import hmac
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.core.paginator import Paginator
 from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
 
 from blog.models import BlogPage
 from adventures.models import AdventurePage
 from projects.models import ResumeProject
 
+from . import metrics as app_metrics
+from .models import PrebuiltDocument
+from .search import prepare_results, search_site
+
 
-def home(request):
+async def home(request):
     context = {
-        'recent_posts': BlogPage.objects.live().order_by('-date')[:3],
-        'recent_adventures': AdventurePage.objects.live().order_by('-date_start')[:3],
-        'recent_projects': ResumeProject.objects.all()[:3],
+        'recent_posts': [post async for post in BlogPage.objects.live().order_by('-date')[:3]],
+        'recent_adventures': [
+            adventure async for adventure in AdventurePage.objects.live().order_by('-date_start')[:3]
+        ],
+        'recent_projects': [project async for project in ResumeProject.objects.all()[:3]],
     }
-    return render(request, 'home.html', context)
+    # {% pageurl %} resolves the Site from the database, so rendering stays synchronous
+    return await sync_to_async(render)(request, 'home.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        paginator = Paginator(search_site(query), 10)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        prepare_results(page_obj.object_list, query, request)
+    return render(request, 'search.html', {'query': query, 'page_obj': page_obj})
+
+
+def _metrics_allowed(request):
+    """Bearer token or allow-listed client address; see METRICS_TOKEN in settings."""
+    token = settings.METRICS_TOKEN
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer ') and hmac.compare_digest(header[len('Bearer '):], token):
+        return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics(request):
+    # 404 rather than 403, so the endpoint's existence isn't advertised
+    if not app_metrics.enabled() or not _metrics_allowed(request):
+        raise Http404
+    body, content_type = app_metrics.render_latest()
+    return HttpResponse(body, content_type=content_type)
+
+
+@require_safe
+def prebuilt_document(request, name):
+    """Serve a sitemap or feed built on publish; revalidations get a 304 from one small query."""
+    validators = PrebuiltDocument.objects.filter(name=name).values('pk', 'etag', 'last_modified').first()
+    if validators is None:
+        raise Http404
+    # Whole seconds: HTTP dates have no fraction, so If-Modified-Since could never match otherwise
+    last_modified = int(validators['last_modified'].timestamp())
+    response = get_conditional_response(request, etag=validators['etag'], last_modified=last_modified)
+    if response is None:
+        document = PrebuiltDocument.objects.only('content', 'content_type').get(pk=validators['pk'])
+        response = HttpResponse(document.content, content_type=document.content_type)
+    response.headers['ETag'] = validators['etag']
+    response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=300)
+    return response
@@ -0,0 +1,10 @@
+from wagtail import hooks
+
+from nicolabeirer import page_cache
+
+
+@hooks.register('on_serve_page')
+def cache_anonymous_page_responses(next_serve_page):
+    def serve(page, request, args, kwargs):
+        return page_cache.serve_cached(next_serve_page, page, request, args, kwargs)
+    return serve
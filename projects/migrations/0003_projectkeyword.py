@@ -0,0 +1,43 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def backfill_keywords(apps, schema_editor):
+    ResumeProject = apps.get_model('projects', 'ResumeProject')
+    ProjectKeyword = apps.get_model('projects', 'ProjectKeyword')
+    rows = []
+    for project in ResumeProject.objects.all():
+        seen = set()
+        for keyword in project.keywords or []:
+            # Cut to the 100-character columns, as ResumeProject.sync_keyword_rows() does
+            slug = slugify(keyword)[:100].rstrip('-')
+            if slug and slug not in seen:
+                seen.add(slug)
+                rows.append(ProjectKeyword(project=project, name=keyword[:100], slug=slug))
+    ProjectKeyword.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_links_field'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keyword_rows', to='projects.resumeproject')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('slug', 'project'), name='projects_keyword_slug_project')],
+            },
+        ),
+        migrations.RunPython(backfill_keywords, migrations.RunPython.noop),
+    ]
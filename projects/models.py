@@ -1,13 +1,29 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils.text import slugify
+from wagtail.search import index
 
+KEYWORD_MAX_LENGTH = 100
 
-class ResumeProject(models.Model):
+
+def keyword_slug(keyword):
+    """Slug of a keyword, cut to fit ``ProjectKeyword.slug``; idempotent on its own output."""
+    return slugify(keyword)[:KEYWORD_MAX_LENGTH].rstrip('-')
+
+
+class ResumeProject(index.Indexed, models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     features = models.JSONField(default=list)
     keywords = models.JSONField(default=list)
     links = models.JSONField(default=list, help_text='List of {"label": "...", "url": "..."} objects')
 
+    search_fields = [
+        index.SearchField('title', boost=3),
+        index.AutocompleteField('title'),
+        index.SearchField('description'),
+        index.SearchField('keywords_text', boost=2),
+    ]
+
     class Meta:
         ordering = ['title']
         verbose_name = 'Resume Project'
@@ -15,3 +31,39 @@ class ResumeProject(models.Model):
 
     def __str__(self):
         return self.title
+
+    @property
+    def keywords_text(self):
+        return ' '.join(self.keywords or [])
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.sync_keyword_rows()
+
+    def sync_keyword_rows(self):
+        """Mirror ``keywords`` into ProjectKeyword so filtering and counting use an index."""
+        rows = {}
+        for keyword in self.keywords or []:
+            # Keywords have no length limit; the rows are cut to their columns
+            slug = keyword_slug(keyword)
+            if slug and slug not in rows:
+                rows[slug] = ProjectKeyword(project=self, name=keyword[:KEYWORD_MAX_LENGTH], slug=slug)
+        ProjectKeyword.objects.filter(project=self).delete()
+        ProjectKeyword.objects.bulk_create(rows.values())
+
+
+class ProjectKeyword(models.Model):
+    """One row per (project, keyword); maintained by ResumeProject.save()."""
+
+    project = models.ForeignKey(ResumeProject, on_delete=models.CASCADE, related_name='keyword_rows')
+    name = models.CharField(max_length=KEYWORD_MAX_LENGTH)
+    slug = models.SlugField(max_length=KEYWORD_MAX_LENGTH)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['slug', 'project'], name='projects_keyword_slug_project'),
+        ]
+
+    def __str__(self):
+        return self.name
@@ -1,3 +1,28 @@
 from django.test import TestCase
+from django.utils.text import slugify
 
-# Create your tests here.
+from projects.models import KEYWORD_MAX_LENGTH, ProjectKeyword, ResumeProject
+
+
+class ProjectKeywordTests(TestCase):
+    def test_long_keywords_are_cut_to_fit_their_columns(self):
+        keyword = 'Distributed ' * 20
+        project = ResumeProject.objects.create(
+            title='Pipeline', description='', keywords=[keyword, keyword.upper(), 'Python'],
+        )
+
+        rows = {row.slug: row for row in ProjectKeyword.objects.filter(project=project)}
+        self.assertEqual(len(rows), 2)
+        long_row = next(row for slug, row in rows.items() if slug != 'python')
+        self.assertLessEqual(len(long_row.slug), KEYWORD_MAX_LENGTH)
+        self.assertFalse(long_row.slug.endswith('-'))
+        self.assertEqual(long_row.name, keyword[:KEYWORD_MAX_LENGTH])
+
+    def test_filter_link_with_the_full_slug_matches_the_cut_row(self):
+        keyword = 'Distributed ' * 20
+        ResumeProject.objects.create(title='Pipeline', description='', keywords=[keyword])
+        ResumeProject.objects.create(title='Website', description='', keywords=['Python'])
+
+        # The keyword links on the page carry the uncut slug
+        response = self.client.get('/projects/', {'kw': slugify(keyword)})
+        self.assertEqual([project.title for project in response.context['projects']], ['Pipeline'])
@@ -1,8 +1,46 @@
+from django.db.models import Count, Min
 from django.shortcuts import render
+from django.utils.http import urlencode
 
-from .models import ResumeProject
+from .models import ProjectKeyword, ResumeProject, keyword_slug
 
 
-def index(request):
+def _filter_url(slugs):
+    return '?' + urlencode({'kw': slugs}, doseq=True) if slugs else '?'
+
+
+async def index(request):
+    selected = list(dict.fromkeys(slug for slug in map(keyword_slug, request.GET.getlist('kw')) if slug))
+
     projects = ResumeProject.objects.all()
-    return render(request, 'projects/index.html', {'projects': projects})
+    keyword_rows = ProjectKeyword.objects.all()
+    if selected:
+        # Projects carrying every selected keyword, resolved on the (slug, project) index
+        matching = (
+            ProjectKeyword.objects.filter(slug__in=selected)
+            .values('project')
+            .annotate(matched=Count('slug'))
+            .filter(matched=len(selected))
+            .values('project')
+        )
+        projects = projects.filter(pk__in=matching)
+        keyword_rows = keyword_rows.filter(project__in=matching)
+    projects = [project async for project in projects]
+
+    # Counts within the current selection, so each keyword shows how far it would narrow it
+    counts = (
+        keyword_rows.values('slug')
+        .annotate(name=Min('name'), count=Count('project'))
+        .order_by('-count', 'slug')
+    )
+    keywords = []
+    async for row in counts:
+        active = row['slug'] in selected
+        toggled = [slug for slug in selected if slug != row['slug']] if active else selected + [row['slug']]
+        keywords.append({**row, 'active': active, 'url': _filter_url(toggled)})
+
+    return render(request, 'projects/index.html', {
+        'projects': projects,
+        'keywords': keywords,
+        'selected_keywords': selected,
+    })